@@ -0,0 +1,123 @@
+"""
+Benchmarks the hot leave queries on the legacy schema and again after ``leave_migrations``.
+
+Builds a throwaway database shaped like the legacy ``leave_management.db`` (untyped tables,
+no keys or indexes), times each query, migrates it and times the same queries again:
+
+    python bench_leave_queries.py [--leaves 100000] [--employees 5000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+from leave_migrations import migrate_database
+
+LEAVE_TYPES = ["Annual", "Sick", "Maternity", "Paternity", "Study", "Compassionate"]
+STATUSES = ["Pending", "Approved", "Declined", "Recalled", "Withdrawn"]
+FIRST_NAMES = ["Grace", "Daniel", "Emily", "Joseph", "Amina", "Brian", "Faith", "Kevin", "Mercy", "Peter"]
+PARTNERS = ["Fine Media", "Sheer Logic"]
+
+
+def build_legacy_database(path, leaves, employees, seed=7):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE employee_table (
+            "Username" INTEGER, "First_Name" TEXT, "Middle_Name" TEXT, "Surname_Name" TEXT,
+            "AUUID" INTEGER, "Employee_ID" INTEGER, "Email" TEXT, "Manager" TEXT, "Date_of_Join" TEXT,
+            "OPCO_Region" TEXT, "Organization" TEXT, "Department" TEXT, "Sub_Department" TEXT,
+            "Person_Type" TEXT, "Personal_Mobile" INTEGER, "Partner_Name" TEXT, "id" INTEGER,
+            "uuid" TEXT, "gender" TEXT, "password" TEXT, "position" TEXT, "salary" INTEGER
+        );
+        CREATE TABLE leave_entries (
+            "id" INTEGER, "leave_id" TEXT, "employee_name" TEXT, "leave_type" TEXT, "start_date" TEXT,
+            "end_date" TEXT, "description" TEXT, "attachment" INTEGER, "status" TEXT,
+            "decline_reason" TEXT, "recall_reason" TEXT
+        );
+    """)
+    people = []
+    for i in range(employees):
+        first_name = rng.choice(FIRST_NAMES) if i >= len(FIRST_NAMES) else FIRST_NAMES[i]
+        people.append((str(uuid.UUID(int=rng.getrandbits(128))), f"{first_name}{i}"))
+    conn.executemany(
+        "INSERT INTO employee_table (uuid, id, First_Name, Email, Partner_Name, Date_of_Join) VALUES (?, ?, ?, ?, ?, ?)",
+        [(uid, i, name, f"{name.lower()}@example.com", rng.choice(PARTNERS), "2020-01-01")
+         for i, (uid, name) in enumerate(people)],
+    )
+    base = date(2023, 1, 1)
+    rows = []
+    for i in range(1, leaves + 1):
+        uid, name = rng.choice(people)
+        start = base + timedelta(days=rng.randrange(3 * 365))
+        end = start + timedelta(days=rng.randrange(15))
+        rows.append((i, uid, name, rng.choice(LEAVE_TYPES), start.isoformat(), end.isoformat(),
+                     "", 0, rng.choice(STATUSES), None, None))
+    conn.executemany("INSERT INTO leave_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    sample = people[len(people) // 2]
+    conn.close()
+    return sample
+
+
+def queries(employee_uuid, employee_name, today):
+    return [
+        ("pending queue", "SELECT id, employee_name, start_date FROM leave_entries "
+                          "WHERE status = 'Pending' ORDER BY start_date", ()),
+        ("status counts", "SELECT status, COUNT(*) FROM leave_entries GROUP BY status", ()),
+        ("history by employee", "SELECT * FROM leave_entries WHERE leave_id = ? ORDER BY start_date DESC",
+         (employee_uuid,)),
+        ("used days by employee", "SELECT SUM(julianday(end_date) - julianday(start_date) + 1) FROM leave_entries "
+                                  "WHERE leave_id = ? AND status = 'Approved' AND leave_type = 'Annual'",
+         (employee_uuid,)),
+        ("on leave today", "SELECT COUNT(*) FROM leave_entries WHERE status = 'Approved' "
+                           "AND start_date <= ? AND end_date >= ?", (today, today)),
+        ("employee by First_Name", "SELECT uuid FROM employee_table WHERE First_Name = ?", (employee_name,)),
+        ("leaves in a month", "SELECT COUNT(*) FROM leave_entries WHERE start_date BETWEEN ? AND ?",
+         ("2024-03-01", "2024-03-31")),
+    ]
+
+
+def time_queries(path, cases, repeat):
+    conn = sqlite3.connect(path)
+    results = {}
+    for label, sql, params in cases:
+        conn.execute(sql, params).fetchall()  # warm the page cache
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params).fetchall()
+        results[label] = (time.perf_counter() - start) / repeat * 1000
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--leaves", type=int, default=100_000)
+    parser.add_argument("--employees", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        print(f"Building legacy database with {args.leaves:,} leaves and {args.employees:,} employees...")
+        employee_uuid, employee_name = build_legacy_database(path, args.leaves, args.employees)
+        cases = queries(employee_uuid, employee_name, "2024-06-15")
+
+        before = time_queries(path, cases, args.repeat)
+        start = time.perf_counter()
+        migrate_database(path)
+        print(f"Migrated in {time.perf_counter() - start:.2f}s")
+        after = time_queries(path, cases, args.repeat)
+
+    print(f"\n{'query':<26}{'legacy ms':>12}{'migrated ms':>14}{'speed-up':>10}")
+    for label, _, _ in cases:
+        print(f"{label:<26}{before[label]:>12.2f}{after[label]:>14.2f}{before[label] / max(after[label], 1e-6):>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Lower-cases a question and strips punctuation and extra whitespace."""
+    query = _PUNCTUATION.sub(" ", query.lower())
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class SemanticAnswerCache:
+    """
+    In-memory answer cache in front of the RetrievalQA chain.
+
+    A question hits the cache when its normalised text matches a cached one exactly, or
+    when its embedding's cosine similarity to a cached question is at least
+    ``similarity_threshold``. Entries expire after ``ttl_seconds`` and the least recently
+    used entry is evicted beyond ``max_entries``. The whole cache is dropped as soon as it
+    is used with a different knowledge-base index version.
+    """
+
+    def __init__(self, embeddings, max_entries=256, ttl_seconds=6 * 60 * 60, similarity_threshold=0.95):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.index_version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _embed(self, normalized):
+        vector = np.asarray(self.embeddings.embed_query(normalized), dtype="float32")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, index_version):
+        """Invalidates every entry when the knowledge base index changed."""
+        if index_version != self.index_version:
+            self._entries.clear()
+            self.index_version = index_version
+
+    def _evict_expired(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry["created"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, query, index_version, semantic=True):
+        """
+        Returns the cached ``{"answer", "sources"}`` for a question, or None.
+        With ``semantic=False`` only the exact normalised text is looked up, so no embedding is requested.
+        """
+        normalized = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            self._check_version(index_version)
+            self._evict_expired(now)
+            entry = self._entries.get(normalized)
+            if entry is not None:
+                self._entries.move_to_end(normalized)
+                self.hits += 1
+                return entry
+            keys = [key for key, entry in self._entries.items() if entry["vector"] is not None]
+            if not semantic or not keys:
+                self.misses += 1
+                return None
+            matrix = np.stack([self._entries[key]["vector"] for key in keys])
+
+        # Embed outside the lock so other sessions are not blocked on Ollama
+        scores = matrix @ self._embed(normalized)
+        best = int(np.argmax(scores))
+
+        with self._lock:
+            entry = self._entries.get(keys[best])
+            if entry is None or scores[best] < self.similarity_threshold or index_version != self.index_version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(keys[best])
+            self.hits += 1
+            return entry
+
+    def put(self, query, answer, sources, index_version, semantic=True):
+        """Caches an answer and its source documents for a question (exact-match only with ``semantic=False``)."""
+        normalized = normalize_query(query)
+        vector = self._embed(normalized) if semantic else None
+        with self._lock:
+            self._check_version(index_version)
+            self._entries[normalized] = {
+                "answer": answer,
+                "sources": sources,
+                "vector": vector,
+                "created": time.time(),
+            }
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
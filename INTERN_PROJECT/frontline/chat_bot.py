@@ -1,15 +1,21 @@
 import streamlit as st
 import os
 from langchain_ollama import ChatOllama
-from langchain_community.document_loaders import PDFPlumberLoader
 from langchain_experimental.text_splitter import SemanticChunker
-from langchain.embeddings import OllamaEmbeddings
-from langchain_community.embeddings import OllamaEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain.chains import RetrievalQA
 from langchain.chains.combine_documents.stuff import StuffDocumentsChain
 from langchain.prompts import PromptTemplate
 from langchain.chains.llm import LLMChain
+from langchain_core.prompts import format_document
+
+from answer_cache import SemanticAnswerCache
+from embedding_cache import CachedEmbeddings
+from kb_bm25 import HybridRetriever
+from kb_index import KnowledgeBaseIndex
+from kb_ingest import discover_pdfs
+from kb_pages import PageCache, start_background_build
+from llm_dispatch import DispatchRejected, LLMDispatcher
+from ollama_embeddings import BatchedOllamaEmbeddings
 
 # Streamlit page configuration
 st.set_page_config(
@@ -18,8 +24,11 @@ st.set_page_config(
     layout="wide"
 )
 
-# Docker Ollama configuration
-OLLAMA_BASE_URL = "http://frontline-ollama-container-1:11434"
+# Docker Ollama configuration (generation and embeddings both go to this server)
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://frontline-ollama-container-1:11434")
+EMBEDDING_MODEL = "qwen3:0.6b"
+# "hybrid" (BM25 + vector fusion), "vector" or "keyword"
+RETRIEVAL_MODE = os.environ.get("KB_RETRIEVAL_MODE", "hybrid")
 
 @st.cache_resource
 def initialize_rag_system():
@@ -28,30 +37,40 @@ def initialize_rag_system():
     # Initialize the LLM
     llm = ChatOllama(
         model="qwen3:0.6b",
+        base_url=OLLAMA_BASE_URL,
         temperature=0.1,  # Reduced for more consistent responses
         num_thread=8,
         num_ctx=2048,
         verbose=True
     )
     
-    # Load Data 
-    loader = PDFPlumberLoader("/Users/danielwanganga/Documents/GitHub/PROJECT_FRONTLINE/INTERN_PROJECT/frontline/knowledge_base/Rudishiwa Troubleshooting Steps (6).pdf")
-    docs = loader.load()
+    # Create embedder (batched, with several requests in flight to the Ollama container)
+    ollama_embedder = BatchedOllamaEmbeddings(
+        model=EMBEDDING_MODEL,
+        base_url=OLLAMA_BASE_URL,
+        batch_size=32,
+        max_in_flight=4
+    )
     
-    # Define the text splitter
-    text_splitter = SemanticChunker(OllamaEmbeddings(model="qwen3:0.6b"))
-    documents = text_splitter.split_documents(docs)
+    # Persistent embedding cache shared by the chunker and the index,
+    # so no sentence is ever embedded twice with the same model
+    embedder = CachedEmbeddings(ollama_embedder, model=ollama_embedder.identity)
     
-    # Create embedder
-    embedder = OllamaEmbeddings(model="qwen3:0.6b")
+    # Define the text splitter
+    text_splitter = SemanticChunker(embedder)
     
-    # Create VectorDB 
-    vector = FAISS.from_documents(documents=documents, embedding=embedder)
+    # Load the persisted VectorDB over every knowledge base PDF,
+    # re-embedding only PDFs that were added or changed
+    kb_index = KnowledgeBaseIndex(embedder, text_splitter, model_name=embedder.identity)
+    vector = kb_index.sync(discover_pdfs())
     
-    # Create retriever
-    retriever = vector.as_retriever(
-        search_type="mmr",
-        search_kwargs={"k": 5}  # Increased for better context
+    # Create retriever: BM25 keyword hits fused with vector hits; exact product-term
+    # queries ("Smarta", "eSIM", ...) are served from BM25 without embedding the query
+    retriever = HybridRetriever(
+        vectorstore=vector,
+        bm25=kb_index.bm25,
+        k=5,  # Increased for better context
+        mode=RETRIEVAL_MODE,
     )
     
     # Enhanced prompt for better AI assistant behavior
@@ -100,7 +119,132 @@ def initialize_rag_system():
         return_source_documents=True
     )
     
-    return qa
+    return qa, kb_index.version
+
+@st.cache_resource
+def get_llm_dispatcher(_llm):
+    """One dispatcher per process: admission control and per-agent fairness in front of the shared Ollama LLM"""
+    return LLMDispatcher(_llm, max_concurrency=2, max_queue_depth=32, max_per_user=2)
+
+@st.cache_resource
+def get_answer_cache(_embeddings):
+    """Answer cache shared by every session, so repeated agent questions skip retrieval and generation"""
+    return SemanticAnswerCache(_embeddings, max_entries=500, ttl_seconds=6 * 60 * 60, similarity_threshold=0.95)
+
+@st.cache_resource
+def get_page_cache():
+    """Cached page text and thumbnails for source previews; missing pages render in the background"""
+    page_cache = PageCache()
+    start_background_build(page_cache)
+    return page_cache
+
+def render_source(source):
+    """Shows a cited chunk with its PDF page preview when the page cache has it"""
+    metadata = getattr(source, "metadata", None) or {}
+    page = metadata.get("page")
+    cached_page = None
+    if metadata.get("source") and page is not None:
+        cached_page = get_page_cache().get_page(metadata["source"], page)
+    
+    if cached_page:
+        st.caption(f"{metadata['source']} · page {page + 1}")
+        thumb_col, text_col = st.columns([1, 2])
+        with thumb_col:
+            if cached_page["thumbnail"]:
+                st.image(cached_page["thumbnail"], use_container_width=True)
+        with text_col:
+            st.write(f"Content: {source.page_content[:300]}...")
+    else:
+        st.write(f"Content: {source.page_content[:300]}...")
+        if metadata:
+            st.write(f"Metadata: {metadata}")
+
+def stream_answer(qa_system, query, sources, user_id):
+    """
+    Streams the answer for a query token by token through the same prompt as the RetrievalQA chain.
+    Retrieved documents are appended to ``sources`` before the first token is yielded.
+    Generation is queued through the shared LLM dispatcher rather than calling Ollama directly.
+    """
+    docs = qa_system.retriever.invoke(query)
+    sources.extend(docs)
+    
+    combine_chain = qa_system.combine_documents_chain
+    context = combine_chain.document_separator.join(
+        format_document(doc, combine_chain.document_prompt) for doc in docs
+    )
+    prompt_text = combine_chain.llm_chain.prompt.format(
+        **{combine_chain.document_variable_name: context, "question": query}
+    )
+    
+    dispatcher = get_llm_dispatcher(combine_chain.llm_chain.llm)
+    yield from dispatcher.stream(user_id, prompt_text)
+
+def _prepend(first, rest):
+    """Re-attaches a token that was pulled off a generator early."""
+    if first:
+        yield first
+    yield from rest
+
+def answer_question(qa_system, index_version, user_input, chat_container):
+    """Adds the question to the chat, streams the assistant's answer into it and stores the result."""
+    # Add user message to chat history
+    st.session_state.messages.append({"role": "user", "content": user_input})
+    
+    # Repeated (or near-identical) questions are answered from the cache
+    answer_cache = get_answer_cache(qa_system.retriever.vectorstore.embeddings)
+    # Exact product-term queries are served from BM25, so don't embed them for the cache either
+    semantic = not qa_system.retriever.is_exact_term_query(user_input)
+    try:
+        cached = answer_cache.get(user_input, index_version, semantic=semantic)
+    except Exception:
+        cached = None
+    if cached:
+        st.session_state.messages.append({
+            "role": "assistant", 
+            "content": cached["answer"],
+            "sources": cached["sources"]
+        })
+        return
+    
+    with chat_container:
+        with st.chat_message("user"):
+            st.markdown(user_input)
+        
+        # Render tokens as they arrive; sources are attached once the answer finishes
+        with st.chat_message("assistant"):
+            try:
+                sources = []
+                user_id = st.session_state.get("user_id") or st.session_state.setdefault("chat_session_id", os.urandom(8).hex())
+                with st.spinner("Searching the knowledge base..."):
+                    tokens = stream_answer(qa_system, user_input, sources, user_id)
+                    first_token = next(tokens, "")
+                answer = st.write_stream(_prepend(first_token, tokens))
+                
+                # Add assistant message to chat history
+                st.session_state.messages.append({
+                    "role": "assistant", 
+                    "content": answer,
+                    "sources": sources
+                })
+                
+                # Caching is best-effort; the agent already has the answer
+                try:
+                    answer_cache.put(user_input, answer, sources, index_version, semantic=semantic)
+                except Exception:
+                    pass
+                
+            except DispatchRejected as e:
+                st.session_state.messages.append({
+                    "role": "assistant", 
+                    "content": f"⏳ {e}"
+                })
+            
+            except Exception as e:
+                error_msg = f"I apologize, but I encountered a technical issue while processing your question. Please try rephrasing your question or contact Airtel Kenya support directly. Error: {str(e)}"
+                st.session_state.messages.append({
+                    "role": "assistant", 
+                    "content": error_msg
+                })
 
 # Streamlit UI
 def main():
@@ -110,12 +254,19 @@ def main():
     # Initialize the RAG system
     try:
         with st.spinner("Initializing your AI Assistant..."):
-            qa_system = initialize_rag_system()
+            qa_system, index_version = initialize_rag_system()
         st.success("✅ Your AI Assistant is ready to help!")
     except Exception as e:
         st.error(f"❌ Error initializing system: {str(e)}")
         st.stop()
     
+    # Assistant load, from the shared LLM dispatcher
+    llm_metrics = get_llm_dispatcher(qa_system.combine_documents_chain.llm_chain.llm).metrics()
+    st.sidebar.caption(
+        f"🧠 Assistant load: {llm_metrics['in_flight']} answering, {llm_metrics['queue_depth']} queued "
+        f"(p95 wait {llm_metrics['p95_wait']:.1f}s)"
+    )
+    
     # Initialize chat history
     if "messages" not in st.session_state:
         st.session_state.messages = []
@@ -137,9 +288,7 @@ def main():
                     with st.expander("📄 View Sources"):
                         for i, source in enumerate(message["sources"], 1):
                             st.write(f"**Source {i}:**")
-                            st.write(f"Content: {source.page_content[:300]}...")
-                            if hasattr(source, 'metadata') and source.metadata:
-                                st.write(f"Metadata: {source.metadata}")
+                            render_source(source)
     
     # Add some spacing before the input
     st.markdown("---")
@@ -163,29 +312,7 @@ def main():
     
     # Process user input
     if send_button and user_input:
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": user_input})
-        
-        # Get assistant response
-        with st.spinner("Processing your question..."):
-            try:
-                result = qa_system({"query": user_input})
-                answer = result["result"]
-                sources = result.get("source_documents", [])
-                
-                # Add assistant message to chat history
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": answer,
-                    "sources": sources
-                })
-                
-            except Exception as e:
-                error_msg = f"I apologize, but I encountered a technical issue while processing your question. Please try rephrasing your question or contact Airtel Kenya support directly. Error: {str(e)}"
-                st.session_state.messages.append({
-                    "role": "assistant", 
-                    "content": error_msg
-                })
+        answer_question(qa_system, index_version, user_input, chat_container)
         
         # Clear the input and rerun to show new messages
         st.rerun()
@@ -196,29 +323,7 @@ def main():
         if st.session_state.get("last_input") != user_input:
             st.session_state["last_input"] = user_input
             
-            # Add user message to chat history
-            st.session_state.messages.append({"role": "user", "content": user_input})
-            
-            # Get assistant response
-            with st.spinner("Processing your question..."):
-                try:
-                    result = qa_system({"query": user_input})
-                    answer = result["result"]
-                    sources = result.get("source_documents", [])
-                    
-                    # Add assistant message to chat history
-                    st.session_state.messages.append({
-                        "role": "assistant", 
-                        "content": answer,
-                        "sources": sources
-                    })
-                    
-                except Exception as e:
-                    error_msg = f"I apologize, but I encountered a technical issue while processing your question. Please try rephrasing your question or contact Airtel Kenya support directly. Error: {str(e)}"
-                    st.session_state.messages.append({
-                        "role": "assistant", 
-                        "content": error_msg
-                    })
+            answer_question(qa_system, index_version, user_input, chat_container)
             
             st.rerun()
             
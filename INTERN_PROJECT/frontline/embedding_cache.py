@@ -0,0 +1,139 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")
+EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite")
+
+# SQLite's default limit on bound parameters is 999; stay well below it
+_LOOKUP_CHUNK = 500
+
+
+def text_hash(text):
+    """Returns the SHA-256 digest used to key a text in the cache."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Persistent embedding cache in front of another embeddings client.
+
+    Vectors are stored in SQLite keyed by ``(model, sha256(text))``, so the semantic
+    chunker, the index build and later rebuilds share them: a text that was embedded
+    once with a given model is never sent to Ollama again. Duplicate texts inside a
+    single call are embedded once.
+
+    Only document texts are persisted. Queries (agent questions, answer-cache lookups)
+    are kept in a small in-memory LRU of ``max_queries`` entries for ``query_ttl_seconds``,
+    so the database does not grow with every question asked.
+    """
+
+    def __init__(self, embeddings, model, db_path=EMBEDDING_CACHE_PATH, max_queries=1024,
+                 query_ttl_seconds=60 * 60):
+        self.embeddings = embeddings
+        self.model = model
+        self.db_path = db_path
+        self.max_queries = max_queries
+        self.query_ttl_seconds = query_ttl_seconds
+        self._local = threading.local()
+        self._queries = OrderedDict()  # text -> (expires_at, vector), least recently used first
+        self._queries_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash BLOB NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+            """)
+
+    @property
+    def identity(self):
+        """Same vector space as the wrapped client."""
+        return getattr(self.embeddings, "identity", self.model)
+
+    def _connection(self):
+        """One connection per thread; WAL lets Streamlit sessions read while ingestion writes."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _lookup(self, hashes):
+        """Returns {text_hash: vector} for every hash already in the cache."""
+        found = {}
+        conn = self._connection()
+        for i in range(0, len(hashes), _LOOKUP_CHUNK):
+            chunk = hashes[i:i + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" for _ in chunk)
+            rows = conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                (self.model, *chunk),
+            )
+            for key, blob in rows:
+                found[bytes(key)] = np.frombuffer(blob, dtype="float32").tolist()
+        return found
+
+    def _store(self, items):
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dim, vector) VALUES (?, ?, ?, ?)",
+                [
+                    (self.model, key, len(vector), np.asarray(vector, dtype="float32").tobytes())
+                    for key, vector in items
+                ],
+            )
+
+    def embed_documents(self, texts):
+        """Returns cached vectors and embeds only texts this model has never seen."""
+        texts = list(texts)
+        hashes = [text_hash(text) for text in texts]
+        cached = self._lookup(list(set(hashes)))
+
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self._store(new_items)
+            cached.update(new_items)
+
+        return [cached[key] for key in hashes]
+
+    def embed_query(self, text):
+        """
+        Repeated questions are served from the in-memory query tier (or from the documents
+        table, if the same text was indexed); new ones are embedded but never persisted.
+        """
+        now = time.monotonic()
+        with self._queries_lock:
+            entry = self._queries.get(text)
+            if entry is not None and entry[0] > now:
+                self._queries.move_to_end(text)
+                return entry[1]
+
+        vector = self._lookup([text_hash(text)]).get(text_hash(text))
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+
+        with self._queries_lock:
+            self._queries[text] = (now + self.query_ttl_seconds, vector)
+            self._queries.move_to_end(text)
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+        return vector
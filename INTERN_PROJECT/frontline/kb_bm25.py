@@ -0,0 +1,158 @@
+import json
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from kb_ingest import write_json_atomic
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Common English and support-script words that carry no retrieval signal
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i if in is it me my of on or so the this to
+what when where which who why will with you your we our us please help tell about
+""".split())
+
+
+def tokenize(text):
+    """Lower-cases text into alphanumeric terms, dropping stopwords."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over the knowledge base chunks.
+
+    Documents are addressed by position, matching the FAISS index and docstore order,
+    so keyword and vector hits can be fused. The index is saved as JSON next to
+    ``index.faiss`` and rebuilt whenever the chunk set changes.
+    """
+
+    def __init__(self, postings=None, doc_lengths=None, k1=1.5, b=0.75):
+        self.postings = postings or {}
+        self.doc_lengths = doc_lengths or []
+        self.k1 = k1
+        self.b = b
+        total = sum(self.doc_lengths)
+        self.avg_doc_length = total / len(self.doc_lengths) if self.doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, texts):
+        postings = defaultdict(list)
+        doc_lengths = []
+        for position, text in enumerate(texts):
+            terms = tokenize(text)
+            doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings[term].append([position, frequency])
+        return cls(dict(postings), doc_lengths)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["postings"], data["doc_lengths"])
+
+    def save(self, path):
+        write_json_atomic(path, {"postings": self.postings, "doc_lengths": self.doc_lengths})
+
+    @property
+    def document_count(self):
+        return len(self.doc_lengths)
+
+    def document_frequency(self, term):
+        return len(self.postings.get(term, ()))
+
+    def idf(self, term):
+        n = self.document_count
+        df = self.document_frequency(term)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=10):
+        """Returns up to ``k`` ``(position, score)`` pairs, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for position, frequency in postings:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[position] / (self.avg_doc_length or 1)
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def is_distinctive(self, term, max_document_ratio=0.3):
+        """True for terms that occur in the index but only in a minority of chunks (product names)."""
+        df = self.document_frequency(term)
+        return 0 < df <= max(1, max_document_ratio * self.document_count)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever that fuses BM25 keyword hits with FAISS vector hits.
+
+    ``mode`` is ``"hybrid"`` (reciprocal rank fusion of both lists), ``"vector"`` or
+    ``"keyword"``. In hybrid mode, short queries that name a rare knowledge-base term
+    (for example "Smarta", "Rudishiwa" or "eSIM") are answered from BM25 alone and
+    never send an embedding request to Ollama.
+
+    The vector side keeps the maximal marginal relevance search the plain FAISS retriever
+    used: ``k`` hits picked from the ``fetch_k`` nearest chunks, trading similarity against
+    diversity by ``lambda_mult``, so near-duplicate chunks do not crowd out the others.
+    """
+
+    vectorstore: object
+    bm25: object
+    k: int = 5
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+    mode: str = "hybrid"
+    rrf_k: int = 60
+    exact_term_max_terms: int = 4
+
+    def _document(self, position):
+        doc_id = self.vectorstore.index_to_docstore_id[position]
+        return self.vectorstore.docstore.search(doc_id)
+
+    def _vector_positions(self, query):
+        """Positions picked by maximal marginal relevance among the ``fetch_k`` nearest chunks."""
+        embedding = np.asarray([self.vectorstore.embeddings.embed_query(query)], dtype="float32")
+        _, positions = self.vectorstore.index.search(embedding, self.fetch_k)
+        candidates = [int(p) for p in positions[0] if p != -1]
+        if not candidates:
+            return []
+        vectors = [self.vectorstore.index.reconstruct(position) for position in candidates]
+        selected = maximal_marginal_relevance(embedding, vectors, k=self.k, lambda_mult=self.lambda_mult)
+        return [candidates[i] for i in selected]
+
+    def is_exact_term_query(self, query):
+        """Short queries made only of indexed terms, at least one of them distinctive."""
+        terms = tokenize(query)
+        if not 0 < len(terms) <= self.exact_term_max_terms:
+            return False
+        if any(self.bm25.document_frequency(term) == 0 for term in terms):
+            return False
+        return any(self.bm25.is_distinctive(term) for term in terms)
+
+    def _get_relevant_documents(self, query, *, run_manager: CallbackManagerForRetrieverRun):
+        keyword_hits = [position for position, _ in self.bm25.search(query, self.fetch_k)]
+
+        if self.mode == "keyword" or (self.mode == "hybrid" and keyword_hits and self.is_exact_term_query(query)):
+            return [self._document(position) for position in keyword_hits[:self.k]]
+
+        vector_hits = self._vector_positions(query)
+        if self.mode == "vector":
+            return [self._document(position) for position in vector_hits[:self.k]]
+
+        # Reciprocal rank fusion
+        fused = defaultdict(float)
+        for ranking in (keyword_hits, vector_hits):
+            for rank, position in enumerate(ranking):
+                fused[position] += 1.0 / (self.rrf_k + rank + 1)
+        best = sorted(fused, key=fused.get, reverse=True)[:self.k]
+        return [self._document(position) for position in best]
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from kb_bm25 import BM25Index
+from kb_ingest import KNOWLEDGE_BASE_DIR, file_sha256, iter_parsed_pdfs, write_json_atomic
+
+# The persisted index sits beside the knowledge base PDFs
+INDEX_DIR = os.path.join(KNOWLEDGE_BASE_DIR, ".index")
+
+MANIFEST_FILE = "manifest.json"
+FAISS_FILE = "index.faiss"
+BM25_FILE = "bm25.json"
+
+
+def _write_atomic(path, write):
+    """
+    Calls ``write(tmp_path)`` for a temp file beside ``path`` and renames it over ``path``, as
+    ``write_json_atomic`` does for JSON, so an interrupted write never leaves a truncated file.
+    """
+    # Same extension as the target, so np.save does not append another ".npy"
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.",
+                                    suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class KnowledgeBaseIndex:
+    """
+    FAISS index over the knowledge base PDFs, persisted on disk and updated incrementally.
+
+    Every PDF is keyed by the SHA-256 of its contents. Its chunks and their vectors are stored
+    under ``chunks/<sha>.json`` and ``vectors/<sha>.npy``, so only PDFs that were added or
+    changed get re-chunked and re-embedded. The files of deleted PDFs, and of the previous
+    contents of changed ones, are removed. When nothing changed, the combined ``index.faiss``
+    is read back instead of being rebuilt. A BM25 keyword index over the same chunks
+    (``bm25.json``) is rebuilt alongside it and exposed as ``self.bm25``.
+    """
+
+    def __init__(self, embeddings, text_splitter, model_name, index_dir=INDEX_DIR):
+        self.embeddings = embeddings
+        self.text_splitter = text_splitter
+        self.model_name = model_name
+        self.index_dir = index_dir
+        self.chunks_dir = os.path.join(index_dir, "chunks")
+        self.vectors_dir = os.path.join(index_dir, "vectors")
+        self.manifest = {}
+        self.bm25 = None
+
+    # --- Manifest ---
+
+    def _manifest_path(self):
+        return os.path.join(self.index_dir, MANIFEST_FILE)
+
+    def _load_manifest(self):
+        """Loads the manifest, discarding it when it was built with another embedding model."""
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {"model": self.model_name, "documents": {}}
+        if manifest.get("model") != self.model_name:
+            return {"model": self.model_name, "documents": {}}
+        return manifest
+
+    @property
+    def version(self):
+        """Identifies the current index contents (model plus every PDF's hash)."""
+        return self.manifest.get("version", "")
+
+    @staticmethod
+    def _compute_version(model_name, documents):
+        digest = hashlib.sha256(model_name.encode("utf-8"))
+        for name in sorted(documents):
+            digest.update(f"\0{name}\0{documents[name]['sha256']}".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    # --- Per-document storage ---
+
+    def _chunk_path(self, sha):
+        return os.path.join(self.chunks_dir, f"{sha}.json")
+
+    def _vector_path(self, sha):
+        return os.path.join(self.vectors_dir, f"{sha}.npy")
+
+    def _is_cached(self, sha):
+        return os.path.exists(self._chunk_path(sha)) and os.path.exists(self._vector_path(sha))
+
+    def _embed_document(self, sha, pages):
+        """Chunks and embeds one PDF's pages and stores the result under its content hash."""
+        chunks = self.text_splitter.split_documents(pages)
+        vectors = np.asarray(
+            self.embeddings.embed_documents([chunk.page_content for chunk in chunks]),
+            dtype="float32",
+        )
+        write_json_atomic(
+            self._chunk_path(sha),
+            [{"page_content": c.page_content, "metadata": c.metadata} for c in chunks],
+        )
+        _write_atomic(self._vector_path(sha), lambda tmp_path: np.save(tmp_path, vectors))
+        return len(chunks)
+
+    def _remove_document(self, sha, documents):
+        """Deletes a hash's files unless another PDF still has the same contents."""
+        if any(entry["sha256"] == sha for entry in documents.values()):
+            return
+        for path in (self._chunk_path(sha), self._vector_path(sha)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # --- Sync ---
+
+    def sync(self, pdf_paths, max_workers=None):
+        """
+        Brings the on-disk index in line with ``pdf_paths`` and returns a LangChain FAISS store.
+        Only PDFs whose content hash is new are parsed (in a process pool), re-chunked and
+        re-embedded; each one is embedded as soon as its parse finishes.
+        """
+        os.makedirs(self.chunks_dir, exist_ok=True)
+        os.makedirs(self.vectors_dir, exist_ok=True)
+
+        previous = self._load_manifest()
+        old_documents = previous.get("documents", {})
+        documents = {}
+        to_parse = {}
+        changed = False
+
+        for pdf_path in pdf_paths:
+            name = os.path.basename(pdf_path)
+            sha = file_sha256(pdf_path)
+            old_entry = old_documents.get(name)
+            if old_entry and old_entry["sha256"] == sha and self._is_cached(sha):
+                documents[name] = old_entry
+                continue
+            changed = True
+            if self._is_cached(sha):
+                # Same contents were already embedded (renamed or reverted file)
+                documents[name] = {"sha256": sha, "chunks": len(self._read_chunks(sha))}
+            else:
+                to_parse[pdf_path] = sha
+
+        for pdf_path, pages in iter_parsed_pdfs(to_parse, max_workers=max_workers):
+            sha = to_parse[pdf_path]
+            documents[os.path.basename(pdf_path)] = {
+                "sha256": sha,
+                "chunks": self._embed_document(sha, pages),
+            }
+
+        for name, entry in old_documents.items():
+            if name not in documents:
+                changed = True
+            if documents.get(name, {}).get("sha256") != entry["sha256"]:
+                # Deleted, or its contents changed: the old hash's chunks and vectors are stale
+                self._remove_document(entry["sha256"], documents)
+
+        self.manifest = {
+            "model": self.model_name,
+            "documents": documents,
+            "version": self._compute_version(self.model_name, documents),
+        }
+        faiss_path = os.path.join(self.index_dir, FAISS_FILE)
+        bm25_path = os.path.join(self.index_dir, BM25_FILE)
+        rebuild = changed or not os.path.exists(faiss_path) or not os.path.exists(bm25_path)
+        if rebuild:
+            index = self._build_faiss(documents)
+            _write_atomic(faiss_path, lambda tmp_path: faiss.write_index(index, tmp_path))
+        else:
+            index = faiss.read_index(faiss_path)
+        vector_store = self._as_vector_store(index, documents)
+
+        if rebuild:
+            # Positions follow index_to_docstore_id, so BM25 and FAISS hits can be fused
+            ids = vector_store.index_to_docstore_id
+            self.bm25 = BM25Index.build(
+                vector_store.docstore.search(ids[position]).page_content for position in range(len(ids))
+            )
+            self.bm25.save(bm25_path)
+            write_json_atomic(self._manifest_path(), self.manifest)
+        else:
+            self.bm25 = BM25Index.load(bm25_path)
+        return vector_store
+
+    def _read_chunks(self, sha):
+        with open(self._chunk_path(sha), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _ordered_shas(self, documents):
+        return [documents[name]["sha256"] for name in sorted(documents)]
+
+    def _build_faiss(self, documents):
+        """Concatenates the per-PDF vector files into one flat L2 index."""
+        arrays = [np.load(self._vector_path(sha), mmap_mode="r") for sha in self._ordered_shas(documents)]
+        arrays = [a for a in arrays if len(a)]
+        if arrays:
+            vectors = np.ascontiguousarray(np.concatenate(arrays), dtype="float32")
+        else:
+            dimension = len(self.embeddings.embed_query("dimension probe"))
+            vectors = np.zeros((0, dimension), dtype="float32")
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        return index
+
+    def _as_vector_store(self, index, documents):
+        """Wraps the raw FAISS index and stored chunks in LangChain's FAISS vector store."""
+        docstore = {}
+        index_to_docstore_id = {}
+        position = 0
+        for sha in self._ordered_shas(documents):
+            for i, chunk in enumerate(self._read_chunks(sha)):
+                doc_id = f"{sha}:{i}"
+                docstore[doc_id] = Document(page_content=chunk["page_content"], metadata=chunk["metadata"])
+                index_to_docstore_id[position] = doc_id
+                position += 1
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(docstore),
+            index_to_docstore_id=index_to_docstore_id,
+        )
+
+    def clear(self):
+        """Deletes the persisted index so the next sync rebuilds it from scratch."""
+        shutil.rmtree(self.index_dir, ignore_errors=True)
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from langchain_community.document_loaders import PDFPlumberLoader
+
+# Knowledge base PDFs live next to this file
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+KNOWLEDGE_BASE_DIR = os.path.join(BASE_DIR, "knowledge_base")
+
+
+def discover_pdfs(pdf_dir=KNOWLEDGE_BASE_DIR):
+    """Returns the sorted paths of every PDF directly inside the knowledge base directory."""
+    if not os.path.isdir(pdf_dir):
+        return []
+    return sorted(
+        os.path.join(pdf_dir, name)
+        for name in os.listdir(pdf_dir)
+        if name.lower().endswith(".pdf") and not name.startswith(".")
+    )
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Returns the hex SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, payload):
+    """
+    Writes JSON to a temp file beside ``path`` and renames it over ``path``, so readers never
+    see half a file and concurrent writers never share a temp file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def parse_pdf(pdf_path):
+    """
+    Parses one PDF into a Document per page.
+    Top-level so it can run inside a worker process.
+    """
+    pages = PDFPlumberLoader(pdf_path).load()
+    name = os.path.basename(pdf_path)
+    for page in pages:
+        page.metadata["source"] = name
+    return pages
+
+
+def iter_parsed_pdfs(pdf_paths, max_workers=None):
+    """
+    Parses PDFs in a process pool and yields ``(pdf_path, pages)`` as each one finishes.
+
+    pdfplumber is CPU-bound, so the pool spreads documents over cores while the caller
+    chunks and embeds the PDFs that are already done. A single PDF is parsed in-process
+    to skip the pool start-up cost.
+    """
+    pdf_paths = list(pdf_paths)
+    if not pdf_paths:
+        return
+    if len(pdf_paths) == 1:
+        yield pdf_paths[0], parse_pdf(pdf_paths[0])
+        return
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(pdf_paths))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(parse_pdf, path): path for path in pdf_paths}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -0,0 +1,160 @@
+import fcntl
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+
+import pdfplumber
+
+from embedding_cache import CACHE_DIR
+from kb_ingest import discover_pdfs, file_sha256, write_json_atomic
+
+# Page extracts live under pages/<pdf sha256>/, so identical PDFs share one entry
+PAGES_DIR = os.path.join(CACHE_DIR, "pages")
+NAMES_FILE = "names.json"
+MANIFEST_FILE = "manifest.json"
+
+THUMBNAIL_WIDTH = 480
+
+
+@contextmanager
+def _try_lock(path):
+    """
+    Holds an exclusive lock on ``path`` for the block and yields True, or yields False at
+    once if another builder (thread or process) holds it.
+    """
+    fd = os.open(path, os.O_CREAT | os.O_RDWR)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def render_pdf_pages(pdf_path, out_dir, thumbnail_width=THUMBNAIL_WIDTH):
+    """
+    Writes ``page-<n>.txt`` and ``page-<n>.png`` for every page of a PDF, then the manifest.
+    Top-level so it can run inside a worker process. Returns the page count.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with pdfplumber.open(pdf_path) as pdf:
+        for number, page in enumerate(pdf.pages):
+            with open(os.path.join(out_dir, f"page-{number}.txt"), "w", encoding="utf-8") as f:
+                f.write(page.extract_text() or "")
+            page.to_image(width=thumbnail_width).save(os.path.join(out_dir, f"page-{number}.png"))
+        page_count = len(pdf.pages)
+    # The manifest is written last: its presence marks the entry as complete
+    write_json_atomic(
+        os.path.join(out_dir, MANIFEST_FILE),
+        {"source": os.path.basename(pdf_path), "pages": page_count},
+    )
+    return page_count
+
+
+class PageCache:
+    """
+    Content-addressed cache of per-page text and PNG thumbnails for the knowledge base PDFs.
+
+    ``build`` renders each PDF once per content hash (in a process pool); ``get_page`` then
+    serves a cited page from disk without opening the PDF. ``names.json`` maps the current
+    file names to their hashes.
+
+    The chat and knowledge-base pages can both start a build. Each entry is rendered under
+    a ``<sha>.lock`` file lock, so one builder renders it and the others skip it.
+    """
+
+    def __init__(self, cache_dir=PAGES_DIR):
+        self.cache_dir = cache_dir
+        self._names = None
+
+    def _entry_dir(self, sha):
+        return os.path.join(self.cache_dir, sha)
+
+    def _lock_path(self, sha):
+        return os.path.join(self.cache_dir, f"{sha}.lock")
+
+    def _is_complete(self, sha):
+        return os.path.exists(os.path.join(self._entry_dir(sha), MANIFEST_FILE))
+
+    def _load_names(self):
+        try:
+            with open(os.path.join(self.cache_dir, NAMES_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def build(self, pdf_paths=None, max_workers=None):
+        """Renders every PDF whose contents are not cached yet. Returns the number rendered."""
+        pdf_paths = discover_pdfs() if pdf_paths is None else list(pdf_paths)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        names = {}
+        to_render = {}
+        for path in pdf_paths:
+            sha = file_sha256(path)
+            names[os.path.basename(path)] = sha
+            if not self._is_complete(sha):
+                to_render[sha] = path
+
+        with ExitStack() as locks:
+            # Entries another builder is rendering (or has just finished) are left to it
+            to_render = {
+                sha: path for sha, path in to_render.items()
+                if locks.enter_context(_try_lock(self._lock_path(sha))) and not self._is_complete(sha)
+            }
+            if len(to_render) == 1:
+                sha, path = next(iter(to_render.items()))
+                render_pdf_pages(path, self._entry_dir(sha))
+            elif to_render:
+                max_workers = min(max_workers or os.cpu_count() or 1, len(to_render))
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = [
+                        executor.submit(render_pdf_pages, path, self._entry_dir(sha))
+                        for sha, path in to_render.items()
+                    ]
+                    for future in as_completed(futures):
+                        future.result()
+
+        write_json_atomic(os.path.join(self.cache_dir, NAMES_FILE), names)
+        self._names = names
+        return len(to_render)
+
+    def get_page(self, source, page):
+        """
+        Returns ``{"text", "thumbnail"}`` for a 0-based page of a PDF (by file name), or None
+        when that page has not been rendered yet. ``thumbnail`` is a PNG file path.
+        """
+        if self._names is None or source not in self._names:
+            self._names = self._load_names()
+        sha = self._names.get(source)
+        if sha is None or not self._is_complete(sha):
+            return None
+        entry_dir = self._entry_dir(sha)
+        text_path = os.path.join(entry_dir, f"page-{page}.txt")
+        if not os.path.exists(text_path):
+            return None
+        with open(text_path, encoding="utf-8") as f:
+            text = f.read()
+        thumbnail = os.path.join(entry_dir, f"page-{page}.png")
+        return {"text": text, "thumbnail": thumbnail if os.path.exists(thumbnail) else None}
+
+
+def start_background_build(page_cache, pdf_paths=None):
+    """Renders missing pages on a daemon thread so the UI never waits for it."""
+    thread = threading.Thread(target=page_cache.build, args=(pdf_paths,), name="kb-page-cache", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    # Offline stage: python kb_pages.py
+    rendered = PageCache().build()
+    print(f"Rendered {rendered} PDF(s) into {PAGES_DIR}")
@@ -0,0 +1,128 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from embedding_cache import CACHE_DIR
+from kb_ingest import discover_pdfs, file_sha256, iter_parsed_pdfs
+
+SEARCH_DB_PATH = os.path.join(CACHE_DIR, "kb_search.sqlite")
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def to_fts_query(text):
+    """
+    Turns free text from the search box into a safe FTS5 query.
+    Every word must match; the last one also matches as a prefix so results update while typing.
+    """
+    terms = _TERM.findall(text.lower())
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class KnowledgeBaseSearch:
+    """
+    SQLite FTS5 full-text index over the pages of the knowledge base PDFs.
+
+    Each PDF is tracked by content hash in ``documents``; ``sync`` re-extracts only PDFs
+    that were added or changed and drops removed ones. ``search`` ranks pages with BM25
+    and returns highlighted snippets without touching the LLM or the embedding model.
+    """
+
+    def __init__(self, db_path=SEARCH_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    name TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    pages INTEGER NOT NULL,
+                    indexed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+                    text,
+                    source UNINDEXED,
+                    page UNINDEXED,
+                    tokenize = 'porter unicode61'
+                )
+            """)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def documents(self):
+        """Returns ``{name: {"sha256", "pages"}}`` for every indexed PDF."""
+        rows = self._connection().execute("SELECT name, sha256, pages FROM documents ORDER BY name")
+        return {row["name"]: {"sha256": row["sha256"], "pages": row["pages"]} for row in rows}
+
+    def sync(self, pdf_paths=None, max_workers=None):
+        """Indexes new or changed PDFs and removes deleted ones. Returns the number of PDFs re-indexed."""
+        pdf_paths = discover_pdfs() if pdf_paths is None else list(pdf_paths)
+        indexed = self.documents()
+        current = {os.path.basename(path): path for path in pdf_paths}
+
+        to_index = {}
+        for name, path in current.items():
+            sha = file_sha256(path)
+            if indexed.get(name, {}).get("sha256") != sha:
+                to_index[path] = sha
+
+        conn = self._connection()
+        removed = [name for name in indexed if name not in current]
+        if removed:
+            with conn:
+                for name in removed:
+                    conn.execute("DELETE FROM pages WHERE source = ?", (name,))
+                    conn.execute("DELETE FROM documents WHERE name = ?", (name,))
+
+        for pdf_path, pages in iter_parsed_pdfs(to_index, max_workers=max_workers):
+            name = os.path.basename(pdf_path)
+            with conn:
+                conn.execute("DELETE FROM pages WHERE source = ?", (name,))
+                conn.executemany(
+                    "INSERT INTO pages (text, source, page) VALUES (?, ?, ?)",
+                    [(page.page_content, name, page.metadata.get("page", i)) for i, page in enumerate(pages)],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (name, sha256, pages, indexed_at) VALUES (?, ?, ?, ?)",
+                    (name, to_index[pdf_path], len(pages), time.time()),
+                )
+        return len(to_index)
+
+    def search(self, text, limit=20):
+        """
+        Returns the best matching pages as dicts with ``source``, ``page`` (0-based),
+        ``snippet`` (matches wrapped in ``**``) and ``score`` (lower is better).
+        """
+        query = to_fts_query(text)
+        if not query:
+            return []
+        rows = self._connection().execute(
+            """
+            SELECT source, page,
+                   snippet(pages, 0, '**', '**', ' … ', 16) AS snippet,
+                   bm25(pages) AS score
+            FROM pages
+            WHERE pages MATCH ?
+            ORDER BY score
+            LIMIT ?
+            """,
+            (query, limit),
+        )
+        return [dict(row) for row in rows]
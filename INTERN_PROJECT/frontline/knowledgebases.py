@@ -1,5 +1,10 @@
 import streamlit as st
 import os
+import time
+
+from kb_ingest import KNOWLEDGE_BASE_DIR, discover_pdfs
+from kb_pages import PageCache, start_background_build
+from kb_search import KnowledgeBaseSearch
 
 # --- Page Setup ---
 st.set_page_config(
@@ -9,7 +14,47 @@ st.set_page_config(
 )
 
 
-PDF_DIR = "/Users/danielwanganga/Documents/Airtel_AI/SEs/knowledge_base/pdfs"
+PDF_DIR = KNOWLEDGE_BASE_DIR
+
+@st.cache_resource
+def get_search_index():
+    """Full-text index over the knowledge base pages, brought up to date once per process"""
+    search_index = KnowledgeBaseSearch()
+    search_index.sync(discover_pdfs(PDF_DIR))
+    return search_index
+
+@st.cache_resource
+def get_page_cache():
+    """Cached page text and thumbnails; pages not rendered yet are built in the background"""
+    page_cache = PageCache()
+    start_background_build(page_cache, discover_pdfs(PDF_DIR))
+    return page_cache
+
+def render_search_results(query):
+    """Shows ranked page-level matches for the search box"""
+    try:
+        started = time.perf_counter()
+        hits = get_search_index().search(query, limit=20)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        st.error(f"Knowledge base search failed: {e}")
+        return
+    
+    st.caption(f"{len(hits)} result(s) in {elapsed_ms:.1f} ms")
+    if not hits:
+        st.info("No pages match your search. Try fewer or different words.")
+        return
+    page_cache = get_page_cache()
+    for hit in hits:
+        with st.container(border=True):
+            st.markdown(f"**📄 {hit['source']}** · page {hit['page'] + 1}")
+            st.markdown(hit["snippet"].replace("\n", " "))
+            cached_page = page_cache.get_page(hit["source"], hit["page"])
+            if cached_page:
+                with st.expander("View page"):
+                    if cached_page["thumbnail"]:
+                        st.image(cached_page["thumbnail"], width=360)
+                    st.text(cached_page["text"])
 
 def inject_custom_css():
     st.html("""
@@ -419,6 +464,9 @@ st.html("""
 
 search_query = st.text_input("", placeholder="Search for offers, guides, or SOPs", label_visibility="collapsed")
 
+if search_query.strip():
+    render_search_results(search_query)
+
 # Campaigns Section
 st.html("""
 <div class="section-header">
@@ -567,7 +615,7 @@ with st.sidebar:
         
         # Show current PDF files
 if os.path.exists(PDF_DIR):
-            pdf_files = [f for f in os.listdir(PDF_DIR) if f.endswith('.pdf')]
+            pdf_files = [os.path.basename(path) for path in discover_pdfs(PDF_DIR)]
             st.write(f"📁 Current PDFs ({len(pdf_files)}):")
             for pdf_file in pdf_files:
                 st.write(f"• {pdf_file}")
@@ -1,57 +1,32 @@
 import streamlit as st
+import os
 import sqlite3
+import sys
 from datetime import date, timedelta, datetime
 
-# --- SQLite Database Configuration ---
-DB_NAME = "/Users/danielwanganga/Documents/GitHub/PROJECT_FRONTLINE/INTERN_PROJECT/leave_management.db"
+# --- Shared data-access layer (INTERN_PROJECT/leave_db.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from leave_db import LeaveRepository
 
-def init_db():
-    """Initializes and returns a connection to the SQLite database."""
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row  # This allows accessing columns by name (e.g., row['column_name'])
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
+repo = LeaveRepository()
 
-# --- CRUD Operations (SQLite3 versions) ---
+# --- CRUD Operations (pooled SQLite connections via leave_db) ---
 
 def get_employee_by_id(employee_uuid):
-    """Fetches employee details by UUID from employee_table_rows."""
-    conn = init_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT uuid, First_Name, Surname_Name, Email FROM employee_table WHERE uuid = ?", (employee_uuid,))
-            employee = cursor.fetchone()
-            if employee:
-                return dict(employee)
-            return None
-        except sqlite3.Error as e:
-            st.error(f"Error fetching employee by ID: {str(e)}")
-            return None
-        finally:
-            conn.close()
-    return None
+    """Fetches employee details by UUID from employee_table."""
+    try:
+        return repo.get_employee_by_id(employee_uuid)
+    except sqlite3.Error as e:
+        st.error(f"Error fetching employee by ID: {str(e)}")
+        return None
 
 def get_employee_by_name(employee_name):
-    """Fetches employee details by First_Name from employee_table_rows."""
-    conn = init_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT uuid, First_Name FROM employee_table WHERE First_Name = ?", (employee_name,))
-            employee = cursor.fetchone()
-            if employee:
-                return dict(employee)
-            return None
-        except sqlite3.Error as e:
-            st.error(f"Error fetching employee by name: {str(e)}")
-            return None
-        finally:
-            conn.close()
-    return None
+    """Fetches employee details by First_Name from employee_table."""
+    try:
+        return repo.get_employee_by_name(employee_name)
+    except sqlite3.Error as e:
+        st.error(f"Error fetching employee by name: {str(e)}")
+        return None
 
 def get_latest_leave_entry_for_employee_by_id(employee_uuid):
     """
@@ -63,184 +38,78 @@ def get_latest_leave_entry_for_employee_by_id(employee_uuid):
     Returns:
         dict or None: The latest leave entry for the employee, or None if not found
     """
-    conn = init_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, leave_id, leave_type, start_date, end_date, description, status, decline_reason, recall_reason
-                FROM leave_entries
-                WHERE leave_id = ?
-                ORDER BY start_date DESC, id DESC -- Order by ID too for deterministic "latest"
-                LIMIT 1
-            """, (employee_uuid,))
-            leave_entry = cursor.fetchone()
-            if leave_entry:
-                return dict(leave_entry)
-            return None
-        except sqlite3.Error as e:
-            st.error(f"Error fetching latest leave entry for employee: {str(e)}")
-            return None
-        finally:
-            conn.close()
-    return None
+    try:
+        return repo.get_latest_leave_for_employee(employee_uuid)
+    except sqlite3.Error as e:
+        st.error(f"Error fetching latest leave entry for employee: {str(e)}")
+        return None
 
 def apply_for_leave(employee_uuid, employee_name, leave_type, start_date, end_date, description, attachment=None):
     """Adds a new leave application to the leave table."""
-    conn = init_db()
-    if conn:
-        try:
-            # Ensure dates are in ISO format for SQLite storage
-            if isinstance(start_date, date):
-                start_date_str = start_date.isoformat()
-            else: # Assume string, try to convert
-                start_date_str = datetime.fromisoformat(start_date).date().isoformat()
-
-            if isinstance(end_date, date):
-                end_date_str = end_date.isoformat()
-            else: # Assume string, try to convert
-                end_date_str = datetime.fromisoformat(end_date).date().isoformat()
-
-            # SQLite stores booleans as 0 (False) or 1 (True)
-            attachment_int = 1 if attachment else 0
-
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO leave_entries (leave_id, employee_name, leave_type, start_date, end_date, description, attachment, status, decline_reason, recall_reason)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (employee_uuid, employee_name, leave_type, start_date_str, end_date_str, description, attachment_int, "Pending", "", ""))
-            conn.commit()
-            return True, "Leave request submitted successfully!"
-        except sqlite3.Error as e:
-            return False, f"Error submitting leave request: {str(e)}"
-        finally:
-            conn.close()
-    return False, "Database connection failed."
+    try:
+        repo.apply_for_leave(employee_uuid, employee_name, leave_type, start_date, end_date, description, attachment)
+        return True, "Leave request submitted successfully!"
+    except (sqlite3.Error, ValueError) as e:
+        return False, f"Error submitting leave request: {str(e)}"
 
 def get_leave_history(employee_uuid):
     """Fetches the leave history for a specific employee from leave table."""
-    conn = init_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, leave_type, start_date, end_date, description, status, decline_reason, recall_reason
-                FROM leave_entries
-                WHERE leave_id = ?
-                ORDER BY start_date DESC
-            """, (employee_uuid,))
-            leave_history = cursor.fetchall()
-            return [dict(row) for row in leave_history]
-        except sqlite3.Error as e:
-            st.error(f"Error fetching leave history: {str(e)}")
-            return []
-        finally:
-            conn.close()
-    return []
+    try:
+        return repo.get_leave_history(employee_uuid)
+    except sqlite3.Error as e:
+        st.error(f"Error fetching leave history: {str(e)}")
+        return []
 
 def get_pending_leaves_for_employee(employee_uuid):
     """Fetches pending leave requests for a specific employee from leave table."""
-    conn = init_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, leave_id, employee_name, leave_type, start_date, end_date, description
-                FROM leave_entries
-                WHERE leave_id = ? AND status = 'Pending'
-            """, (employee_uuid,))
-            pending_leaves = cursor.fetchall()
-            return [dict(row) for row in pending_leaves]
-        except sqlite3.Error as e:
-            st.error(f"Error fetching pending leaves: {str(e)}")
-            return []
-        finally:
-            conn.close()
-    return []
+    try:
+        return repo.get_leaves_by_status("Pending", employee_uuid=employee_uuid)
+    except sqlite3.Error as e:
+        st.error(f"Error fetching pending leaves: {str(e)}")
+        return []
 
 def update_leave_status(leave_request_id, new_status, reason=""): # Default reason to empty string
     """Updates the status of a leave request in leave table using its 'id'."""
     if not leave_request_id:
         return False, "Invalid leave ID"
-        
-    conn = init_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            update_sql = "UPDATE leave_entries SET status = ?"
-            params = [new_status]
-
-            if new_status == "Declined":
-                update_sql += ", decline_reason = ?, recall_reason = ''" # Clear recall_reason
-                params.append(reason)
-            elif new_status in ["Recalled", "Withdrawn"]:
-                update_sql += ", recall_reason = ?, decline_reason = ''" # Clear decline_reason
-                params.append(reason)
-            elif new_status == "Approved": # Clear both reasons if approved
-                update_sql += ", decline_reason = '', recall_reason = ''"
-            
-            update_sql += " WHERE id = ?" # Use 'id' from leave table
-            params.append(leave_request_id)
-
-            cursor.execute(update_sql, tuple(params))
-            conn.commit()
-
-            if cursor.rowcount > 0:
-                return True, f"Leave status updated to {new_status}"
-            else:
-                return False, "Failed to update leave status (leave request not found)."
-        except sqlite3.Error as e:
-            return False, f"Error updating leave status: {str(e)}"
-        finally:
-            conn.close()
-    return False, "Database connection failed."
+    try:
+        if repo.update_leave_status(leave_request_id, new_status, reason):
+            return True, f"Leave status updated to {new_status}"
+        return False, "Failed to update leave status (leave request not found)."
+    except sqlite3.Error as e:
+        return False, f"Error updating leave status: {str(e)}"
 
 def get_employee_leave_entitlements(employee_uuid):
     """Fetches leave entitlements for a given employee from leave_entitlements table."""
-    conn = init_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM leave_entitlements_data WHERE leave_id = ?", (employee_uuid,))
-            entitlements = cursor.fetchone()
-            if entitlements:
-                return dict(entitlements)
-            return None
-        except sqlite3.Error as e:
-            st.error(f"Error fetching employee leave entitlements: {str(e)}")
-            return None
-        finally:
-            conn.close()
-    return None
+    try:
+        return repo.get_entitlements(employee_uuid)
+    except sqlite3.Error as e:
+        st.error(f"Error fetching employee leave entitlements: {str(e)}")
+        return None
 
 def get_employee_used_leave(employee_uuid, leave_type=None):
     """Calculates total used leave days for an employee, optionally by type, from leave table."""
-    conn = init_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            query_sql = "SELECT start_date, end_date FROM leave_entries WHERE leave_id = ? AND status = 'Approved'"
-            params = [employee_uuid]
-
-            if leave_type:
-                query_sql += " AND leave_type = ?"
-                params.append(leave_type)
-
-            cursor.execute(query_sql, tuple(params))
-            approved_leaves = cursor.fetchall()
-            used_days = 0
-            if approved_leaves:
-                for record in approved_leaves:
-                    start = datetime.fromisoformat(record['start_date']).date()
-                    end = datetime.fromisoformat(record['end_date']).date()
-                    used_days += (end - start).days + 1
-            return int(used_days)
-        except sqlite3.Error as e:
-            st.error(f"Error calculating used leave: {str(e)}")
-            return 0
-        finally:
-            conn.close()
-    return 0
+    try:
+        return repo.get_used_leave_days(employee_uuid, leave_type)
+    except sqlite3.Error as e:
+        st.error(f"Error calculating used leave: {str(e)}")
+        return 0
+
+def get_employee_leave_balance(employee_uuid, leave_type, leave_column):
+    """Entitled and used days for one leave type from the leave_balances ledger (one keyed read)."""
+    try:
+        return repo.get_leave_balance(employee_uuid, leave_type, leave_column)
+    except sqlite3.Error as e:
+        st.error(f"Error fetching leave balance: {str(e)}")
+        return {"entitled": None, "used": 0}
+
+def get_team_clashes(employee_uuid, start_date, end_date):
+    """Approved leaves of teammates (same manager) that overlap the requested dates."""
+    try:
+        return repo.get_team_clashes(employee_uuid, start_date, end_date)
+    except sqlite3.Error as e:
+        st.error(f"Error checking team leave clashes: {str(e)}")
+        return []
 
 def withdraw_leave(leave_id, recall_reason=None): # Renamed recall_leave to recall_reason for consistency
     """Marks a leave request as Withdrawn in leave table with an optional reason."""
@@ -395,12 +264,21 @@ with tabs[0]:
 
         leave_days_requested = (end - start).days + 1
 
-        entitlements = get_employee_leave_entitlements(employee_uuid) # Pass UUID
+        clashes = get_team_clashes(employee_uuid, start, end)
+        if clashes:
+            st.warning(
+                "**Team clash:** " + ", ".join(
+                    f"{leave['employee_name']} ({leave['leave_type']}, {leave['start_date']} to {leave['end_date']})"
+                    for leave in clashes
+                ) + " will also be away during these dates."
+            )
+
         leave_column = LEAVE_TYPE_MAPPING.get(leave_type)
+        balance = get_employee_leave_balance(employee_uuid, leave_type, leave_column) if leave_column else None
 
-        if entitlements and leave_column:
-            entitled_days = entitlements.get(leave_column, 0)
-            used_days = get_employee_used_leave(employee_uuid, leave_type) # Pass UUID
+        if balance and balance["entitled"] is not None:
+            entitled_days = balance["entitled"]
+            used_days = balance["used"]
             remaining_days = entitled_days - used_days - leave_days_requested
 
             st.info(f"**Entitled Days ({leave_type})**: {entitled_days}")
@@ -0,0 +1,287 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+_END_OF_STREAM = object()
+
+# Tokens a stream may run ahead of its reader before generation pauses
+STREAM_BUFFER = 256
+
+
+class DispatchRejected(RuntimeError):
+    """Raised when admission control turns a request away (queue full or too many per user)."""
+
+
+class _Job:
+    __slots__ = ("user_id", "prompt", "stream", "tokens", "space", "future", "task", "cancelled", "enqueued_at")
+
+    def __init__(self, user_id, prompt, stream):
+        self.user_id = user_id
+        self.prompt = prompt
+        self.stream = stream
+        # One extra place for the end-of-stream marker or the error
+        self.tokens = queue.Queue(maxsize=STREAM_BUFFER + 1) if stream else None
+        self.space = asyncio.Semaphore(STREAM_BUFFER) if stream else None
+        self.future = None if stream else Future()
+        self.task = None
+        self.cancelled = False
+        self.enqueued_at = time.monotonic()
+
+
+class LLMDispatcher:
+    """
+    Asyncio dispatch layer between Streamlit sessions and the single Ollama LLM.
+
+    Every session submits prompts here instead of calling the LLM directly. The
+    dispatcher runs its own event loop on a background thread and:
+
+    - admits a request only while the total queue is below ``max_queue_depth`` and the
+      user has fewer than ``max_per_user`` requests waiting (otherwise DispatchRejected),
+    - serves users round-robin so one busy agent cannot starve the others,
+    - keeps at most ``max_concurrency`` generations running against Ollama,
+    - optionally micro-batches non-streaming prompts (up to ``batch_size`` within
+      ``batch_window`` seconds) into one ``abatch`` call,
+    - records queue depth, in-flight count and queue wait times for ``metrics()``.
+
+    A stream runs at most ``STREAM_BUFFER`` tokens ahead of its reader. When the reader
+    abandons it (Streamlit rerun, stop button, disconnect) the job is dropped from the
+    queue, or its generation is cancelled and its slot released.
+    """
+
+    def __init__(self, llm, max_concurrency=2, max_queue_depth=64, max_per_user=2, batch_size=1, batch_window=0.02):
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_per_user = max_per_user
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+
+        self._lock = threading.Lock()
+        self._queues = {}          # user_id -> deque of jobs
+        self._turns = deque()      # users with waiting jobs, in round-robin order
+        self._queued = 0
+        self._in_flight = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._wait_times = deque(maxlen=500)
+
+        self._loop = asyncio.new_event_loop()
+        self._wakeup = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="llm-dispatcher", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    # --- Event loop ---
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._loop.create_task(self._schedule())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def _notify(self):
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _enqueue(self, job):
+        """Admission control; runs on the caller's thread."""
+        with self._lock:
+            user_queue = self._queues.get(job.user_id)
+            if self._queued >= self.max_queue_depth:
+                self._rejected += 1
+                raise DispatchRejected("The assistant is at capacity. Please try again in a moment.")
+            if user_queue is not None and len(user_queue) >= self.max_per_user:
+                self._rejected += 1
+                raise DispatchRejected("You already have questions waiting. Please wait for them to finish.")
+            if user_queue is None:
+                user_queue = self._queues[job.user_id] = deque()
+            if not user_queue:
+                self._turns.append(job.user_id)
+            user_queue.append(job)
+            self._queued += 1
+            self._admitted += 1
+        self._notify()
+
+    def _next_job(self, stream=None):
+        """Pops the next job round-robin across users (optionally only of one kind)."""
+        with self._lock:
+            for _ in range(len(self._turns)):
+                user_id = self._turns.popleft()
+                user_queue = self._queues[user_id]
+                if stream is not None and user_queue[0].stream != stream:
+                    self._turns.append(user_id)
+                    continue
+                job = user_queue.popleft()
+                if user_queue:
+                    self._turns.append(user_id)
+                else:
+                    del self._queues[user_id]
+                self._queued -= 1
+                self._wait_times.append(time.monotonic() - job.enqueued_at)
+                return job
+        return None
+
+    async def _schedule(self):
+        slots = asyncio.Semaphore(self.max_concurrency)
+        while True:
+            await slots.acquire()
+            job = self._next_job()
+            while job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                job = self._next_job()
+
+            if job.stream:
+                batch = [job]
+                runner = self._run_stream(job)
+            else:
+                batch = await self._collect_batch(job)
+                runner = self._run_batch(batch)
+            with self._lock:
+                self._in_flight += len(batch)
+            # Cancelling job.task (see _cancel_task) still runs _release_after's cleanup
+            job.task = self._loop.create_task(runner)
+            self._loop.create_task(self._release_after(job.task, slots, len(batch)))
+
+    async def _collect_batch(self, first_job):
+        """Gathers further non-streaming prompts for one ``abatch`` call."""
+        batch = [first_job]
+        if self.batch_size <= 1:
+            return batch
+        deadline = self._loop.time() + self.batch_window
+        while len(batch) < self.batch_size:
+            job = self._next_job(stream=False)
+            if job is not None:
+                batch.append(job)
+                continue
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _release_after(self, runner, slots, size):
+        try:
+            await runner
+        finally:
+            with self._lock:
+                self._in_flight -= size
+            slots.release()
+            # Wake the scheduler in case it is parked on an empty queue with work pending
+            self._wakeup.set()
+
+    async def _run_stream(self, job):
+        if job.cancelled:
+            return
+        try:
+            async for chunk in self.llm.astream(job.prompt):
+                if chunk.content:
+                    # Waits while the reader is STREAM_BUFFER tokens behind
+                    await job.space.acquire()
+                    job.tokens.put_nowait(chunk.content)
+            job.tokens.put_nowait(_END_OF_STREAM)
+            self._record(ok=True)
+        except Exception as e:
+            job.tokens.put_nowait(e)
+            self._record(ok=False)
+
+    async def _run_batch(self, batch):
+        try:
+            results = await self.llm.abatch([job.prompt for job in batch], return_exceptions=True)
+        except Exception as e:
+            results = [e] * len(batch)
+        for job, result in zip(batch, results):
+            if isinstance(result, Exception):
+                job.future.set_exception(result)
+                self._record(ok=False)
+            else:
+                job.future.set_result(getattr(result, "content", result))
+                self._record(ok=True)
+
+    def _cancel(self, job):
+        """Drops an abandoned stream: out of the queue if it has not started, else cancels it."""
+        with self._lock:
+            user_queue = self._queues.get(job.user_id)
+            if user_queue is not None and job in user_queue:
+                user_queue.remove(job)
+                if not user_queue:
+                    del self._queues[job.user_id]
+                    self._turns.remove(job.user_id)
+                self._queued -= 1
+                self._cancelled += 1
+                return
+        self._loop.call_soon_threadsafe(self._cancel_task, job)
+
+    def _cancel_task(self, job):
+        """Runs on the loop; cancelling the task releases its concurrency slot."""
+        job.cancelled = True
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+            with self._lock:
+                self._cancelled += 1
+
+    def _record(self, ok):
+        with self._lock:
+            if ok:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    # --- Public API (called from Streamlit script threads) ---
+
+    def submit(self, user_id, prompt):
+        """Queues a prompt and returns a Future with the full answer text."""
+        job = _Job(user_id, prompt, stream=False)
+        self._enqueue(job)
+        return job.future
+
+    def stream(self, user_id, prompt, timeout=300):
+        """
+        Queues a prompt and yields answer tokens as Ollama produces them. Closing the
+        generator early (or a ``timeout`` between tokens) cancels the generation.
+        """
+        job = _Job(user_id, prompt, stream=True)
+        self._enqueue(job)
+        finished = False
+        try:
+            while True:
+                item = job.tokens.get(timeout=timeout)
+                if item is _END_OF_STREAM:
+                    finished = True
+                    return
+                if isinstance(item, Exception):
+                    finished = True
+                    raise item
+                self._loop.call_soon_threadsafe(job.space.release)
+                yield item
+        finally:
+            if not finished:
+                self._cancel(job)
+
+    def metrics(self):
+        """Snapshot of queue depth, in-flight generations, counters and queue wait times (seconds)."""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            return {
+                "queue_depth": self._queued,
+                "in_flight": self._in_flight,
+                "waiting_users": len(self._queues),
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            }
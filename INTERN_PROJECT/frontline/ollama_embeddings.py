@@ -0,0 +1,124 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from langchain_core.embeddings import Embeddings
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying: Ollama returns 503/429 while a model is (re)loading or busy
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class OllamaEmbeddingError(RuntimeError):
+    """Raised when Ollama keeps failing to embed a batch after all retries."""
+
+
+class BatchedOllamaEmbeddings(Embeddings):
+    """
+    Embedding client for the Ollama container that batches texts and keeps several
+    requests in flight.
+
+    Texts are grouped into batches of ``batch_size`` and sent to ``/api/embed``.
+    Up to ``max_in_flight`` batches are outstanding at once over one pooled HTTP
+    session, so ingestion is bound by Ollama's throughput rather than by per-request
+    round trips. Connection errors, timeouts and retryable status codes are retried
+    with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        model,
+        base_url="http://localhost:11434",
+        batch_size=32,
+        max_in_flight=4,
+        max_retries=3,
+        backoff_seconds=0.5,
+        timeout=120,
+    ):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def identity(self):
+        """Names the vector space these embeddings live in (used to key persisted vectors)."""
+        return f"ollama-embed:{self.model}"
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_in_flight,
+                    thread_name_prefix="ollama-embed",
+                )
+            return self._executor
+
+    def _embed_batch(self, texts):
+        """Sends one batch to Ollama, retrying transient failures."""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff_seconds * (2 ** (attempt - 1)))
+            try:
+                response = self._session.post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": self.model, "input": texts},
+                    timeout=self.timeout,
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                continue
+
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                last_error = OllamaEmbeddingError(f"HTTP {response.status_code}: {response.text[:200]}")
+                continue
+            response.raise_for_status()
+
+            embeddings = response.json().get("embeddings", [])
+            if len(embeddings) != len(texts):
+                raise OllamaEmbeddingError(
+                    f"Ollama returned {len(embeddings)} embeddings for {len(texts)} texts"
+                )
+            return embeddings
+
+        raise OllamaEmbeddingError(
+            f"Embedding batch of {len(texts)} texts failed after {self.max_retries + 1} attempts: {last_error}"
+        )
+
+    def embed_documents(self, texts):
+        """Embeds texts in batches with up to ``max_in_flight`` concurrent requests, preserving order."""
+        texts = list(texts)
+        if not texts:
+            return []
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+
+        embeddings = []
+        for batch_embeddings in self._get_executor().map(self._embed_batch, batches):
+            embeddings.extend(batch_embeddings)
+        return embeddings
+
+    def embed_query(self, text):
+        """Embeds a single query string."""
+        return self._embed_batch([text])[0]
+
+    def close(self):
+        """Shuts down the worker threads and the pooled HTTP session."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self._session.close()
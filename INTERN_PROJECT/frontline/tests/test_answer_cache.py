@@ -0,0 +1,77 @@
+import pytest
+
+import answer_cache
+from answer_cache import SemanticAnswerCache, normalize_query
+
+
+class KeywordEmbeddings:
+    """Embeds a question as word counts over a tiny vocabulary, so similar wording scores high."""
+
+    VOCABULARY = ("smarta", "bundle", "price", "esim", "swap", "how", "much", "is", "the", "a", "cost")
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        words = text.split()
+        return [float(words.count(word)) for word in self.VOCABULARY]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_normalize_query():
+    assert normalize_query("  What's the PRICE of Smarta?? ") == "what s the price of smarta"
+
+
+def test_exact_hit_after_normalisation_needs_no_embedding():
+    embeddings = KeywordEmbeddings()
+    cache = SemanticAnswerCache(embeddings)
+    cache.put("How much is Smarta?", "KES 20", [], "v1", semantic=False)
+
+    assert cache.get("how much is smarta", "v1", semantic=False)["answer"] == "KES 20"
+    assert embeddings.calls == 0
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_semantic_hit_above_threshold_only():
+    cache = SemanticAnswerCache(KeywordEmbeddings(), similarity_threshold=0.8)
+    cache.put("how much is the smarta bundle", "KES 20", [], "v1")
+
+    assert cache.get("how much is a smarta bundle", "v1")["answer"] == "KES 20"
+    assert cache.get("esim swap", "v1") is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = SemanticAnswerCache(KeywordEmbeddings(), ttl_seconds=60)
+    cache.put("esim swap", "Visit a shop", [], "v1")
+
+    clock[0] += 59
+    assert cache.get("esim swap", "v1") is not None
+    clock[0] += 2
+    assert cache.get("esim swap", "v1") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticAnswerCache(KeywordEmbeddings(), max_entries=2)
+    cache.put("smarta", "a", [], "v1", semantic=False)
+    cache.put("bundle", "b", [], "v1", semantic=False)
+    cache.get("smarta", "v1", semantic=False)  # "bundle" is now the least recently used
+    cache.put("esim", "c", [], "v1", semantic=False)
+
+    assert cache.get("bundle", "v1", semantic=False) is None
+    assert cache.get("smarta", "v1", semantic=False)["answer"] == "a"
+    assert cache.get("esim", "v1", semantic=False)["answer"] == "c"
+
+
+def test_new_index_version_drops_every_entry():
+    cache = SemanticAnswerCache(KeywordEmbeddings())
+    cache.put("smarta price", "KES 20", [], "v1")
+
+    assert cache.get("smarta price", "v2") is None
+    assert cache.get("smarta price", "v1") is None
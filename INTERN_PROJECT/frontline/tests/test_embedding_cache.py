@@ -0,0 +1,65 @@
+import sqlite3
+
+from embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.documents = 0
+        self.queries = 0
+
+    def embed_documents(self, texts):
+        self.documents += len(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.queries += 1
+        return [float(len(text)), 1.0]
+
+
+def stored_rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+def test_documents_are_persisted_and_reused(tmp_path):
+    db_path = tmp_path / "embeddings.sqlite"
+    inner = CountingEmbeddings()
+    CachedEmbeddings(inner, "m", db_path=str(db_path)).embed_documents(["a", "bb", "a"])
+    assert inner.documents == 2
+
+    again = CachedEmbeddings(inner, "m", db_path=str(db_path))
+    assert again.embed_documents(["bb", "a"]) == [[2.0, 1.0], [1.0, 1.0]]
+    assert inner.documents == 2
+    assert stored_rows(db_path) == 2
+
+
+def test_queries_are_cached_in_memory_only(tmp_path):
+    db_path = tmp_path / "embeddings.sqlite"
+    inner = CountingEmbeddings()
+    cache = CachedEmbeddings(inner, "m", db_path=str(db_path))
+
+    assert cache.embed_query("what is smarta?") == cache.embed_query("what is smarta?")
+    assert inner.queries == 1
+    assert stored_rows(db_path) == 0
+
+
+def test_query_tier_is_bounded_and_expires(tmp_path):
+    inner = CountingEmbeddings()
+    cache = CachedEmbeddings(inner, "m", db_path=str(tmp_path / "e.sqlite"), max_queries=2)
+    for text in ("q1", "q2", "q3"):
+        cache.embed_query(text)
+    assert list(cache._queries) == ["q2", "q3"]
+
+    expiring = CachedEmbeddings(inner, "m", db_path=str(tmp_path / "e.sqlite"), query_ttl_seconds=0)
+    expiring.embed_query("q1")
+    expiring.embed_query("q1")
+    assert inner.queries == 5
+
+
+def test_query_reuses_an_indexed_document_vector(tmp_path):
+    inner = CountingEmbeddings()
+    cache = CachedEmbeddings(inner, "m", db_path=str(tmp_path / "e.sqlite"))
+    cache.embed_documents(["eSIM swap"])
+    cache.embed_query("eSIM swap")
+    assert inner.queries == 0
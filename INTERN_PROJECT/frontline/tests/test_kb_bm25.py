@@ -0,0 +1,92 @@
+import faiss
+import numpy as np
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from kb_bm25 import BM25Index, HybridRetriever, tokenize
+
+CHUNKS = [
+    "Smarta bundle gives daily data minutes and SMS",
+    "Smarta bundle gives daily data minutes and SMS",  # same chunk indexed twice
+    "Swap to an eSIM at any Airtel shop with your ID",
+    "Airtel Money charges when sending money to other networks",
+    "Data bundles renew automatically every day unless cancelled",
+    "Reset your Airtel Money PIN by dialling the menu",
+]
+VOCABULARY = sorted({term for chunk in CHUNKS for term in tokenize(chunk)})
+
+
+class BagOfWords(Embeddings):
+    def __init__(self):
+        self.queries = 0
+
+    def _vector(self, text):
+        terms = tokenize(text)
+        return [float(terms.count(term)) for term in VOCABULARY]
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.queries += 1
+        return self._vector(text)
+
+
+@pytest.fixture
+def embeddings():
+    return BagOfWords()
+
+
+@pytest.fixture
+def vectorstore(embeddings):
+    index = faiss.IndexFlatL2(len(VOCABULARY))
+    index.add(np.asarray(embeddings.embed_documents(CHUNKS), dtype="float32"))
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore({str(i): Document(page_content=chunk, metadata={"position": i}) for i, chunk in enumerate(CHUNKS)}),
+        index_to_docstore_id={i: str(i) for i in range(len(CHUNKS))},
+    )
+
+
+def retriever(vectorstore, **kwargs):
+    return HybridRetriever(vectorstore=vectorstore, bm25=BM25Index.build(CHUNKS), **kwargs)
+
+
+def test_bm25_ranks_chunks_with_the_query_terms_first():
+    hits = BM25Index.build(CHUNKS).search("eSIM swap", k=3)
+    assert hits[0][0] == 2
+    assert len(hits) == 1
+
+
+def test_exact_term_query_is_served_from_bm25_without_embedding(vectorstore, embeddings):
+    hybrid = retriever(vectorstore, k=2)
+    assert hybrid.is_exact_term_query("eSIM")
+    assert not hybrid.is_exact_term_query("how do I swap my line to a new eSIM today please")
+
+    documents = hybrid.invoke("eSIM")
+    assert documents[0].page_content == CHUNKS[2]
+    assert embeddings.queries == 0
+
+
+def test_hybrid_mode_fuses_rankings_with_reciprocal_rank_fusion(vectorstore, monkeypatch):
+    hybrid = retriever(vectorstore, k=3, mode="hybrid")
+    monkeypatch.setattr(type(hybrid.bm25), "search", lambda self, query, k=10: [(1, 9.0), (2, 5.0)])
+    monkeypatch.setattr(HybridRetriever, "_vector_positions", lambda self, query: [2, 0, 1])
+
+    documents = hybrid.invoke("what does it cost to keep data minutes and sms running")
+    # 2: 1/61 + 1/62, 1: 1/61 + 1/63, 0: 1/62
+    assert [doc.metadata["position"] for doc in documents] == [2, 1, 0]
+
+
+def test_vector_side_uses_maximal_marginal_relevance(vectorstore, embeddings):
+    vector = retriever(vectorstore, k=2, mode="vector")
+    documents = vector.invoke("smarta daily data bundle")
+    contents = [doc.page_content for doc in documents]
+    # Plain similarity search would return both copies of the Smarta chunk
+    assert contents[0] == CHUNKS[0]
+    assert contents.count(CHUNKS[0]) == 1
+    assert embeddings.queries == 1
@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+import kb_index
+from kb_index import KnowledgeBaseIndex
+
+
+class FakeEmbeddings:
+    """Two-dimensional vectors from the text length and its first letter; records what was embedded."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def _vector(self, text):
+        return [float(len(text)), float(ord(text[0]) if text else 0)]
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+class OneChunkPerLine:
+    def split_documents(self, pages):
+        return [Document(page_content=line, metadata=page.metadata)
+                for page in pages for line in page.page_content.splitlines() if line]
+
+
+def parse_text_files(pdf_paths, max_workers=None):
+    """Stands in for the pdfplumber pool: each 'PDF' is a text file with one page."""
+    for path in pdf_paths:
+        with open(path, encoding="utf-8") as f:
+            yield path, [Document(page_content=f.read(), metadata={"source": os.path.basename(path)})]
+
+
+@pytest.fixture
+def knowledge_base(tmp_path, monkeypatch):
+    monkeypatch.setattr(kb_index, "iter_parsed_pdfs", parse_text_files)
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    index = KnowledgeBaseIndex(FakeEmbeddings(), OneChunkPerLine(), "fake-model", index_dir=str(tmp_path / ".index"))
+
+    def sync(**pdfs):
+        for name in os.listdir(pdf_dir):
+            if name not in pdfs:
+                os.remove(pdf_dir / name)
+        for name, text in pdfs.items():
+            (pdf_dir / name).write_text(text, encoding="utf-8")
+        index.embeddings.embedded.clear()
+        return index.sync(sorted(str(pdf_dir / name) for name in pdfs))
+    index.sync_pdfs = sync
+    return index
+
+
+def contents(store):
+    return sorted(doc.page_content for doc in store.docstore._dict.values())
+
+
+def stored_files(index):
+    return sorted(os.listdir(index.chunks_dir)), sorted(os.listdir(index.vectors_dir))
+
+
+def test_sync_embeds_only_added_and_changed_pdfs(knowledge_base):
+    store = knowledge_base.sync_pdfs(**{"leave.pdf": "annual leave\nsick leave", "pay.pdf": "payslips"})
+    assert contents(store) == ["annual leave", "payslips", "sick leave"]
+    assert store.index.ntotal == 3
+    first_version = knowledge_base.version
+
+    # Nothing changed: nothing is embedded and the index is read back
+    store = knowledge_base.sync_pdfs(**{"leave.pdf": "annual leave\nsick leave", "pay.pdf": "payslips"})
+    assert knowledge_base.embeddings.embedded == []
+    assert knowledge_base.version == first_version
+    assert store.index.ntotal == 3
+
+    # Change one PDF and add another: only their chunks are embedded
+    store = knowledge_base.sync_pdfs(**{"leave.pdf": "annual leave\nstudy leave", "pay.pdf": "payslips",
+                                        "travel.pdf": "per diem"})
+    assert sorted(knowledge_base.embeddings.embedded) == ["annual leave", "per diem", "study leave"]
+    assert contents(store) == ["annual leave", "payslips", "per diem", "study leave"]
+    assert knowledge_base.version != first_version
+    assert knowledge_base.bm25.document_count == 4
+
+
+def test_sync_removes_deleted_and_replaced_pdf_files(knowledge_base):
+    knowledge_base.sync_pdfs(**{"leave.pdf": "annual leave", "pay.pdf": "payslips"})
+    store = knowledge_base.sync_pdfs(**{"leave.pdf": "sick leave"})
+
+    assert contents(store) == ["sick leave"]
+    sha = knowledge_base.manifest["documents"]["leave.pdf"]["sha256"]
+    # Only the current contents' files are left, and no temp files from the atomic writes
+    assert stored_files(knowledge_base) == ([f"{sha}.json"], [f"{sha}.npy"])
+    assert np.load(knowledge_base._vector_path(sha)).tolist() == [[10.0, float(ord("s"))]]
+    assert sorted(os.listdir(knowledge_base.index_dir)) == ["bm25.json", "chunks", "index.faiss", "manifest.json",
+                                                            "vectors"]
+
+
+def test_interrupted_vector_write_keeps_the_previous_file(knowledge_base, monkeypatch):
+    knowledge_base.sync_pdfs(**{"leave.pdf": "annual leave"})
+    sha = knowledge_base.manifest["documents"]["leave.pdf"]["sha256"]
+    before = np.load(knowledge_base._vector_path(sha))
+
+    def fail(path, vectors):
+        with open(path, "wb") as f:
+            f.write(b"half a file")
+        raise OSError("disk full")
+    monkeypatch.setattr(kb_index.np, "save", fail)
+    with pytest.raises(OSError):
+        knowledge_base._embed_document(sha, [Document(page_content="other text")])
+
+    assert np.load(knowledge_base._vector_path(sha)).tolist() == before.tolist()
+    assert stored_files(knowledge_base)[1] == [f"{sha}.npy"]
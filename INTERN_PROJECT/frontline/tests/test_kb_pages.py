@@ -0,0 +1,45 @@
+import os
+import threading
+import time
+
+import kb_pages
+from kb_ingest import write_json_atomic
+from kb_pages import MANIFEST_FILE, PageCache
+
+
+def fake_render(calls):
+    def render(pdf_path, out_dir):
+        calls.append(pdf_path)
+        time.sleep(0.2)
+        os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, "page-0.txt"), "w", encoding="utf-8") as f:
+            f.write(f"text of {os.path.basename(pdf_path)}")
+        write_json_atomic(os.path.join(out_dir, MANIFEST_FILE), {"source": os.path.basename(pdf_path), "pages": 1})
+        return 1
+    return render
+
+
+def test_concurrent_builds_render_each_pdf_once(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(kb_pages, "render_pdf_pages", fake_render(calls))
+    pdf = tmp_path / "guide.pdf"
+    pdf.write_bytes(b"%PDF guide")
+    cache = PageCache(str(tmp_path / "pages"))
+
+    builders = [threading.Thread(target=cache.build, args=([str(pdf)],)) for _ in range(3)]
+    for builder in builders:
+        builder.start()
+    for builder in builders:
+        builder.join()
+
+    assert calls == [str(pdf)]
+    assert cache.build([str(pdf)]) == 0
+    assert cache.get_page("guide.pdf", 0)["text"] == "text of guide.pdf"
+
+
+def test_write_json_atomic_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "names.json"
+    write_json_atomic(str(path), {"a.pdf": "1"})
+    write_json_atomic(str(path), {"a.pdf": "2"})
+    assert path.read_text() == '{"a.pdf": "2"}'
+    assert os.listdir(tmp_path) == ["names.json"]
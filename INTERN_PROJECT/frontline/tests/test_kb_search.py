@@ -0,0 +1,71 @@
+import os
+
+import pytest
+from langchain_core.documents import Document
+
+import kb_search
+from kb_search import KnowledgeBaseSearch, to_fts_query
+
+
+def parse_text_files(pdf_paths, max_workers=None):
+    """Stands in for the pdfplumber pool: each 'PDF' is a text file with pages split on form feeds."""
+    for path in pdf_paths:
+        with open(path, encoding="utf-8") as f:
+            yield path, [Document(page_content=text, metadata={"page": i}) for i, text in enumerate(f.read().split("\f"))]
+
+
+@pytest.fixture
+def search(tmp_path, monkeypatch):
+    monkeypatch.setattr(kb_search, "iter_parsed_pdfs", parse_text_files)
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    index = KnowledgeBaseSearch(str(tmp_path / "cache" / "kb_search.sqlite"))
+
+    def write(name, *pages):
+        (pdf_dir / name).write_text("\f".join(pages), encoding="utf-8")
+    index.write_pdf = write
+    index.pdf_paths = lambda: sorted(str(pdf_dir / name) for name in os.listdir(pdf_dir))
+    return index
+
+
+def test_to_fts_query_quotes_terms_and_prefixes_the_last():
+    assert to_fts_query('Sick "leave" OR') == '"sick" "leave" "or"*'
+    assert to_fts_query("  ?! ") == ""
+
+
+def test_search_ranks_matching_pages(search):
+    search.write_pdf("policy.pdf", "Annual leave is 21 days a year.",
+                     "Sick leave needs a doctor's note. Sick days over three need HR approval. Sick pay is full.")
+    search.write_pdf("payroll.pdf", "Payslips are issued monthly.", "Sick pay is covered in the leave policy.")
+    assert search.sync(search.pdf_paths()) == 2
+    assert {name: document["pages"] for name, document in search.documents().items()} == {
+        "payroll.pdf": 2, "policy.pdf": 2,
+    }
+
+    results = search.search("sick")
+    assert [(result["source"], result["page"]) for result in results] == [("policy.pdf", 1), ("payroll.pdf", 1)]
+    assert results[0]["score"] < results[1]["score"]
+    assert "**Sick**" in results[0]["snippet"]
+    # Porter stemming and a prefix on the last term
+    assert [result["source"] for result in search.search("payslip")] == ["payroll.pdf"]
+    assert [result["page"] for result in search.search("annual lea")] == [0]
+    assert search.search("") == []
+
+
+def test_sync_reindexes_only_changed_pdfs(search):
+    search.write_pdf("policy.pdf", "Annual leave is 21 days a year.")
+    search.write_pdf("payroll.pdf", "Payslips are issued monthly.")
+    search.sync(search.pdf_paths())
+
+    assert search.sync(search.pdf_paths()) == 0
+
+    search.write_pdf("policy.pdf", "Annual leave is 24 days a year.", "Study leave is 5 days.")
+    assert search.sync(search.pdf_paths()) == 1
+    assert search.documents()["policy.pdf"]["pages"] == 2
+    assert search.search("21") == []
+    assert [(result["source"], result["page"]) for result in search.search("study")] == [("policy.pdf", 1)]
+
+    os.remove(search.pdf_paths()[0])  # payroll.pdf
+    assert search.sync(search.pdf_paths()) == 0
+    assert list(search.documents()) == ["policy.pdf"]
+    assert search.search("payslips") == []
@@ -0,0 +1,96 @@
+import asyncio
+import itertools
+import queue
+import time
+
+import pytest
+
+import llm_dispatch
+from llm_dispatch import LLMDispatcher
+
+
+class Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class EndlessLLM:
+    """Streams numbered tokens until cancelled, and records how many generations are running."""
+
+    def __init__(self):
+        self.running = 0
+        self.produced = 0
+
+    async def astream(self, prompt):
+        self.running += 1
+        try:
+            for i in itertools.count():
+                self.produced += 1
+                yield Chunk(f"{prompt}{i} ")
+                await asyncio.sleep(0)
+        finally:
+            self.running -= 1
+
+
+class ShortLLM:
+    async def astream(self, prompt):
+        for word in prompt.split():
+            yield Chunk(word)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+def test_streams_every_token():
+    dispatcher = LLMDispatcher(ShortLLM())
+    assert list(dispatcher.stream("agent-1", "hello there agent")) == ["hello", "there", "agent"]
+    wait_until(lambda: dispatcher.metrics()["in_flight"] == 0)
+    assert dispatcher.metrics()["completed"] == 1
+
+
+def test_reader_that_stops_reading_bounds_the_buffer():
+    llm = EndlessLLM()
+    dispatcher = LLMDispatcher(llm)
+    tokens = dispatcher.stream("agent-1", "a")
+    next(tokens)
+    time.sleep(0.1)
+    assert llm.produced <= llm_dispatch.STREAM_BUFFER + 2
+    tokens.close()
+
+
+def test_abandoned_streams_release_their_slots():
+    llm = EndlessLLM()
+    dispatcher = LLMDispatcher(llm, max_concurrency=2)
+    for user in ("agent-1", "agent-2"):
+        tokens = dispatcher.stream(user, "x")
+        next(tokens)
+        tokens.close()  # what a Streamlit rerun does to the st.write_stream generator
+
+    wait_until(lambda: llm.running == 0 and dispatcher.metrics()["in_flight"] == 0)
+    tokens = dispatcher.stream("agent-3", "y")
+    assert next(tokens) == "y0 "
+    tokens.close()
+    wait_until(lambda: dispatcher.metrics()["cancelled"] == 3)
+
+
+def test_stream_that_times_out_in_the_queue_leaves_it():
+    llm = EndlessLLM()
+    dispatcher = LLMDispatcher(llm, max_concurrency=1)
+    running = dispatcher.stream("agent-1", "a")
+    next(running)
+
+    # agent-1 holds the only slot, so agent-2 waits in the queue until its reader gives up
+    with pytest.raises(queue.Empty):
+        next(dispatcher.stream("agent-2", "b", timeout=0.05))
+    assert dispatcher.metrics()["queue_depth"] == 0
+    assert dispatcher.metrics()["waiting_users"] == 0
+
+    running.close()
+    tokens = dispatcher.stream("agent-2", "c")
+    assert next(tokens) == "c0 "
+    tokens.close()
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ollama_embeddings import RETRYABLE_STATUS_CODES, BatchedOllamaEmbeddings, OllamaEmbeddingError
+
+
+class StubOllama:
+    """
+    Minimal /api/embed server. Each text "t<n>" embeds to [n]; ``failures`` responses with
+    ``failure_status`` are returned before any success, and ``delay(texts)`` stalls a reply.
+    """
+
+    def __init__(self, failures=0, failure_status=503, delay=None):
+        self.failures = failures
+        self.failure_status = failure_status
+        self.delay = delay
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.batches.append(body["input"])
+                    failing = stub.failures > 0
+                    stub.failures -= failing
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay(body["input"]))
+                    if failing:
+                        self._reply(stub.failure_status, {"error": "model is loading"})
+                    else:
+                        self._reply(200, {"embeddings": [[float(text[1:])] for text in body["input"]]})
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(**kwargs):
+        servers.append(StubOllama(**kwargs))
+        return servers[-1]
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def texts(count):
+    return [f"t{i}" for i in range(count)]
+
+
+def test_splits_texts_into_batches(make_server):
+    server = make_server()
+    embedder = BatchedOllamaEmbeddings("stub", base_url=server.url, batch_size=4, max_in_flight=2)
+
+    assert embedder.embed_documents(texts(10)) == [[float(i)] for i in range(10)]
+    assert sorted(len(batch) for batch in server.batches) == [2, 4, 4]
+    embedder.close()
+
+
+def test_keeps_input_order_when_batches_finish_out_of_order(make_server):
+    # Earlier batches answer last, so completion order is the reverse of submission order
+    server = make_server(delay=lambda batch: 0.2 if batch[0] == "t0" else 0.1 if batch[0] == "t2" else 0)
+    embedder = BatchedOllamaEmbeddings("stub", base_url=server.url, batch_size=2, max_in_flight=3)
+
+    assert embedder.embed_documents(texts(6)) == [[float(i)] for i in range(6)]
+    assert server.max_in_flight > 1
+    embedder.close()
+
+
+@pytest.mark.parametrize("status", sorted(RETRYABLE_STATUS_CODES))
+def test_retries_retryable_status_codes(make_server, status):
+    server = make_server(failures=2, failure_status=status)
+    embedder = BatchedOllamaEmbeddings("stub", base_url=server.url, max_retries=3, backoff_seconds=0)
+
+    assert embedder.embed_query("t7") == [7.0]
+    assert len(server.batches) == 3
+    embedder.close()
+
+
+def test_gives_up_after_max_retries(make_server):
+    server = make_server(failures=10)
+    embedder = BatchedOllamaEmbeddings("stub", base_url=server.url, max_retries=2, backoff_seconds=0)
+
+    with pytest.raises(OllamaEmbeddingError):
+        embedder.embed_query("t1")
+    assert len(server.batches) == 3
+    embedder.close()
+
+
+def test_does_not_retry_client_errors(make_server):
+    server = make_server(failures=1, failure_status=400)
+    embedder = BatchedOllamaEmbeddings("stub", base_url=server.url, max_retries=3, backoff_seconds=0)
+
+    with pytest.raises(Exception):
+        embedder.embed_query("t1")
+    assert len(server.batches) == 1
+    embedder.close()
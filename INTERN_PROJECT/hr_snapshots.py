@@ -0,0 +1,258 @@
+"""
+Columnar Parquet snapshots of the HR data for the analytics dashboards.
+
+Each snapshot (``employees``, ``leaves`` and ``payroll``) is written as typed Parquet,
+hive-partitioned by partner and year (``<dataset>/<partner column>=.../year=.../``), and
+read back through Arrow with memory-mapped files. ``load`` reads only the columns and the
+partner/year partitions asked for; Partner, Department and the other low-cardinality text
+columns come back as pandas categoricals.
+
+A snapshot records the version of its source (the ``data_versions`` change feed for the
+SQLite tables, size and mtime for the payroll CSV) and is rewritten on the next load after
+the source changes. Build them ahead of time with:
+
+    python hr_snapshots.py [employees leaves payroll] [--force]
+"""
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+from leave_db import DB_PATH, data_version, get_pool
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_DIR = os.environ.get("HR_SNAPSHOT_DIR", os.path.join(PROJECT_DIR, "snapshots"))
+PAYROLL_CSV = os.path.join(PROJECT_DIR, "human_resource", "partner_streamlit.csv")
+
+MANIFEST = "_manifest.json"  # leading underscore: skipped by Arrow dataset discovery
+
+# partner: partition column; date: the column whose year is the second partition level;
+# categories: stored dictionary-encoded and loaded as pandas categoricals
+SNAPSHOTS = {
+    "employees": {
+        "partner": "Partner_Name",
+        "date": "Date_of_Join",
+        "categories": ("Department", "Sub_Department", "Manager", "position", "gender", "OPCO_Region"),
+    },
+    "leaves": {
+        "partner": "Partner_Name",
+        "date": "start_date",
+        "categories": ("leave_type", "status"),
+    },
+    "payroll": {
+        "partner": "Partner",
+        "date": "DateofHire",
+        "categories": ("Department", "EmploymentStatus", "Location", "Sex", "MaritalDesc", "PerformanceScore",
+                       "ManagerName"),
+    },
+}
+
+_filesystem = pafs.LocalFileSystem(use_mmap=True)
+_lock = threading.Lock()
+_datasets = {}  # name -> (source version, discovered dataset), so partitions are listed once per version
+
+
+# --- Sources ---
+
+def _read_sql(sql):
+    with get_pool().connection() as conn:
+        return pd.read_sql_query(sql, conn)
+
+
+def _read_employees():
+    # Credentials and contact details stay in SQLite
+    frame = _read_sql("""
+        SELECT uuid, First_Name, Surname_Name, Manager, Date_of_Join, OPCO_Region, Department,
+               Sub_Department, Partner_Name, gender, position, salary
+        FROM employee_table
+    """)
+    frame["Date_of_Join"] = pd.to_datetime(frame["Date_of_Join"], errors="coerce", format="ISO8601")
+    frame["salary"] = frame["salary"].astype("Int64")
+    return frame
+
+
+def _read_leaves():
+    frame = _read_sql("""
+        SELECT l.id, l.leave_id, l.employee_name, l.leave_type, l.start_date, l.end_date, l.days, l.status,
+               e.Partner_Name
+        FROM leave_entries AS l
+        LEFT JOIN employee_table AS e ON e.uuid = l.leave_id
+    """)
+    for column in ("start_date", "end_date"):
+        frame[column] = pd.to_datetime(frame[column], errors="coerce", format="ISO8601")
+    return frame
+
+
+def _read_payroll():
+    frame = pd.read_csv(PAYROLL_CSV, index_col=0)
+    for column in frame.columns:
+        if pd.api.types.is_string_dtype(frame[column]):
+            frame[column] = frame[column].str.strip()
+    for column in ("DateofHire", "DateofTermination"):
+        # DateofTermination holds "Active" for current staff, which becomes NaT
+        frame[column] = pd.to_datetime(frame[column], errors="coerce", format="%m/%d/%Y")
+    dob = pd.to_datetime(frame["DOB"], errors="coerce", format="%m/%d/%y")
+    # Two-digit years: nobody on the payroll was born in the future
+    frame["DOB"] = dob.where(dob.dt.year <= date.today().year, dob - pd.DateOffset(years=100))
+    return frame
+
+
+def _source_version(name):
+    """Identifies the state of a snapshot's source, so a stale snapshot can be spotted."""
+    if name == "payroll":
+        stat = os.stat(PAYROLL_CSV)
+        return [PAYROLL_CSV, stat.st_size, stat.st_mtime_ns]
+    tables = ("employee_table",) if name == "employees" else ("employee_table", "leave_entries")
+    return [DB_PATH, *data_version(*tables)]
+
+
+_READERS = {"employees": _read_employees, "leaves": _read_leaves, "payroll": _read_payroll}
+
+
+# --- Writing ---
+
+def _snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+@contextmanager
+def _file_lock(name, exclusive=True):
+    """
+    Holds ``<snapshot>.lock`` for the block: exclusive while a snapshot is checked and
+    rewritten, shared while it is opened, so other processes never see it mid-swap.
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    fd = os.open(f"{_snapshot_path(name)}.lock", os.O_CREAT | os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def _manifest(name):
+    try:
+        with open(os.path.join(_snapshot_path(name), MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _partitioning(name, dictionary=False):
+    partner_type = pa.dictionary(pa.int32(), pa.string()) if dictionary else pa.string()
+    schema = pa.schema([(SNAPSHOTS[name]["partner"], partner_type), ("year", pa.int32())])
+    return ds.HivePartitioning.discover(schema=schema) if dictionary else ds.partitioning(schema, flavor="hive")
+
+
+def write_snapshot(name):
+    """Reads a snapshot's source and rewrites its Parquet partitions; returns the row count."""
+    spec = SNAPSHOTS[name]
+    version = _source_version(name)
+    frame = _READERS[name]()
+    frame["year"] = frame[spec["date"]].dt.year.astype("Int32")
+    for column in spec["categories"]:
+        frame[column] = frame[column].astype("category")
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+
+    # Write next to the live snapshot and swap directories, so readers never see half a snapshot
+    final = _snapshot_path(name)
+    staging = f"{final}.{uuid.uuid4().hex}.tmp"
+    ds.write_dataset(
+        table, staging, format="parquet", partitioning=_partitioning(name),
+        existing_data_behavior="error", basename_template="part-{i}.parquet",
+    )
+    with open(os.path.join(staging, MANIFEST), "w") as f:
+        json.dump({"version": version, "rows": table.num_rows, "columns": table.column_names}, f)
+    retired = f"{final}.{uuid.uuid4().hex}.old"
+    if os.path.exists(final):
+        os.replace(final, retired)
+    os.replace(staging, final)
+    shutil.rmtree(retired, ignore_errors=True)
+    return table.num_rows
+
+
+def refresh(name, force=False):
+    """
+    Rewrites a snapshot if it is missing or its source has changed since it was written.
+    Returns the source version the snapshot now reflects. The thread lock serializes this
+    process; the file lock serializes every process writing the same snapshot directory.
+    """
+    with _lock, _file_lock(name):
+        version = _source_version(name)
+        manifest = _manifest(name)
+        if force or manifest is None or manifest["version"] != version:
+            write_snapshot(name)
+        return version
+
+
+# --- Reading ---
+
+def dataset(name):
+    """The snapshot as a memory-mapped Arrow dataset (refreshed first if stale)."""
+    version = refresh(name)
+    cached = _datasets.get(name)
+    if cached is None or cached[0] != version:
+        with _file_lock(name, exclusive=False):
+            cached = _datasets[name] = (version, ds.dataset(
+                _snapshot_path(name), format="parquet", filesystem=_filesystem,
+                partitioning=_partitioning(name, dictionary=True),
+            ))
+    return cached[1]
+
+
+def partners(name):
+    """Partners present in a snapshot, read from the partition directory names only."""
+    snapshot = dataset(name)
+    partner_index = snapshot.partitioning.schema.get_field_index(SNAPSHOTS[name]["partner"])
+    values = snapshot.partitioning.dictionaries[partner_index]
+    return sorted(value for value in values.to_pylist() if value is not None)
+
+
+def load(name, columns=None, partners=None, years=None):
+    """
+    A snapshot as a DataFrame with only ``columns`` (all when None), from the ``partners``
+    and ``years`` partitions (all when None). Categorical columns keep only the categories
+    present in the rows read.
+    """
+    snapshot = dataset(name)
+    condition = None
+    for field, values in ((SNAPSHOTS[name]["partner"], partners), ("year", years)):
+        if values is not None:
+            clause = ds.field(field).isin(list(values))
+            condition = clause if condition is None else condition & clause
+    table = snapshot.to_table(columns=list(columns) if columns is not None else None, filter=condition)
+    frame = table.to_pandas()
+    for column in frame.select_dtypes("category"):
+        frame[column] = frame[column].cat.remove_unused_categories()
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("snapshots", nargs="*", help=f"any of {', '.join(SNAPSHOTS)} (default: all)")
+    parser.add_argument("--force", action="store_true", help="rewrite even if the source has not changed")
+    args = parser.parse_args()
+    unknown = set(args.snapshots) - set(SNAPSHOTS)
+    if unknown:
+        parser.error(f"unknown snapshots: {', '.join(sorted(unknown))}")
+    for name in args.snapshots or SNAPSHOTS:
+        refresh(name, force=args.force)
+        manifest = _manifest(name)
+        print(f"{name}: {manifest['rows']:,} rows in {_snapshot_path(name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 from millify import prettify
 import sqlite3
-from datetime import datetime
+from datetime import date, datetime
 import os
+import sys
+from functools import partial
+
+# --- Shared data-access layer (INTERN_PROJECT/leave_db.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from leave_db import LeaveRepository, PartnerAggregates, data_version, fetch_value
+import leave_liability
 
 # Get the base directory where this script is located
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -31,68 +38,85 @@ db = "/Users/danielwanganga/Documents/GitHub/PROJECT_FRONTLINE/INTERN_PROJECT/le
 
 #print(leave_entry)
 
-# Database connection function
-@st.cache_data
-def get_data_from_db():
-    """Fetch all data from SQLite database"""
-    try:
-        # Connect to SQLite database
-        conn = sqlite3.connect(db_path)# Update with your actual database name
-                    # 1. Create employee_table_rows (formerly employee_table)
-
+repo = LeaveRepository()
 
-        
-        # Fetch employee/partner data
-        employee_query = """
-        SELECT * FROM employee_table 
-        -- Add any joins if needed for partner information
-        """
-        data = pd.read_sql_query(employee_query, conn)
-        
-        print(data.columns)
-        
-        # Fetch leave data
-        leave_query = """
-        SELECT 
-            *
-        FROM leave_entries;
-        """
-        leave_data = pd.read_sql_query(leave_query, conn)
-        
-        conn.close()
-        return data, leave_data
-        
-    except Exception as e:
-        st.error(f"Database connection error: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+# Optional employee columns the dashboard probes for (the first one present is used)
+termination_columns = ['DateofTermination', 'date_of_termination', 'termination_date', 'end_date']
+performance_columns = ['PerformanceScore', 'performance_score', 'performance_rating']
+
+def first_present(candidates, columns):
+    return next((column for column in candidates if column in columns), None)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_employee_overview(version):
+    """
+    Partner list, probed optional columns and record counts for one employee_table /
+    leave_entries version. Everything else on the page is aggregated per partner in SQL.
+    """
+    columns = repo.get_employee_columns()
+    return {
+        "partners": repo.get_partners(),
+        "termination_col": first_present(termination_columns, columns),
+        "performance_col": first_present(performance_columns, columns),
+        "employee_records": fetch_value("SELECT COUNT(*) FROM employee_table", default=0),
+        "leave_records": fetch_value("SELECT COUNT(*) FROM leave_entries", default=0),
+    }
+
+@st.cache_resource
+def partner_summary_cache(termination_col, performance_col):
+    """Per-partner metrics shared by every session; refreshed only for partners that changed."""
+    return PartnerAggregates(partial(repo.query_partner_summary, terminated_column=termination_col,
+                                     performance_column=performance_col))
+
+def get_partner_summary(overview, partners):
+    """Headcount, terminated, leave days, denials and performance for each partner."""
+    cache = partner_summary_cache(overview["termination_col"], overview["performance_col"])
+    return cache.get(partners)
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_leave_liability(today, version):
+    """
+    Accrued leave liability per partner today, against last month's stored snapshot (see
+    leave_liability.py). Recomputed once per day and employee/leave/entitlement version.
+    """
+    return leave_liability.monthly_liability(date.fromisoformat(today))
+
+def liability_delta(partner):
+    """Month-over-month liability change for the metric delta; None without last month's figure."""
+    change = leave_liability_by_partner["change_pct"].get(partner)
+    return None if change is None or pd.isna(change) else f"{change:+.1f}%"
 
 # Load data from database
-data, leave_data = get_data_from_db()
+try:
+    overview = load_employee_overview(data_version("employee_table", "leave_entries"))
+except Exception as e:
+    st.error(f"Database connection error: {e}")
+    st.stop()
 
 # Check if data is loaded successfully
-if data.empty:
+if not overview["employee_records"]:
     st.error("No employee data found in database. Please check your database connection and table structure.")
     st.stop()
 
 st.title("Frontline Agent Program")
 
 # Partner filter for dynamic metrics
-if 'Partner' in data.columns:
-    partner_column = 'Partner_Name'
-elif 'partner' in data.columns:
-    partner_column = 'partner'
-else:
-    st.error("Partner column not found in database. Please check your table structure.")
-    st.stop()
+partner_options = overview["partners"]
+termination_col = overview["termination_col"]
+performance_col = overview["performance_col"]
 
 selected_partners = st.multiselect(
     "Select Partners to Monitor:",
-    options=data[partner_column].unique(),
-    default=data[partner_column].unique()  # Default to all partners
+    options=partner_options,
+    default=partner_options  # Default to all partners
 )
 
-# Filter data based on selected partners
-filtered_data = data[data[partner_column].isin(selected_partners)] if selected_partners else data
+# Metrics for the selected partners only, aggregated in SQL
+partner_summary = get_partner_summary(overview, selected_partners or partner_options)
+partner_rows = list(partner_summary.values())
+
+def total(metric, rows=partner_rows):
+    return sum(row[metric] for row in rows)
 
 st.divider()
 
@@ -100,42 +124,31 @@ st.divider()
 col1, col2, col3, col4 = st.columns(4)
 
 # Calculate dynamic metrics
-total_employees = len(filtered_data)
-
-# Handle different possible column names for termination date
-termination_columns = ['DateofTermination', 'date_of_termination', 'termination_date', 'end_date']
-termination_col = None
-for col in termination_columns:
-    if col in filtered_data.columns:
-        termination_col = col
-        break
+total_employees = total("headcount")
 
 if termination_col:
-    terminated_employees = filtered_data[termination_col].notnull().sum()
+    terminated_employees = total("terminated")
 else:
     terminated_employees = 0
     st.warning("Termination date column not found in database")
 
 active_employees = total_employees - terminated_employees
 
-# Calculate leave liability dynamically
-liability_columns = ['leave_entitlements', 'Leave_Liability', 'leave_liability']
-total_leave_liability = 0
-for col in liability_columns:
-    if col in filtered_data.columns:
-        total_leave_liability = filtered_data[col].sum()
-        break
+# Accrued leave liability for the selected partners
+try:
+    leave_liability_by_partner = load_leave_liability(
+        date.today().isoformat(), data_version("employee_table", "leave_entries", "leave_entitlements_data")
+    )
+except Exception as e:
+    st.error(f"Error computing leave liability: {e}")
+    leave_liability_by_partner = pd.DataFrame(columns=["liability", "change_pct"])
+total_leave_liability = leave_liability_by_partner["liability"].reindex(list(partner_summary), fill_value=0).sum()
 
 # Calculate turnover rate
 turnover_rate = (terminated_employees / total_employees * 100) if total_employees > 0 else 0
 
-# Calculate average leave days per employee
-leave_day_columns = ['Cumulative_Leave_Days', 'cumulative_leave_days', 'total_leave_days']
-avg_leave_days = 0
-for col in leave_day_columns:
-    if col in filtered_data.columns:
-        avg_leave_days = filtered_data[col].mean() if total_employees > 0 else 0
-        break
+# Average approved leave days per employee (from the leave balance ledger)
+avg_leave_days = total("leave_days") / total_employees if total_employees > 0 else 0
 
 with col1:
     st.metric(
@@ -173,29 +186,20 @@ with st.container(border=False):
     col1, col2 = st.columns(2, gap='medium', vertical_alignment='top')
     
     # Sheer Logic Metrics
-    sheerlogic_data = filtered_data[filtered_data[partner_column] == 'Sheer Logic']
-    sheerlogic_employees = len(sheerlogic_data)
-    sheerlogic_terminated = sheerlogic_data[termination_col].notnull().sum() if termination_col else 0
-    
-    # Dynamic leave liability calculation for Sheer Logic
-    sheerlogic_liability = 0
-    for col in liability_columns:
-        if col in sheerlogic_data.columns:
-            sheerlogic_liability = sheerlogic_data[col].sum()
-            break
-    
-    # Calculate month-over-month change (you'd need historical data for real delta)
-    sheerlogic_liability_change = 2.5  # Placeholder - calculate from historical data
+    sheerlogic_data = partner_summary.get('Sheer Logic')
+    sheerlogic_employees = sheerlogic_data["headcount"] if sheerlogic_data else 0
+    sheerlogic_terminated = sheerlogic_data["terminated"] if sheerlogic_data else 0
+    sheerlogic_liability = leave_liability_by_partner["liability"].get('Sheer Logic', 0)
     
     with col1:
-        if len(sheerlogic_data) > 0:
+        if sheerlogic_employees > 0:
             st.image('file (1).svg', width=360)
             col3, col4 = st.columns(2)
             with col3:
                 st.metric(
                     'Current Leave Liability in KES',
                     prettify(round(sheerlogic_liability)),
-                    f'+{sheerlogic_liability_change}%' if sheerlogic_liability_change > 0 else f'{sheerlogic_liability_change}%'
+                    liability_delta('Sheer Logic')
                 )
             with col4:    
                 st.metric(
@@ -207,28 +211,20 @@ with st.container(border=False):
             st.info("No Sheer Logic employees found in selected data")
 
     # Fine Media Metrics  
-    fine_media_data = filtered_data[filtered_data[partner_column] == 'Fine Media']
-    fine_media_employees = len(fine_media_data)
-    fine_media_terminated = fine_media_data[termination_col].notnull().sum() if termination_col else 0
-    
-    # Dynamic leave liability calculation for Fine Media
-    fine_media_liability = 0
-    for col in liability_columns:
-        if col in fine_media_data.columns:
-            fine_media_liability = fine_media_data[col].sum()
-            break
-    
-    fine_media_liability_change = -2.5  # Placeholder - calculate from historical data
+    fine_media_data = partner_summary.get('Fine Media')
+    fine_media_employees = fine_media_data["headcount"] if fine_media_data else 0
+    fine_media_terminated = fine_media_data["terminated"] if fine_media_data else 0
+    fine_media_liability = leave_liability_by_partner["liability"].get('Fine Media', 0)
     
     with col2:
-        if len(fine_media_data) > 0:
+        if fine_media_employees > 0:
             st.image("file.svg", width=450) 
             col5, col6 = st.columns(2)
             with col5:
                 st.metric(
                     'Current Leave Liability in KES',
                     prettify(round(fine_media_liability)),
-                    f'+{fine_media_liability_change}%' if fine_media_liability_change > 0 else f'{fine_media_liability_change}%'
+                    liability_delta('Fine Media')
                 )
             with col6:    
                 st.metric(
@@ -245,12 +241,8 @@ st.divider()
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    performance_columns = ['PerformanceScore', 'performance_score', 'performance_rating']
-    avg_performance = 0
-    for col in performance_columns:
-        if col in filtered_data.columns:
-            avg_performance = filtered_data[col].mean()
-            break
+    performance_count = total("performance_count")
+    avg_performance = total("performance_sum") / performance_count if performance_count else 0
     
     st.metric(
         label="📊 Avg Performance Score",
@@ -260,12 +252,7 @@ with col1:
     )
 
 with col2:
-    denied_leave_columns = ['Amnt_Denied_Leave_Request', 'denied_leave_requests', 'leave_denials']
-    total_leave_requests = 0
-    for col in denied_leave_columns:
-        if col in filtered_data.columns:
-            total_leave_requests = filtered_data[col].sum()
-            break
+    total_leave_requests = total("denied_requests")
     
     st.metric(
         label="📋 Leave Requests Denied",
@@ -282,17 +269,11 @@ with col3:
     )
 
 # Pie Chart with filtered data
-leave_days_col = None
-for col in leave_day_columns:
-    if col in filtered_data.columns:
-        leave_days_col = col
-        break
-
-if leave_days_col:
+if total("leave_days") > 0:
     fig = px.pie(
-        data_frame=filtered_data,
-        names=partner_column,
-        values=leave_days_col,
+        data_frame=pd.DataFrame(partner_rows),
+        names="partner",
+        values="leave_days",
         title="Cumulative Leave Days by Partner"
     )    
     st.plotly_chart(fig)
@@ -306,22 +287,15 @@ try:
     # Dropdown for filtering by partner
     selected_partner = st.selectbox(
         "Select Partner for Detailed Analysis:",
-        filtered_data[partner_column].unique() if len(filtered_data) > 0 else ['No data available']
+        list(partner_summary) if partner_summary else ['No data available']
     )
 
-    if len(filtered_data) > 0 and selected_partner in filtered_data[partner_column].values:
-        # Filter data based on selected partner
-        partner_filtered_df = filtered_data[filtered_data[partner_column] == selected_partner]
-
-        # Dynamic performance metrics
-        performance_col = None
-        for col in performance_columns:
-            if col in partner_filtered_df.columns:
-                performance_col = col
-                break
+    if selected_partner in partner_summary:
+        partner_employees = partner_summary[selected_partner]["headcount"]
         
         if performance_col:
-            performance_counts = partner_filtered_df[performance_col].value_counts().reset_index()
+            # Distribution of scores for this partner, counted in SQL
+            performance_counts = pd.DataFrame(repo.get_partner_value_counts(selected_partner, performance_col))
             performance_counts.columns = [performance_col, 'count']
             
             # Create performance chart
@@ -336,26 +310,27 @@ try:
             
             # Additional partner-specific metrics
             col1, col2, col3 = st.columns(3)
+            scores = pd.to_numeric(performance_counts[performance_col], errors='coerce')
             
             with col1:
-                high_performers = len(partner_filtered_df[partner_filtered_df[performance_col] >= 4])
+                high_performers = int(performance_counts.loc[scores >= 4, 'count'].sum())
                 st.metric(
                     "🌟 High Performers (4+)",
                     high_performers,
-                    f"{high_performers/len(partner_filtered_df)*100:.1f}%" if len(partner_filtered_df) > 0 else "0%"
+                    f"{high_performers/partner_employees*100:.1f}%" if partner_employees > 0 else "0%"
                 )
             
             with col2:
-                low_performers = len(partner_filtered_df[partner_filtered_df[performance_col] <= 2])
+                low_performers = int(performance_counts.loc[scores <= 2, 'count'].sum())
                 st.metric(
                     "⚠️ Low Performers (≤2)",
                     low_performers,
-                    f"{low_performers/len(partner_filtered_df)*100:.1f}%" if len(partner_filtered_df) > 0 else "0%"
+                    f"{low_performers/partner_employees*100:.1f}%" if partner_employees > 0 else "0%"
                 )
                 
             with col3:
-                partner_turnover = partner_filtered_df[termination_col].notnull().sum() if termination_col else 0
-                partner_turnover_rate = (partner_turnover / len(partner_filtered_df) * 100) if len(partner_filtered_df) > 0 else 0
+                partner_turnover = partner_summary[selected_partner]["terminated"]
+                partner_turnover_rate = (partner_turnover / partner_employees * 100) if partner_employees > 0 else 0
                 st.metric(
                     "📉 Partner Turnover Rate",
                     f"{partner_turnover_rate:.1f}%",
@@ -370,9 +345,8 @@ except Exception as e:
 
 # Database connection info
 st.sidebar.markdown("### Database Connection")
-st.sidebar.info(f"Connected to SQLite database\nEmployee records: {len(data)}\nLeave records: {len(leave_data)}")
+st.sidebar.info(f"Connected to SQLite database\nEmployee records: {overview['employee_records']}\nLeave records: {overview['leave_records']}")
 
-# Refresh data button
+# Refresh data button: cached tables reload on their own once their version changes
 if st.sidebar.button("🔄 Refresh Data"):
-    st.cache_data.clear()
     st.rerun()
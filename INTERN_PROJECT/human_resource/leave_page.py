@@ -1,36 +1,27 @@
 import streamlit as st
 import pandas as pd
+import os
 import sqlite3
+import sys
 from datetime import date, datetime
 
-# Define the path to your SQLite database
-DB_PATH = '/Users/danielwanganga/Documents/GitHub/PROJECT_FRONTLINE/INTERN_PROJECT/leave_management.db'
+# --- Shared data-access layer (INTERN_PROJECT/leave_db.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from leave_db import LeaveRepository, fetch_all, get_pool
+
+repo = LeaveRepository()
 
 def init_db():
     """
-    Initializes the SQLite database and creates the 'leaves' table if it doesn't exist.
+    Checks the leave database is on the latest schema; run leave_migrations.py first.
     This function should be called once at the start of your main application.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS leave_entry (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_name TEXT NOT NULL,
-                leave_type TEXT NOT NULL,
-                start_date TEXT NOT NULL, -- Changed to TEXT for ISO format
-                end_date TEXT NOT NULL,   -- Changed to TEXT for ISO format
-                description TEXT,
-                attachment BOOLEAN,
-                status TEXT NOT NULL,
-                decline_reason TEXT,
-                recall_reason TEXT
-            )
-        ''')
-        conn.commit()
-        conn.close()
-        # print(f"Database initialized at {DB_PATH}") # Comment out for cleaner Streamlit output
+        get_pool()
+    except RuntimeError as e:
+        # The schema is behind; the message says how to migrate it
+        st.error(f"The leave database needs migrating: {e}")
+        st.stop()
     except sqlite3.Error as e:
         st.error(f"Error initializing database: {e}") # Use st.error for Streamlit
 
@@ -40,14 +31,11 @@ def apply_for_leave(employee_name, leave_type, start_date, end_date, description
     Dates are converted to ISO format strings for storage.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO leave_entry (employee_name, leave_type, start_date, end_date, description, attachment, status)
-            VALUES (?, ?, ?, ?, ?, ?, 'Pending')
-        ''', (employee_name, leave_type, start_date.isoformat(), end_date.isoformat(), description, attachment))
-        conn.commit()
-        conn.close()
+        employee = repo.get_employee_by_name(employee_name)
+        if employee is None:
+            st.error(f"No employee named {employee_name} was found.")
+            return
+        repo.apply_for_leave(employee["uuid"], employee_name, leave_type, start_date, end_date, description, attachment)
         st.success(f"Leave application submitted for {employee_name}") # Use st.success for Streamlit
     except sqlite3.Error as e:
         st.error(f"Error applying for leave: {e}") # Use st.error for Streamlit
@@ -58,13 +46,7 @@ def get_leave_history(employee_name):
     Returns a list of dictionaries with column names.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row # Enable dictionary-like access
-        c = conn.cursor()
-        c.execute("SELECT leave_type, start_date, end_date, description, status FROM leave_entry WHERE employee_name = ?", (employee_name,))
-        history = [dict(row) for row in c.fetchall()]
-        conn.close()
-        return history
+        return fetch_all("SELECT leave_type, start_date, end_date, description, status FROM leave_entries WHERE employee_name = ?", (employee_name,))
     except sqlite3.Error as e:
         st.error(f"Error fetching leave history: {e}")
         return []
@@ -75,13 +57,7 @@ def get_all_pending_leaves():
     Returns a list of dictionaries.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT id, employee_name, leave_type, start_date, end_date, description FROM leave_entry WHERE status = 'Pending'")
-        pending_leaves = [dict(row) for row in c.fetchall()]
-        conn.close()
-        return pending_leaves
+        return repo.get_leaves_by_status("Pending")
     except sqlite3.Error as e:
         st.error(f"Error fetching pending leaves: {e}")
         return []
@@ -91,18 +67,7 @@ def update_leave_status(leave_id, new_status, reason=None):
     Updates the status of a leave request (Approved, Declined, Recalled, Withdrawn).
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        if new_status == "Declined":
-            c.execute("UPDATE leave_entry SET status = ?, decline_reason = ?, recall_reason = '' WHERE id = ?", (new_status, reason, leave_id))
-        elif new_status == "Recalled":
-            c.execute("UPDATE leave_entry SET status = ?, recall_reason = ?, decline_reason = '' WHERE id = ?", (new_status, reason, leave_id))
-        elif new_status == "Withdrawn":
-            c.execute("UPDATE leave_entry SET status = ?, recall_reason = ?, decline_reason = '' WHERE id = ?", (new_status, reason, leave_id))
-        else: # Approved
-            c.execute("UPDATE leave_entry SET status = ?, decline_reason = '', recall_reason = '' WHERE id = ?", (new_status, leave_id))
-        conn.commit()
-        conn.close()
+        repo.update_leave_status(leave_id, new_status, reason)
         st.success(f"Leave ID {leave_id} status updated to {new_status}")
     except sqlite3.Error as e:
         st.error(f"Error updating leave status: {e}")
@@ -113,31 +78,7 @@ def get_team_leaves(status_filter=None, leave_type_filter=None, employee_filter=
     Returns a list of dictionaries.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        
-        query = "SELECT employee_name, leave_type, start_date, end_date, status, description, decline_reason, recall_reason FROM leave_entry WHERE 1=1"
-        params = []
-
-        if status_filter:
-            placeholders = ','.join('?' for _ in status_filter)
-            query += f" AND status IN ({placeholders})"
-            params.extend(status_filter)
-            
-        if leave_type_filter:
-            placeholders = ','.join('?' for _ in leave_type_filter)
-            query += f" AND leave_type IN ({placeholders})"
-            params.extend(leave_type_filter)
-
-        if employee_filter and employee_filter != "All Team Members":
-            query += " AND employee_name = ?"
-            params.append(employee_filter)
-
-        c.execute(query, params)
-        leaves = [dict(row) for row in c.fetchall()]
-        conn.close()
-        return leaves
+        return repo.get_team_leaves(status_filter, leave_type_filter, employee_filter)
     except sqlite3.Error as e:
         st.error(f"Error fetching team leaves: {e}")
         return []
@@ -148,12 +89,7 @@ def get_all_employees():
     Returns a list of employee names.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT DISTINCT employee_name FROM leave_entry")
-        employees = [row[0] for row in c.fetchall()]
-        conn.close()
-        return employees
+        return [row["employee_name"] for row in fetch_all("SELECT DISTINCT employee_name FROM leave_entries")]
     except sqlite3.Error as e:
         st.error(f"Error fetching all employees: {e}")
         return []
@@ -164,121 +100,67 @@ def get_all_leaves():
     Returns a list of dictionaries, each representing a leave record.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT id, employee_name, leave_type, start_date, end_date, description, status FROM leave_entry")
-        rows = c.fetchall()
-        conn.close()
-        
-        leaves = []
-        for row in rows:
-            leaves.append(dict(row))
-        return leaves
+        return repo.get_all_leaves()
     except sqlite3.Error as e:
         st.error(f"Error fetching all leaves: {e}")
         return []
 
 def withdraw_leave(leave_id, recall_reason=None):
     """
-    Marks a leave request as 'Withdrawn' with an optional reason.
+    Marks a pending leave request as 'Withdrawn' with an optional reason.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("UPDATE leave_entry SET status = 'Withdrawn', recall_reason = ?, decline_reason = '' WHERE id = ?", (recall_reason, leave_id))
-        conn.commit()
-        conn.close()
-        st.info(f"Leave ID {leave_id} withdrawn.")
+        result = repo.apply_status_transitions([(leave_id, "Withdrawn", recall_reason)])[0]
+        if result["ok"]:
+            st.info(f"Leave ID {leave_id} withdrawn.")
+        else:
+            st.warning(f"Leave ID {leave_id} not withdrawn: {result['error']}")
     except sqlite3.Error as e:
         st.error(f"Error withdrawing leave: {e}")
 
 # --- New functions for HR Dashboard (leave_page.py) - Modified for dynamic metrics ---
 
-def calculate_leave_days(start_date_str, end_date_str):
-    """Calculates the number of days between start and end dates (inclusive)."""
-    try:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        return (end_date - start_date).days + 1
-    except ValueError:
-        return 0 # Handle potential bad date formats
-
-def get_approved_days_for_partner_by_year(partner_name, year):
+def get_partner_metrics(partners, years):
     """
-    Calculates total approved leave days for a specific partner in a given year.
-    Assumes 'employee_name' can be used to group by 'partner'.
+    HR metrics for every partner and year in one lookup on the leave_partner_year_stats
+    aggregate (kept current by triggers on leave_entries).
+    Returns {(partner, year): {"approved_days", "denied_requests", "cumulated_days"}}.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        # Query for dates within the specified year
-        c.execute(f"""
-            SELECT start_date, end_date
-            FROM leave_entry
-            WHERE status = 'Approved'
-            AND employee_name LIKE ?
-            AND SUBSTR(start_date, 1, 4) = ?
-        """, (f"%{partner_name}%", str(year)))
-        rows = c.fetchall()
-        conn.close()
-        
-        total_days = 0
-        for row in rows:
-            total_days += calculate_leave_days(row[0], row[1])
-        return total_days
+        stats = repo.get_partner_year_stats(partners, years)
     except sqlite3.Error as e:
-        st.error(f"Error getting approved days for partner {partner_name} in {year}: {e}")
-        return 0
+        st.error(f"Error getting leave metrics for {', '.join(partners)}: {e}")
+        stats = {(partner, int(year)): {} for partner in partners for year in years}
+
+    metrics = {}
+    for key, by_status in stats.items():
+        def days(status):
+            return by_status.get(status, {}).get("days", 0)
+        metrics[key] = {
+            "approved_days": days("Approved"),
+            "denied_requests": by_status.get("Declined", {}).get("requests", 0),
+            # Cumulated = every leave that started in the year and was not declined/withdrawn/recalled
+            "cumulated_days": days("Approved") + days("Pending"),
+        }
+    return metrics
+
+def get_approved_days_for_partner_by_year(partner_name, year):
+    """Total approved leave days for a specific partner in a given year."""
+    return get_partner_metrics([partner_name], [year])[(partner_name, int(year))]["approved_days"]
 
 def get_denied_requests_for_partner_by_year(partner_name, year):
-    """
-    Counts total denied leave requests for a specific partner in a given year.
-    Assumes 'employee_name' can be used to group by 'partner'.
-    """
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute(f"""
-            SELECT COUNT(id)
-            FROM leave_entry
-            WHERE status = 'Declined'
-            AND employee_name LIKE ?
-            AND SUBSTR(start_date, 1, 4) = ?
-        """, (f"%{partner_name}%", str(year)))
-        denied_requests = c.fetchone()[0]
-        conn.close()
-        return denied_requests if denied_requests is not None else 0
-    except sqlite3.Error as e:
-        st.error(f"Error getting denied requests for partner {partner_name} in {year}: {e}")
-        return 0
+    """Counts total denied leave requests for a specific partner in a given year."""
+    return get_partner_metrics([partner_name], [year])[(partner_name, int(year))]["denied_requests"]
 
 def get_cumulated_leave_days_for_partner_by_year(partner_name, year):
     """
     Calculates total cumulated leave days for a specific partner in a given year.
     This sums up the duration of all non-denied/non-withdrawn leaves that started in the year.
     """
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute(f"""
-            SELECT start_date, end_date
-            FROM leave_entry
-            WHERE status IN ('Approved', 'Pending')
-            AND employee_name LIKE ?
-            AND SUBSTR(start_date, 1, 4) = ?
-        """, (f"%{partner_name}%", str(year)))
-        rows = c.fetchall()
-        conn.close()
-
-        total_cumulated_days = 0
-        for row in rows:
-            total_cumulated_days += calculate_leave_days(row[0], row[1])
-        return total_cumulated_days if total_cumulated_days is not None else 0
-    except sqlite3.Error as e:
-        st.error(f"Error getting cumulated leave days for partner {partner_name} in {year}: {e}")
-        return 0
+    return get_partner_metrics([partner_name], [year])[(partner_name, int(year))]["cumulated_days"]
+
 
+LEAVE_TABLE_COLUMNS = ("employee_name", "leave_type", "start_date", "end_date")
 
 def get_upcoming_leaves():
     """
@@ -286,21 +168,7 @@ def get_upcoming_leaves():
     Returns a list of dictionaries.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        today = date.today().isoformat()
-        c.execute("""
-            SELECT employee_name, leave_type, start_date, end_date
-            FROM leave_entry
-            WHERE status = 'Approved' AND start_date > ?
-            ORDER BY start_date ASC
-        """, (today,))
-        rows = c.fetchall()
-        conn.close()
-        
-        upcoming_leaves = [dict(row) for row in rows]
-        return upcoming_leaves
+        return [{column: leave[column] for column in LEAVE_TABLE_COLUMNS} for leave in repo.get_upcoming_leaves()]
     except sqlite3.Error as e:
         st.error(f"Error fetching upcoming leaves: {e}")
         return []
@@ -311,21 +179,7 @@ def get_current_leaves():
     Returns a list of dictionaries.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        today = date.today().isoformat()
-        c.execute("""
-            SELECT employee_name, leave_type, start_date, end_date
-            FROM leave_entry
-            WHERE status = 'Approved' AND start_date <= ? AND end_date >= ?
-            ORDER BY start_date ASC
-        """, (today, today))
-        rows = c.fetchall()
-        conn.close()
-        
-        current_leaves = [dict(row) for row in rows]
-        return current_leaves
+        return [{column: leave[column] for column in LEAVE_TABLE_COLUMNS} for leave in repo.get_leaves_on(date.today())]
     except sqlite3.Error as e:
         st.error(f"Error fetching current leaves: {e}")
         return []
@@ -345,23 +199,28 @@ def leave_management_page():
     current_year = date.today().year
     previous_year = current_year - 1
 
-    # --- Fetching data for Fine Media ---
-    approved_days_finemedia_current = get_approved_days_for_partner_by_year("Fine Media", current_year)
-    denied_requests_finemedia_current = get_denied_requests_for_partner_by_year("Fine Media", current_year)
-    cumulated_leave_finemedia_current = get_cumulated_leave_days_for_partner_by_year("Fine Media", current_year)
+    # --- Fetching data for both partners and years in one lookup ---
+    partner_metrics = get_partner_metrics(["Fine Media", "Sheer Logic"], [current_year, previous_year])
+    finemedia_current = partner_metrics[("Fine Media", current_year)]
+    finemedia_prev = partner_metrics[("Fine Media", previous_year)]
+    sheerlogic_current = partner_metrics[("Sheer Logic", current_year)]
+    sheerlogic_prev = partner_metrics[("Sheer Logic", previous_year)]
+
+    approved_days_finemedia_current = finemedia_current["approved_days"]
+    denied_requests_finemedia_current = finemedia_current["denied_requests"]
+    cumulated_leave_finemedia_current = finemedia_current["cumulated_days"]
 
-    approved_days_finemedia_prev = get_approved_days_for_partner_by_year("Fine Media", previous_year)
-    denied_requests_finemedia_prev = get_denied_requests_for_partner_by_year("Fine Media", previous_year)
-    cumulated_leave_finemedia_prev = get_cumulated_leave_days_for_partner_by_year("Fine Media", previous_year)
+    approved_days_finemedia_prev = finemedia_prev["approved_days"]
+    denied_requests_finemedia_prev = finemedia_prev["denied_requests"]
+    cumulated_leave_finemedia_prev = finemedia_prev["cumulated_days"]
 
-    # --- Fetching data for Sheer Logic ---
-    approved_days_sheerlogic_current = get_approved_days_for_partner_by_year("Sheer Logic", current_year)
-    denied_requests_sheerlogic_current = get_denied_requests_for_partner_by_year("Sheer Logic", current_year)
-    cumulated_leave_sheerlogic_current = get_cumulated_leave_days_for_partner_by_year("Sheer Logic", current_year)
+    approved_days_sheerlogic_current = sheerlogic_current["approved_days"]
+    denied_requests_sheerlogic_current = sheerlogic_current["denied_requests"]
+    cumulated_leave_sheerlogic_current = sheerlogic_current["cumulated_days"]
 
-    approved_days_sheerlogic_prev = get_approved_days_for_partner_by_year("Sheer Logic", previous_year)
-    denied_requests_sheerlogic_prev = get_denied_requests_for_partner_by_year("Sheer Logic", previous_year)
-    cumulated_leave_sheerlogic_prev = get_cumulated_leave_days_for_partner_by_year("Sheer Logic", previous_year)
+    approved_days_sheerlogic_prev = sheerlogic_prev["approved_days"]
+    denied_requests_sheerlogic_prev = sheerlogic_prev["denied_requests"]
+    cumulated_leave_sheerlogic_prev = sheerlogic_prev["cumulated_days"]
 
     # --- Calculate Deltas ---
     def calculate_delta(current_value, previous_value):
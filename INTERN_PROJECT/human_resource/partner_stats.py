@@ -5,6 +5,12 @@ import plotly.express as px
 import sqlite3
 import uuid # Needed for potential record IDs if adding/modifying leaves
 from datetime import datetime, timedelta # Needed for date handling
+import os
+import sys
+
+# --- Shared data-access layer (INTERN_PROJECT/leave_db.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from leave_db import data_version, fetch_all
 
 # --- Database connection path for leave management ---
 LEAVE_DB_PATH = '../leave_management.db'
@@ -27,17 +33,14 @@ def init_leave_db():
     conn.commit()
     conn.close()
 
-@st.cache_data
+@st.cache_data(max_entries=2)
+def load_all_leaves(version):
+    """Leave records for one leave_entries change-feed version (reloaded after any leave write)."""
+    return fetch_all("SELECT id, employee_name, leave_type, start_date, end_date, description, status FROM leave_entries")
+
 def get_all_leaves():
     """Fetches all leave records from the leave management database."""
-    conn = sqlite3.connect(LEAVE_DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT id, employee_name, leave_type, start_date, end_date, description, status FROM leave_entries")
-    rows = c.fetchall()
-    conn.close()
-    # Convert sqlite3.Row objects to dictionaries for serializability
-    return [dict(row) for row in rows]
+    return load_all_leaves(data_version("leave_entries"))
 
 # Initialize the leave database when the app starts
 init_leave_db()
@@ -1,25 +1,29 @@
 import streamlit as st 
 import pandas as pd
 import plotly.express as px
+import os
+import sys
 from millify import prettify
 
+# --- Payroll aggregates over the Parquet snapshot (INTERN_PROJECT/payroll_stats.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import payroll_stats
 
+# Computed once per payroll version; everything below is a lookup
+payroll = payroll_stats.aggregates()
 
-data = pd.read_csv("partner_streamlit.csv")
 st.title("Partner Payroll")
 
 # Dropdown for filtering by partner
 selected_partner = st.selectbox(
     "Select Partner:",
-    data['Partner'].unique()
+    payroll.partners
 )
 
-# Filter data based on selected partner
-filtered_df = data[data['Partner'] == selected_partner]
-
-salary = filtered_df['Salary'].sum()
-department_avg_sal = round(filtered_df.groupby('Department')['Salary'].mean().reset_index(),0)
-headcount = len(filtered_df['EmpID'])
+partner_totals = payroll.partner(selected_partner)
+salary = partner_totals['salary_total']
+department_avg_sal = round(payroll.departments(selected_partner)[['Department', 'salary_mean']].rename(columns={'salary_mean': 'Salary'}),0)
+headcount = partner_totals['headcount']
 salary = prettify(salary)
 
 col1,col2 = st.columns(2,gap='large')
@@ -31,4 +35,13 @@ with col2:
     st.metric("Current Headcount",headcount,'+1.32%')        
 st.subheader('Avg Salary Paid Per Department')
 st.dataframe(department_avg_sal,hide_index=True)
-    
+
+st.subheader('Partner Comparison')
+compared_partners = st.multiselect("Compare Partners:", payroll.partners, default=payroll.partners)
+if compared_partners:
+    comparison = payroll.compare(compared_partners).rename(columns={
+        'salary_total': 'Total Salary', 'salary_mean': 'Avg Salary', 'headcount': 'Headcount', 'leave_liability': 'Leave Liability',
+    })
+    st.dataframe(round(comparison, 0))
+    department_comparison = payroll.compare_departments(compared_partners)
+    st.plotly_chart(px.bar(department_comparison, barmode='group', labels={'value': 'Avg Salary'}))
@@ -0,0 +1,156 @@
+"""
+Vectorized leave-day arithmetic shared by the frontline, manager and HR apps.
+
+Every function takes whole columns of start/end dates (lists, Series or arrays of ISO
+strings, dates or ``datetime64``) and works on ``datetime64[D]`` arrays, so a report over
+the full workforce is a handful of NumPy operations instead of a ``strptime`` per row.
+Unparseable dates become ``NaT`` and count as 0 days.
+
+Days are calendar days, inclusive of both ends, unless a ``LeaveCalendar`` is passed, in
+which case only working days that are not public holidays count.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Kenyan public holidays that fall on the same date every year (month, day). Easter and
+# the Eid holidays move, so pass their dates to LeaveCalendar explicitly.
+KENYA_FIXED_HOLIDAYS = (
+    (1, 1),    # New Year's Day
+    (5, 1),    # Labour Day
+    (6, 1),    # Madaraka Day
+    (10, 10),  # Mazingira Day
+    (10, 20),  # Mashujaa Day
+    (12, 12),  # Jamhuri Day
+    (12, 25),  # Christmas Day
+    (12, 26),  # Boxing Day
+)
+
+
+def to_days(values):
+    """Converts a column of dates to a ``datetime64[D]`` array (``NaT`` where unparseable)."""
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[D]")
+    parsed = pd.to_datetime(pd.Series(values, dtype="object"), errors="coerce", format="ISO8601")
+    return parsed.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+
+
+def _day(value):
+    return to_days([value])[0] if not isinstance(value, np.datetime64) else value.astype("datetime64[D]")
+
+
+class LeaveCalendar:
+    """
+    Working-day calendar for leave counts: a weekmask plus public holidays.
+
+    ``holidays`` are extra dates (for example Easter Monday); ``fixed_holidays`` are
+    ``(month, day)`` pairs repeated for every year in ``years``.
+    """
+
+    def __init__(self, weekmask="Mon Tue Wed Thu Fri", holidays=(), fixed_holidays=KENYA_FIXED_HOLIDAYS,
+                 years=None):
+        years = range(date.today().year - 2, date.today().year + 3) if years is None else years
+        dates = [date(year, month, day) for year in years for month, day in fixed_holidays]
+        all_holidays = np.unique(np.concatenate([to_days(dates), to_days(list(holidays))]))
+        self.holidays = all_holidays[~np.isnat(all_holidays)]
+        self.busdaycalendar = np.busdaycalendar(weekmask=weekmask, holidays=self.holidays)
+
+    def count(self, starts, ends_exclusive):
+        """Working days in ``[starts, ends_exclusive)`` for aligned ``datetime64[D]`` arrays."""
+        return np.busday_count(starts, ends_exclusive, busdaycal=self.busdaycalendar)
+
+
+def _count_days(starts, ends, calendar=None):
+    """Inclusive day counts for ``datetime64[D]`` arrays; 0 where a date is NaT or end < start."""
+    valid = ~(np.isnat(starts) | np.isnat(ends)) & (ends >= starts)
+    days = np.zeros(starts.shape, dtype=np.int64)
+    if calendar is None:
+        days[valid] = (ends[valid] - starts[valid]).astype(np.int64) + 1
+    else:
+        days[valid] = calendar.count(starts[valid], ends[valid] + np.timedelta64(1, "D"))
+    return days
+
+
+def leave_days(starts, ends, calendar=None):
+    """Number of leave days per row, inclusive of both ends."""
+    return _count_days(to_days(starts), to_days(ends), calendar)
+
+
+def overlap_days(starts, ends, period_start, period_end, calendar=None):
+    """Days of each leave that fall inside ``[period_start, period_end]`` (inclusive)."""
+    starts, ends = to_days(starts), to_days(ends)
+    clipped_starts = np.maximum(starts, _day(period_start))
+    clipped_ends = np.minimum(ends, _day(period_end))
+    # np.maximum/minimum propagate NaT, so invalid rows stay at 0
+    return _count_days(clipped_starts, clipped_ends, calendar)
+
+
+def overlaps(starts, ends, period_start, period_end):
+    """Boolean mask of leaves that share at least one day with ``[period_start, period_end]``."""
+    starts, ends = to_days(starts), to_days(ends)
+    return (starts <= _day(period_end)) & (ends >= _day(period_start))
+
+
+def days_left(starts, ends, today=None, calendar=None):
+    """
+    Leave days still to be taken from ``today`` on: the whole leave if it has not started,
+    the rest of it if it is ongoing, 0 once it has ended.
+    """
+    today = _day(today or date.today())
+    starts, ends = to_days(starts), to_days(ends)
+    return _count_days(np.maximum(starts, today), ends, calendar)
+
+
+def used_days(leaves, by=("leave_id", "leave_type"), calendar=None, status="Approved"):
+    """
+    Total leave days per group for a table of leaves (rows with ``start_date``, ``end_date``,
+    ``status`` and the ``by`` columns). Returns a Series indexed by ``by``.
+    """
+    frame = pd.DataFrame(leaves, columns=[*by, "start_date", "end_date", "status"])
+    if status is not None:
+        frame = frame[frame["status"] == status]
+    days = pd.Series(leave_days(frame["start_date"], frame["end_date"], calendar), index=frame.index)
+    return days.groupby([frame[column] for column in by]).sum() if by else days.sum()
+
+
+def remaining_days(entitlements, used):
+    """Entitlement minus used days, floored at 0; aligned Series (missing used = 0) or scalars."""
+    if isinstance(entitlements, pd.Series):
+        return entitlements.sub(used, fill_value=0).clip(lower=0).astype(np.int64)
+    return max(int(entitlements) - int(used), 0)
+
+
+# The ``freq`` values period_totals accepts and the calendar period each one stands for.
+# Start- and end-anchored aliases give the same periods; results are always indexed by start.
+PERIOD_FREQUENCIES = {
+    "D": "D",
+    "W": "W",  # Monday to Sunday
+    "MS": "M", "ME": "M",
+    "QS": "Q", "QE": "Q",
+    "YS": "Y", "YE": "Y",
+}
+
+
+def period_totals(starts, ends, freq="MS", period_start=None, period_end=None, calendar=None):
+    """
+    Leave days falling in each period (``freq`` is one of ``PERIOD_FREQUENCIES``, e.g.
+    ``"MS"`` for months or ``"YS"`` for years). Leaves that span a boundary are split
+    between periods. Returns a Series indexed by period start.
+    """
+    if freq not in PERIOD_FREQUENCIES:
+        raise ValueError(f"Unsupported period frequency {freq!r}, expected one of {sorted(PERIOD_FREQUENCIES)}")
+    starts, ends = to_days(starts), to_days(ends)
+    valid = ~(np.isnat(starts) | np.isnat(ends))
+    if not valid.any():
+        return pd.Series(dtype=np.int64)
+    first = _day(period_start) if period_start is not None else starts[valid].min()
+    last = _day(period_end) if period_end is not None else ends[valid].max()
+    periods = pd.period_range(pd.Timestamp(first), pd.Timestamp(last), freq=PERIOD_FREQUENCIES[freq])
+    period_starts = periods.start_time.to_numpy(dtype="datetime64[D]")
+    period_ends = np.append(period_starts[1:] - np.timedelta64(1, "D"), last)
+    # (leaves x periods) overlap in one broadcast
+    clipped_starts = np.maximum(starts[:, None], np.maximum(period_starts, first)[None, :])
+    clipped_ends = np.minimum(ends[:, None], period_ends[None, :])
+    totals = _count_days(clipped_starts, clipped_ends, calendar).sum(axis=0)
+    return pd.Series(totals, index=pd.DatetimeIndex(period_starts))
@@ -0,0 +1,779 @@
+"""
+Shared SQLite data access for the frontline, manager and HR Streamlit apps.
+
+Every app talks to ``leave_management.db`` through one connection pool per process, so
+page renders reuse open connections (and their prepared-statement caches) instead of
+connecting for each query. ``LeaveRepository`` holds the leave and employee helpers that
+used to be copy-pasted into every page.
+"""
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from leave_migrations import (
+    REBUILD_LEAVE_BALANCES,
+    current_version,
+    latest_version,
+    migrate_database,
+    split_statements,
+)
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("LEAVE_DB_PATH", os.path.join(PROJECT_DIR, "leave_management.db"))
+# Opt-in start-up flag: apply pending migrations when a pool is first opened
+MIGRATE_ON_START = os.environ.get("LEAVE_DB_MIGRATE", "").lower() in ("1", "true", "yes")
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def quote_identifier(name):
+    """Quotes a table or column name after checking it is a plain identifier."""
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return f'"{name}"'
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of SQLite connections to one database file.
+
+    Connections are opened lazily up to ``max_connections`` and handed out LIFO, so the
+    warmest connection (and its statement cache) is reused first. Each one runs in WAL
+    mode, which lets the three apps read while another writes. ``connection()`` commits
+    on success and rolls back on error before returning the connection to the pool.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_connections=8, timeout=30, cached_statements=256):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.max_connections:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get(timeout=self.timeout)
+
+    def _release(self, conn):
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection for one unit of work (a transaction)."""
+        conn = self._acquire()
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Closes idle connections; borrowed ones are closed when they come back."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def check_schema(db_path=DB_PATH):
+    """Raises RuntimeError when the database has migrations that were not applied yet."""
+    conn = sqlite3.connect(db_path)
+    try:
+        version = current_version(conn)
+    finally:
+        conn.close()
+    if version < latest_version():
+        raise RuntimeError(
+            f"{db_path} is at schema version {version}, the apps need {latest_version()}. "
+            f"Run `python leave_migrations.py {db_path}` or start with LEAVE_DB_MIGRATE=1."
+        )
+
+
+def get_pool(db_path=DB_PATH):
+    """
+    Returns the process-wide pool for a database file. The schema is checked on first use
+    and only migrated when the app was started with ``LEAVE_DB_MIGRATE=1``.
+    """
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            if MIGRATE_ON_START:
+                migrate_database(db_path)
+            else:
+                check_schema(db_path)
+            pool = _pools[db_path] = ConnectionPool(db_path)
+        return pool
+
+
+def fetch_all(sql, params=(), db_path=DB_PATH):
+    """Runs a query and returns every row as a dict."""
+    with get_pool(db_path).connection() as conn:
+        return [dict(row) for row in conn.execute(sql, params)]
+
+
+def fetch_one(sql, params=(), db_path=DB_PATH):
+    """Runs a query and returns the first row as a dict, or None."""
+    with get_pool(db_path).connection() as conn:
+        row = conn.execute(sql, params).fetchone()
+        return dict(row) if row else None
+
+
+def fetch_value(sql, params=(), default=None, db_path=DB_PATH):
+    """Runs a query and returns the first column of the first row."""
+    with get_pool(db_path).connection() as conn:
+        row = conn.execute(sql, params).fetchone()
+        return row[0] if row and row[0] is not None else default
+
+
+def execute(sql, params=(), db_path=DB_PATH):
+    """Runs one write statement in its own transaction and returns the affected row count."""
+    with get_pool(db_path).connection() as conn:
+        return conn.execute(sql, params).rowcount
+
+
+def data_version(*sources, db_path=DB_PATH):
+    """
+    Current change-feed version of each table in ``sources`` (kept by triggers, see
+    ``data_versions`` in leave_migrations.py) as a tuple. Passing it to a cached loader
+    makes the cache reload exactly when one of those tables has been written to.
+    """
+    versions = {row["source"]: row["version"] for row in fetch_all("SELECT source, version FROM data_versions",
+                                                                    db_path=db_path)}
+    return tuple(versions[source] for source in sources)
+
+
+class PartnerAggregates:
+    """
+    Per-partner aggregate rows kept in memory and refreshed from the ``partner_changes``
+    feed (see leave_migrations.py).
+
+    ``query(conn, partners)`` computes ``{partner: row}`` for a list of partners in SQL.
+    ``get(partners)`` runs it only for requested partners not already held; partners whose
+    employees, leaves or entitlements changed since the previous call are dropped first, so
+    a reload fetches just the deltas. Everything is reloaded on first use or when the feed
+    has been pruned past our position. Safe to share between Streamlit sessions.
+    """
+
+    def __init__(self, query, db_path=DB_PATH):
+        self.query = query
+        self.db_path = db_path
+        self._rows = {}
+        self._seq = None
+        self._lock = threading.Lock()
+
+    def get(self, partners):
+        partners = list(dict.fromkeys(partners))
+        with self._lock, get_pool(self.db_path).connection() as conn:
+            conn.execute("BEGIN")  # one snapshot for the feed position and the aggregates
+            latest, oldest = conn.execute("SELECT MAX(seq), MIN(seq) FROM partner_changes").fetchone()
+            latest = latest or 0
+            if self._seq is None or (oldest is not None and oldest > self._seq + 1):
+                self._rows = {}
+            elif latest > self._seq:
+                for (partner,) in conn.execute("SELECT DISTINCT partner FROM partner_changes WHERE seq > ?",
+                                               (self._seq,)):
+                    self._rows.pop(partner, None)
+            self._seq = latest
+            missing = [partner for partner in partners if partner not in self._rows]
+            if missing:
+                fresh = self.query(conn, missing)
+                self._rows.update({partner: fresh.get(partner) for partner in missing})
+            return {partner: self._rows[partner] for partner in partners if self._rows[partner] is not None}
+
+
+def _iso_date(value):
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return datetime.fromisoformat(str(value)).date().isoformat()
+
+
+def _day_number(value):
+    """Python twin of ``leave_migrations.day_number``: the integer part of the Julian day."""
+    return date.fromisoformat(_iso_date(value)).toordinal() + 1721424
+
+
+class LeaveRepository:
+    """
+    Leave and employee queries shared by every app.
+
+    Tables default to the normalized schema from ``leave_migrations``: ``leave_entries``
+    (leave_id is the employee uuid, ``days`` is generated from the dates), ``employee_table``
+    and ``leave_entitlements_data``.
+    """
+
+    LEAVE_COLUMNS = (
+        "id, leave_id, employee_name, leave_type, start_date, end_date, "
+        "description, status, decline_reason, recall_reason"
+    )
+
+    def __init__(self, leave_table="leave_entries", employee_table="employee_table",
+                 entitlements_table="leave_entitlements_data", db_path=DB_PATH):
+        self.leaves = quote_identifier(leave_table)
+        self.employees = quote_identifier(employee_table)
+        self.entitlements = quote_identifier(entitlements_table)
+        self.db_path = db_path
+
+    @property
+    def pool(self):
+        return get_pool(self.db_path)
+
+    def _all(self, sql, params=()):
+        return fetch_all(sql, params, db_path=self.db_path)
+
+    def _one(self, sql, params=()):
+        return fetch_one(sql, params, db_path=self.db_path)
+
+    # --- Employees ---
+
+    def get_employee_by_id(self, employee_uuid):
+        return self._one(
+            f"SELECT uuid, First_Name, Surname_Name, Email FROM {self.employees} WHERE uuid = ?",
+            (employee_uuid,),
+        )
+
+    def get_employee_by_name(self, first_name):
+        return self._one(f"SELECT uuid, First_Name FROM {self.employees} WHERE First_Name = ?", (first_name,))
+
+    def get_employee_by_email(self, email):
+        return self._one(
+            f"""
+            SELECT uuid, AUUID, First_Name, Surname_Name, Email, Sub_Department, password
+            FROM {self.employees} WHERE Email = ?
+            """,
+            (email,),
+        )
+
+    def get_employees(self):
+        """Every employee's first name, surname, email and uuid, ordered by name."""
+        return self._all(
+            f"SELECT First_Name, Surname_Name, Email, uuid FROM {self.employees} ORDER BY First_Name, Surname_Name"
+        )
+
+    def get_entitlements(self, employee_uuid):
+        return self._one(f"SELECT * FROM {self.entitlements} WHERE employee_id = ?", (employee_uuid,))
+
+    # --- Leaves ---
+
+    def apply_for_leave(self, employee_uuid, employee_name, leave_type, start_date, end_date,
+                        description, attachment=None):
+        """Inserts a Pending leave request and returns its id."""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                f"""
+                INSERT INTO {self.leaves}
+                    (leave_id, employee_name, leave_type, start_date, end_date,
+                     description, attachment, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'Pending')
+                """,
+                (employee_uuid, employee_name, leave_type, _iso_date(start_date), _iso_date(end_date),
+                 description, 1 if attachment else 0),
+            )
+            return cursor.lastrowid
+
+    def get_leave(self, leave_id):
+        return self._one(f"SELECT {self.LEAVE_COLUMNS} FROM {self.leaves} WHERE id = ?", (leave_id,))
+
+    def get_leave_history(self, employee_uuid):
+        return self._all(
+            f"SELECT {self.LEAVE_COLUMNS} FROM {self.leaves} WHERE leave_id = ? ORDER BY start_date DESC",
+            (employee_uuid,),
+        )
+
+    def get_latest_leave_for_employee(self, employee_uuid):
+        return self._one(
+            f"""
+            SELECT {self.LEAVE_COLUMNS} FROM {self.leaves}
+            WHERE leave_id = ?
+            ORDER BY start_date DESC, id DESC
+            LIMIT 1
+            """,
+            (employee_uuid,),
+        )
+
+    def get_leaves_by_status(self, status, employee_uuid=None):
+        """Leaves in one status, oldest start date first, optionally for one employee."""
+        sql = f"SELECT {self.LEAVE_COLUMNS} FROM {self.leaves} WHERE status = ?"
+        params = [status]
+        if employee_uuid is not None:
+            sql += " AND leave_id = ?"
+            params.append(employee_uuid)
+        return self._all(sql + " ORDER BY start_date ASC", params)
+
+    def get_all_leaves(self):
+        return self._all(f"SELECT {self.LEAVE_COLUMNS} FROM {self.leaves} ORDER BY id")
+
+    def get_recent_leaves(self, limit=5):
+        return self._all(f"SELECT {self.LEAVE_COLUMNS} FROM {self.leaves} ORDER BY id DESC LIMIT ?", (limit,))
+
+    @staticmethod
+    def _team_filters(status_filter=None, leave_type_filter=None, employee_filter=None, employee_uuid=None):
+        where, params = ["1=1"], []
+        if status_filter:
+            where.append(f"status IN ({','.join('?' for _ in status_filter)})")
+            params.extend(status_filter)
+        if leave_type_filter:
+            where.append(f"leave_type IN ({','.join('?' for _ in leave_type_filter)})")
+            params.extend(leave_type_filter)
+        if employee_filter and employee_filter != "All Team Members":
+            where.append("employee_name = ?")
+            params.append(employee_filter)
+        if employee_uuid:
+            where.append("leave_id = ?")
+            params.append(employee_uuid)
+        return " AND ".join(where), params
+
+    def get_team_leaves(self, status_filter=None, leave_type_filter=None, employee_filter=None):
+        """Leaves matching the manager dashboard filters, newest start date first."""
+        where, params = self._team_filters(status_filter, leave_type_filter, employee_filter)
+        return self._all(f"SELECT {self.LEAVE_COLUMNS} FROM {self.leaves} WHERE {where} ORDER BY start_date DESC", params)
+
+    # Columns the team leave browser may sort on / return
+    SORTABLE_COLUMNS = ("start_date", "end_date", "employee_name", "leave_type", "status", "days", "id")
+    PAGE_COLUMNS = ("id", "leave_id", "employee_name", "leave_type", "start_date", "end_date", "days",
+                    "description", "status", "decline_reason", "recall_reason")
+
+    def get_team_leaves_page(self, status_filter=None, leave_type_filter=None, employee_uuid=None,
+                             sort_by="start_date", descending=True, columns=None, after=None, limit=50):
+        """
+        One page of the team leave browser, filtered, sorted and projected in SQL.
+
+        Pagination is keyset-based: ``after`` is the ``next_cursor`` of the previous page
+        (a ``(sort value, id)`` pair), so every page is an index seek plus ``limit`` rows no
+        matter how deep it is. Returns ``(rows, next_cursor)``; ``next_cursor`` is None on
+        the last page.
+        """
+        if sort_by not in self.SORTABLE_COLUMNS:
+            raise ValueError(f"Cannot sort team leaves by {sort_by!r}")
+        columns = list(columns or self.PAGE_COLUMNS)
+        unknown = set(columns) - set(self.PAGE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown team leave columns: {sorted(unknown)}")
+        # The cursor needs the sort key and id even when the caller does not display them
+        selected = list(dict.fromkeys([*columns, sort_by, "id"]))
+
+        where, params = self._team_filters(status_filter, leave_type_filter, employee_uuid=employee_uuid)
+        direction, comparison = ("DESC", "<") if descending else ("ASC", ">")
+        if after is not None:
+            where += f" AND ({sort_by}, id) {comparison} (?, ?)"
+            params.extend(after)
+        rows = self._all(
+            f"""
+            SELECT {', '.join(selected)} FROM {self.leaves}
+            WHERE {where}
+            ORDER BY {sort_by} {direction}, id {direction}
+            LIMIT ?
+            """,
+            [*params, limit + 1],
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = (rows[-1][sort_by], rows[-1]["id"]) if has_more else None
+        return [{column: row[column] for column in columns} for row in rows], next_cursor
+
+    def count_team_leaves(self, status_filter=None, leave_type_filter=None, employee_uuid=None):
+        """Number of leaves matching the team browser filters (answered from indexes)."""
+        where, params = self._team_filters(status_filter, leave_type_filter, employee_uuid=employee_uuid)
+        return fetch_value(f"SELECT COUNT(*) FROM {self.leaves} WHERE {where}", params, default=0, db_path=self.db_path)
+
+    def get_dashboard_summary(self, today=None, upcoming_days=7, recent_limit=5):
+        """
+        Every counter and list on the manager dashboard from one statement: a counters row
+        (one pass over the Pending/Approved part of the status index), who is on leave
+        today (an R*Tree point lookup) and the most recent requests. Returns a dict with
+        ``pending_count``, ``approved_today``, ``team_on_leave_today``, ``upcoming_leaves``,
+        ``on_leave_today`` and ``recent_requests``.
+        """
+        today = _iso_date(today or date.today())
+        next_week = _iso_date(date.fromisoformat(today) + timedelta(days=upcoming_days))
+        list_columns = "id, leave_id, employee_name, leave_type, start_date, end_date, description, status"
+        interval_columns = ", ".join(f"l.{column}" for column in list_columns.split(", "))
+        rows = self._all(
+            f"""
+            SELECT 'counters' AS kind, NULL AS id, NULL AS leave_id, NULL AS employee_name, NULL AS leave_type,
+                   NULL AS start_date, NULL AS end_date, NULL AS description, NULL AS status,
+                   COALESCE(SUM(status = 'Pending'), 0) AS pending_count,
+                   COALESCE(SUM(status = 'Approved' AND start_date = :today), 0) AS approved_today,
+                   COALESCE(SUM(status = 'Approved' AND start_date BETWEEN :today AND :next_week), 0) AS upcoming_leaves
+            FROM {self.leaves}
+            WHERE status IN ('Pending', 'Approved')
+            UNION ALL
+            SELECT 'on_leave', {interval_columns}, NULL, NULL, NULL
+            FROM approved_leave_intervals r
+            JOIN {self.leaves} l ON l.id = r.id
+            WHERE r.start_day <= :today_number AND r.end_day >= :today_number
+            UNION ALL
+            SELECT * FROM (
+                SELECT 'recent', {list_columns}, NULL, NULL, NULL
+                FROM {self.leaves}
+                ORDER BY id DESC
+                LIMIT :recent_limit
+            )
+            """,
+            {"today": today, "today_number": _day_number(today), "next_week": next_week,
+             "recent_limit": recent_limit},
+        )
+        summary = {"on_leave_today": [], "recent_requests": []}
+        counters = ("pending_count", "approved_today", "upcoming_leaves")
+        for row in rows:
+            kind = row.pop("kind")
+            if kind == "counters":
+                summary.update({name: row[name] for name in counters})
+                continue
+            leave = {key: value for key, value in row.items() if key not in counters}
+            summary["on_leave_today" if kind == "on_leave" else "recent_requests"].append(leave)
+        summary["on_leave_today"].sort(key=lambda leave: leave["employee_name"])
+        summary["team_on_leave_today"] = len(summary["on_leave_today"])
+        summary["recent_requests"].sort(key=lambda leave: leave["id"], reverse=True)
+        return summary
+
+    # --- Approved leave intervals (approved_leave_intervals R*Tree) ---
+
+    def _interval_query(self, where, params, order="l.start_date, l.employee_name"):
+        columns = ", ".join(f"l.{column.strip()}" for column in self.LEAVE_COLUMNS.split(","))
+        return self._all(
+            f"""
+            SELECT {columns}
+            FROM approved_leave_intervals r
+            JOIN {self.leaves} l ON l.id = r.id
+            WHERE {where}
+            ORDER BY {order}
+            """,
+            params,
+        )
+
+    def get_leaves_on(self, day=None):
+        """Approved leaves that include ``day`` (default today)."""
+        day = _day_number(day or date.today())
+        return self._interval_query("r.start_day <= ? AND r.end_day >= ?", (day, day), order="l.employee_name")
+
+    def get_upcoming_leaves(self, after=None):
+        """Approved leaves starting after ``after`` (default today), soonest first."""
+        return self._interval_query("r.start_day > ?", (_day_number(after or date.today()),))
+
+    def get_team_clashes(self, employee_uuid, start, end):
+        """
+        Approved leaves of the employee's teammates (same Manager) that overlap ``[start, end]``.
+        Empty when the employee has no manager on record.
+        """
+        return self._interval_query(
+            f"""
+            r.start_day <= ? AND r.end_day >= ?
+            AND l.leave_id != ?
+            AND l.leave_id IN (
+                SELECT uuid FROM {self.employees}
+                WHERE Manager = (SELECT Manager FROM {self.employees} WHERE uuid = ?)
+            )
+            """,
+            (_day_number(end), _day_number(start), employee_uuid, employee_uuid),
+        )
+
+    # --- Balance ledger (leave_balances, kept current by triggers on leave_entries) ---
+
+    def get_leave_balance(self, employee_uuid, leave_type, entitlement_column):
+        """
+        Entitled and used days for one employee and leave type, as two primary-key reads in
+        one statement. ``entitled`` is None when the employee has no entitlements row.
+        """
+        column = quote_identifier(entitlement_column)
+        row = self._one(
+            f"""
+            SELECT (SELECT {column} FROM {self.entitlements} WHERE employee_id = :employee) AS entitled,
+                   COALESCE((SELECT used_days FROM leave_balances
+                             WHERE employee_id = :employee AND leave_type = :leave_type), 0) AS used
+            """,
+            {"employee": employee_uuid, "leave_type": leave_type},
+        )
+        return {"entitled": row["entitled"], "used": row["used"]}
+
+    def audit_leave_balances(self):
+        """Ledger rows that disagree with the approved leave history (empty when consistent)."""
+        return self._all(f"""
+            WITH history AS (
+                SELECT leave_id AS employee_id, leave_type, SUM(days) AS used_days, COUNT(*) AS approved_requests
+                FROM {self.leaves}
+                WHERE status = 'Approved'
+                GROUP BY leave_id, leave_type
+            ),
+            ledger AS (
+                SELECT employee_id, leave_type, used_days, approved_requests
+                FROM leave_balances
+                WHERE used_days != 0 OR approved_requests != 0
+            ),
+            keys AS (
+                SELECT employee_id, leave_type FROM history
+                UNION
+                SELECT employee_id, leave_type FROM ledger
+            )
+            SELECT k.employee_id, k.leave_type,
+                   COALESCE(l.used_days, 0) AS ledger_days, COALESCE(h.used_days, 0) AS history_days,
+                   COALESCE(l.approved_requests, 0) AS ledger_requests,
+                   COALESCE(h.approved_requests, 0) AS history_requests
+            FROM keys k
+            LEFT JOIN ledger l ON l.employee_id = k.employee_id AND l.leave_type = k.leave_type
+            LEFT JOIN history h ON h.employee_id = k.employee_id AND h.leave_type = k.leave_type
+            WHERE COALESCE(l.used_days, 0) != COALESCE(h.used_days, 0)
+               OR COALESCE(l.approved_requests, 0) != COALESCE(h.approved_requests, 0)
+        """)
+
+    def rebuild_leave_balances(self):
+        """Recomputes the whole ledger from the approved leave history in one transaction."""
+        with self.pool.connection() as conn:
+            for statement in split_statements(REBUILD_LEAVE_BALANCES):
+                conn.execute(statement)
+
+    def get_partner_year_stats(self, partners, years):
+        """
+        Leave days and request counts per partner, year and status, read from the
+        trigger-maintained ``leave_partner_year_stats`` table in one primary-key lookup.
+        Returns ``{(partner, year): {status: {"days", "requests"}}}`` with an entry for
+        every requested partner and year.
+        """
+        partners, years = list(partners), [int(year) for year in years]
+        stats = {(partner, year): {} for partner in partners for year in years}
+        if not stats:
+            return stats
+        rows = self._all(
+            f"""
+            SELECT partner, year, status, days, requests
+            FROM leave_partner_year_stats
+            WHERE partner IN ({','.join('?' for _ in partners)})
+              AND year IN ({','.join('?' for _ in years)})
+            """,
+            [*partners, *years],
+        )
+        for row in rows:
+            stats[(row["partner"], row["year"])][row["status"]] = {"days": row["days"], "requests": row["requests"]}
+        return stats
+
+    # --- Partner dashboards ---
+
+    def get_employee_columns(self):
+        """Column names of the employee table, for dashboards that probe for optional columns."""
+        return [row["name"] for row in self._all(f"PRAGMA table_info({self.employees})")]
+
+    def get_partners(self):
+        """Every partner with at least one employee ('' for employees without one)."""
+        return [row["partner"] for row in self._all(
+            f"SELECT DISTINCT COALESCE(Partner_Name, '') AS partner FROM {self.employees} ORDER BY 1"
+        )]
+
+    def _partner_filter(self, partners, column="Partner_Name"):
+        """WHERE clause for a partner list, with '' matching employees without a partner."""
+        named = [partner for partner in partners if partner]
+        clauses = [f"{column} IN ({','.join('?' for _ in named)})"] if named else []
+        if "" in partners:
+            clauses.append(f"{column} IS NULL OR {column} = ''")
+        return f"({' OR '.join(clauses) or '0'})", named
+
+    def query_partner_summary(self, conn, partners, terminated_column=None, performance_column=None):
+        """
+        HR dashboard metrics per partner, aggregated in SQL: headcount, terminated (non-null
+        ``terminated_column``), approved leave days (from the leave_balances ledger),
+        declined requests (from leave_partner_year_stats) and the sum/count of
+        ``performance_column``. Optional columns that are None count as 0.
+        Returns ``{partner: row}``; written to be used as a ``PartnerAggregates`` query.
+        """
+        def optional(column, template):
+            return template.format(quote_identifier(column)) if column else "0"
+
+        where, params = self._partner_filter(partners)
+        rows = conn.execute(
+            f"""
+            SELECT COALESCE(Partner_Name, '') AS partner,
+                   COUNT(*) AS headcount,
+                   {optional(terminated_column, "COUNT({})")} AS terminated,
+                   COALESCE(SUM((SELECT SUM(used_days) FROM leave_balances WHERE employee_id = e.uuid)), 0)
+                       AS leave_days,
+                   {optional(performance_column, "COALESCE(SUM({}), 0)")} AS performance_sum,
+                   {optional(performance_column, "COUNT({})")} AS performance_count
+            FROM {self.employees} AS e
+            WHERE {where}
+            GROUP BY 1
+            """,
+            params,
+        ).fetchall()
+        summary = {row["partner"]: {**dict(row), "denied_requests": 0} for row in rows}
+
+        where, params = self._partner_filter(partners, column="partner")
+        for row in conn.execute(
+            f"""
+            SELECT partner, SUM(requests) AS requests FROM leave_partner_year_stats
+            WHERE status = 'Declined' AND {where}
+            GROUP BY partner
+            """,
+            params,
+        ):
+            if row["partner"] in summary:
+                summary[row["partner"]]["denied_requests"] = row["requests"]
+        return summary
+
+    def get_partner_value_counts(self, partner, column):
+        """How many of a partner's employees have each value of ``column``."""
+        where, params = self._partner_filter([partner])
+        column = quote_identifier(column)
+        return self._all(
+            f"SELECT {column} AS value, COUNT(*) AS count FROM {self.employees} WHERE {where} "
+            f"GROUP BY {column} ORDER BY {column}",
+            params,
+        )
+
+    @staticmethod
+    def _status_assignment(new_status, reason=None):
+        """SET clause and params for a status change: the matching reason is set, the other cleared."""
+        if new_status == "Declined":
+            return "status = ?, decline_reason = ?, recall_reason = NULL", [new_status, reason]
+        if new_status in ("Recalled", "Withdrawn"):
+            return "status = ?, recall_reason = ?, decline_reason = NULL", [new_status, reason]
+        return "status = ?, decline_reason = NULL, recall_reason = NULL", [new_status]
+
+    def update_leave_status(self, leave_id, new_status, reason=None):
+        """
+        Sets a leave's status and the matching reason column (the other reason is cleared).
+        Returns the number of rows updated.
+        """
+        assignment, params = self._status_assignment(new_status, reason)
+        return execute(f"UPDATE {self.leaves} SET {assignment} WHERE id = ?", [*params, leave_id], db_path=self.db_path)
+
+    # Status changes a manager may make: (from, to)
+    STATUS_TRANSITIONS = (
+        ("Pending", "Approved"),
+        ("Pending", "Declined"),
+        ("Pending", "Withdrawn"),
+        ("Approved", "Recalled"),
+    )
+
+    def apply_status_transitions(self, transitions):
+        """
+        Applies many ``(leave_id, new_status, reason)`` changes in one transaction.
+
+        The batch is loaded into a temp table, checked against ``STATUS_TRANSITIONS`` and
+        applied with a single ``UPDATE ... FROM`` under one write lock, so a month-end
+        clean-up is one round trip. Invalid rows are skipped, not fatal. Returns one
+        ``{"id", "from_status", "to_status", "ok", "error"}`` dict per input row, in order.
+        """
+        transitions = [(leave_id, new_status, reason or None) for leave_id, new_status, reason in transitions]
+        if not transitions:
+            return []
+        allowed = ", ".join("(?, ?)" for _ in self.STATUS_TRANSITIONS)
+        allowed_params = [status for pair in self.STATUS_TRANSITIONS for status in pair]
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """
+                CREATE TEMP TABLE IF NOT EXISTS leave_status_batch (
+                    seq INTEGER PRIMARY KEY,
+                    id INTEGER NOT NULL,
+                    new_status TEXT NOT NULL,
+                    reason TEXT,
+                    old_status TEXT,
+                    error TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS temp.leave_status_batch_id ON leave_status_batch (id, seq)")
+            conn.execute("DELETE FROM temp.leave_status_batch")
+            conn.executemany(
+                "INSERT INTO temp.leave_status_batch (id, new_status, reason) VALUES (?, ?, ?)", transitions
+            )
+            # Validate every row against the current status; error stays NULL for rows to apply
+            conn.execute(
+                f"UPDATE temp.leave_status_batch AS b SET old_status = (SELECT status FROM {self.leaves} WHERE id = b.id)"
+            )
+            conn.execute(
+                f"""
+                UPDATE temp.leave_status_batch AS b
+                SET error = CASE
+                    WHEN old_status IS NULL THEN 'not found'
+                    WHEN seq > (SELECT MIN(seq) FROM temp.leave_status_batch WHERE id = b.id) THEN 'duplicate'
+                    WHEN (old_status, new_status) NOT IN (VALUES {allowed})
+                        THEN old_status || ' to ' || new_status || ' is not allowed'
+                END
+                """,
+                allowed_params,
+            )
+            conn.execute(
+                f"""
+                UPDATE {self.leaves}
+                SET status = b.new_status,
+                    decline_reason = CASE WHEN b.new_status = 'Declined' THEN b.reason END,
+                    recall_reason = CASE WHEN b.new_status IN ('Recalled', 'Withdrawn') THEN b.reason END
+                FROM temp.leave_status_batch AS b
+                WHERE {self.leaves}.id = b.id AND b.error IS NULL
+                  -- drive the join from the batch (rowid lookups) instead of scanning every leave
+                  AND {self.leaves}.id IN (SELECT id FROM temp.leave_status_batch WHERE error IS NULL)
+                """
+            )
+            results = [
+                {"id": row["id"], "from_status": row["old_status"], "to_status": row["new_status"],
+                 "ok": row["error"] is None, "error": row["error"]}
+                for row in conn.execute(
+                    "SELECT id, old_status, new_status, error FROM temp.leave_status_batch ORDER BY seq"
+                )
+            ]
+            conn.execute("DELETE FROM temp.leave_status_batch")
+        return results
+
+    def get_used_leave_days(self, employee_uuid, leave_type=None):
+        """Total approved leave days (inclusive of both ends) for an employee."""
+        sql = f"""
+            SELECT SUM(days)
+            FROM {self.leaves}
+            WHERE leave_id = ? AND status = 'Approved'
+        """
+        params = [employee_uuid]
+        if leave_type:
+            sql += " AND leave_type = ?"
+            params.append(leave_type)
+        return int(fetch_value(sql, params, default=0, db_path=self.db_path))
@@ -0,0 +1,197 @@
+"""
+Accrued leave liability for the whole workforce, and its month-over-month change.
+
+The liability of an employee is the leave they have earned in the current leave year and
+not yet taken, valued at their daily rate (salary / 260 working days):
+
+- annual leave accrues 1/12 of the yearly entitlement for each calendar month of the year
+  completed by the valuation date, from the month of joining on; the month of joining
+  earns in full even for a mid-month joiner, once it has ended;
+- compensation leave is owed in full from the start of the year;
+- approved leave taken between the start of the year and the valuation date is deducted
+  from the entitlement it draws on (see ``LIABLE_ENTITLEMENTS``), floored at 0 days.
+
+Employees without a ``leave_entitlements_data`` row or a salary carry no liability. Every
+step is a column operation over the whole workforce (see leave_days.py).
+
+Month-end figures per partner are stored in ``leave_liability_snapshots``; a closed month
+is written once, so month-over-month deltas compare against what was reported at the time.
+Record the previous month from a scheduled job with:
+
+    python leave_liability.py [--month YYYY-MM] [--replace]
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import leave_days
+from leave_db import get_pool
+
+WORKING_DAYS_PER_YEAR = 260  # the payroll's Salary_LIABILITY is salary / 260
+
+# Entitlement column -> leave types that draw on it, and whether it is earned month by month
+LIABLE_ENTITLEMENTS = {
+    "annual_leave": {"leave_types": ("Annual",), "accrues": True},
+    "compensation_leave": {"leave_types": ("Study", "Compensation", "Compassionate"), "accrues": False},
+}
+
+SUMMARY_COLUMNS = ["employees", "balance_days", "liability"]
+
+
+# --- Sources ---
+
+def load_workforce(conn):
+    """One row per employee: uuid, partner, salary, join date and the liable entitlements."""
+    entitlements = ", ".join(f"COALESCE(n.{column}, 0) AS {column}" for column in LIABLE_ENTITLEMENTS)
+    return pd.read_sql_query(
+        f"""
+        SELECT e.uuid, COALESCE(e.Partner_Name, '') AS partner, e.salary, e.Date_of_Join, {entitlements}
+        FROM employee_table AS e
+        LEFT JOIN leave_entitlements_data AS n ON n.employee_id = e.uuid
+        """,
+        conn,
+    )
+
+
+def load_approved_leaves(conn):
+    """Approved leaves of the types that draw on a liable entitlement."""
+    leave_types = [leave_type for spec in LIABLE_ENTITLEMENTS.values() for leave_type in spec["leave_types"]]
+    return pd.read_sql_query(
+        f"""
+        SELECT leave_id, leave_type, start_date, end_date FROM leave_entries
+        WHERE status = 'Approved' AND leave_type IN ({','.join('?' for _ in leave_types)})
+        """,
+        conn,
+        params=leave_types,
+    )
+
+
+# --- Valuation ---
+
+def month_end(day):
+    """Last day of the month ``day`` falls in."""
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def employee_liability(as_of, workforce, leaves):
+    """
+    Per-employee leave balance (days, per liable entitlement and in total) and its value
+    on ``as_of``. Employees who joined after ``as_of`` are left out.
+    """
+    as_of = np.datetime64(as_of, "D")
+    year_start = as_of.astype("datetime64[Y]").astype("datetime64[D]")
+    joined = leave_days.to_days(workforce["Date_of_Join"])
+    on_staff = ~(joined > as_of)  # an unknown join date counts as on staff all year
+    staff = workforce[on_staff].reset_index(drop=True)
+    joined = joined[on_staff]
+
+    service_start = np.where(np.isnat(joined) | (joined < year_start), year_start, joined)
+    # Calendar months from the month of joining (inclusive) to the last month completed on as_of
+    earned_months = ((as_of + 1).astype("datetime64[M]") - service_start.astype("datetime64[M]")).astype(np.int64)
+    earned_share = np.clip(earned_months, 0, 12) / 12
+
+    entitlement_of = {leave_type: column for column, spec in LIABLE_ENTITLEMENTS.items()
+                      for leave_type in spec["leave_types"]}
+    taken_days = leave_days.overlap_days(leaves["start_date"], leaves["end_date"], year_start, as_of)
+    taken = (
+        pd.Series(taken_days)
+        .groupby([leaves["leave_id"].to_numpy(), leaves["leave_type"].map(entitlement_of).to_numpy()])
+        .sum()
+        .unstack(fill_value=0)
+        .reindex(index=staff["uuid"], columns=list(LIABLE_ENTITLEMENTS), fill_value=0)
+        .to_numpy()
+    )
+
+    entitled = staff[list(LIABLE_ENTITLEMENTS)].to_numpy(dtype=np.float64)
+    accrues = np.array([spec["accrues"] for spec in LIABLE_ENTITLEMENTS.values()])
+    earned = np.where(accrues, entitled * earned_share[:, None], entitled)
+    balances = np.clip(earned - taken, 0, None)
+
+    result = pd.DataFrame(balances, columns=list(LIABLE_ENTITLEMENTS))
+    result.insert(0, "employee_id", staff["uuid"])
+    result.insert(1, "partner", staff["partner"])
+    result["balance_days"] = balances.sum(axis=1)
+    result["daily_rate"] = pd.to_numeric(staff["salary"], errors="coerce").fillna(0) / WORKING_DAYS_PER_YEAR
+    result["liability"] = result["balance_days"] * result["daily_rate"]
+    return result
+
+
+def partner_liability(as_of, workforce, leaves):
+    """Employees, balance days and liability per partner on ``as_of``, indexed by partner."""
+    per_employee = employee_liability(as_of, workforce, leaves)
+    return per_employee.groupby("partner").agg(
+        employees=("employee_id", "count"),
+        balance_days=("balance_days", "sum"),
+        liability=("liability", "sum"),
+    )
+
+
+# --- Month-end snapshots ---
+
+def _stored_month(conn, month):
+    rows = conn.execute(
+        "SELECT partner, employees, balance_days, liability FROM leave_liability_snapshots WHERE month = ?",
+        (month.isoformat(),),
+    ).fetchall()
+    frame = pd.DataFrame([dict(row) for row in rows], columns=["partner", *SUMMARY_COLUMNS])
+    return frame.set_index("partner")
+
+
+def _store_month(conn, month, summary, replace=False):
+    conn.executemany(
+        f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO leave_liability_snapshots "
+        "(month, partner, employees, balance_days, liability) VALUES (?, ?, ?, ?, ?)",
+        [(month.isoformat(), partner, int(row.employees), float(row.balance_days), float(row.liability))
+         for partner, row in summary.iterrows()],
+    )
+
+
+def record_month(day, replace=False):
+    """
+    Values the liability at the end of ``day``'s month and stores it per partner. An already
+    recorded month is kept unless ``replace``. Returns the month's stored figures.
+    """
+    month = month_end(day)
+    with get_pool().connection() as conn:
+        _store_month(conn, month, partner_liability(month, load_workforce(conn), load_approved_leaves(conn)),
+                     replace)
+        return _stored_month(conn, month)
+
+
+def monthly_liability(today=None):
+    """
+    Liability per partner today, next to the stored figure for the end of last month and
+    the change in percent. Both are None until last month has been recorded (see
+    ``record_month``); nothing is written here.
+    """
+    today = today or date.today()
+    previous_month = today.replace(day=1) - timedelta(days=1)
+    with get_pool().connection() as conn:
+        workforce, leaves = load_workforce(conn), load_approved_leaves(conn)
+        previous = _stored_month(conn, previous_month)
+    current = partner_liability(today, workforce, leaves)
+
+    result = current.join(previous["liability"].rename("previous_liability"), how="outer")
+    result[SUMMARY_COLUMNS] = result[SUMMARY_COLUMNS].fillna(0)
+    base = result["previous_liability"].where(result["previous_liability"] > 0)
+    result["change_pct"] = (result["liability"] - base) / base * 100
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Records the month-end leave liability per partner.")
+    parser.add_argument("--month", type=lambda value: datetime.strptime(value, "%Y-%m").date(),
+                        help="YYYY-MM to record (default: last month)")
+    parser.add_argument("--replace", action="store_true", help="overwrite the month if already recorded")
+    args = parser.parse_args()
+    month = args.month or date.today().replace(day=1) - timedelta(days=1)
+    summary = record_month(month, replace=args.replace)
+    print(f"Leave liability at {month_end(month).isoformat()}:")
+    for partner, row in summary.iterrows():
+        print(f"  {partner or '(no partner)'}: KES {row.liability:,.0f} over {int(row.employees)} employees")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,739 @@
+"""
+Versioned schema migrations for ``leave_management.db``.
+
+The schema version lives in ``PRAGMA user_version``. Each migration runs in its own
+``BEGIN IMMEDIATE`` transaction, so concurrent app start-ups apply it exactly once.
+Migrating is an explicit step: run this file (or start an app with ``LEAVE_DB_MIGRATE=1``)
+before serving from a new or older database. ``leave_db.get_pool`` refuses a database whose
+schema is behind. ``--orphans`` lists legacy rows that could not be migrated:
+
+    python leave_migrations.py [path/to/leave_management.db] [--status] [--orphans] [--rebuild-balances]
+"""
+import argparse
+import os
+import sqlite3
+
+DEFAULT_DB_PATH = os.environ.get(
+    "LEAVE_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "leave_management.db"),
+)
+
+LEAVE_STATUSES = ("Pending", "Approved", "Declined", "Recalled", "Withdrawn")
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Registers a migration function ``fn(conn) -> list of notes``."""
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return fn
+    return register
+
+
+def _table_exists(conn, name):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def _count(conn, table):
+    return conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+
+
+# --- Migration 1: one normalized leave schema ---
+
+# Every table that held employees, leaves or entitlements before migration 1
+LEGACY_TABLES = {
+    "employee_table": "legacy_employee_table",
+    "employee_table_rows": "legacy_employee_table_rows",
+    "employees": "legacy_employees",
+    "leave_entries": "legacy_leave_entries",
+    "leave_entry": "legacy_leave_entry",
+    "leave": "legacy_leave",
+    "leaves": "legacy_leaves",
+    "leave_entitlements_data": "legacy_leave_entitlements_data",
+    "leave_entitlements": "legacy_leave_entitlements",
+    "leave_entitlements (1)": "legacy_leave_entitlements_1",
+}
+
+SCHEMA_V1 = f"""
+CREATE TABLE employee_table (
+    uuid TEXT PRIMARY KEY NOT NULL,
+    id INTEGER,
+    Username INTEGER,
+    First_Name TEXT NOT NULL,
+    Middle_Name TEXT,
+    Surname_Name TEXT,
+    AUUID INTEGER,
+    Employee_ID INTEGER,
+    Email TEXT UNIQUE,
+    Manager TEXT,
+    Date_of_Join DATE CHECK (Date_of_Join IS NULL OR Date_of_Join IS date(Date_of_Join)),
+    OPCO_Region TEXT,
+    Organization TEXT,
+    Department TEXT,
+    Sub_Department TEXT,
+    Person_Type TEXT,
+    Personal_Mobile INTEGER,
+    Partner_Name TEXT,
+    gender TEXT,
+    password TEXT,
+    position TEXT,
+    salary INTEGER
+);
+
+-- leave_id is the employee's uuid (the name is kept for the existing queries);
+-- employee_name is the employee's First_Name at the time of the request
+CREATE TABLE leave_entries (
+    id INTEGER PRIMARY KEY,
+    leave_id TEXT NOT NULL REFERENCES employee_table(uuid) ON UPDATE CASCADE,
+    employee_name TEXT NOT NULL,
+    leave_type TEXT NOT NULL,
+    start_date DATE NOT NULL CHECK (start_date IS date(start_date)),
+    end_date DATE NOT NULL CHECK (end_date IS date(end_date) AND end_date >= start_date),
+    days INTEGER GENERATED ALWAYS AS (CAST(julianday(end_date) - julianday(start_date) AS INTEGER) + 1) STORED,
+    description TEXT,
+    attachment INTEGER NOT NULL DEFAULT 0 CHECK (attachment IN (0, 1)),
+    status TEXT NOT NULL DEFAULT 'Pending' CHECK (status IN {LEAVE_STATUSES!r}),
+    decline_reason TEXT,
+    recall_reason TEXT
+);
+
+CREATE TABLE leave_entitlements_data (
+    employee_id TEXT PRIMARY KEY NOT NULL REFERENCES employee_table(uuid) ON DELETE CASCADE,
+    annual_leave INTEGER NOT NULL DEFAULT 0 CHECK (annual_leave >= 0),
+    sick_leave INTEGER NOT NULL DEFAULT 0 CHECK (sick_leave >= 0),
+    compensation_leave INTEGER NOT NULL DEFAULT 0 CHECK (compensation_leave >= 0),
+    maternity_leave_days INTEGER NOT NULL DEFAULT 0 CHECK (maternity_leave_days >= 0),
+    paternity_leave_days INTEGER NOT NULL DEFAULT 0 CHECK (paternity_leave_days >= 0)
+);
+
+-- Pending/approved queues (covering for the list columns), status counts and "on leave between" checks
+CREATE INDEX idx_leave_entries_status_dates ON leave_entries(status, start_date, end_date, employee_name, leave_type);
+-- An employee's history, balances and used days without touching the table
+CREATE INDEX idx_leave_entries_employee ON leave_entries(leave_id, status, leave_type, start_date, end_date, days);
+-- Date-range and per-year scans
+CREATE INDEX idx_leave_entries_start_date ON leave_entries(start_date, end_date);
+-- Manager filters by employee name
+CREATE INDEX idx_leave_entries_employee_name ON leave_entries(employee_name, start_date);
+CREATE INDEX idx_employee_first_name ON employee_table(First_Name, uuid);
+CREATE INDEX idx_employee_partner ON employee_table(Partner_Name);
+CREATE INDEX idx_employee_manager ON employee_table(Manager);
+"""
+
+EMPLOYEE_COLUMNS = (
+    "uuid, id, Username, First_Name, Middle_Name, Surname_Name, AUUID, Employee_ID, Email, Manager, "
+    "Date_of_Join, OPCO_Region, Organization, Department, Sub_Department, Person_Type, Personal_Mobile, "
+    "Partner_Name, gender, password, position, salary"
+)
+
+LEAVE_COLUMNS = (
+    "id, leave_id, employee_name, leave_type, start_date, end_date, description, attachment, "
+    "status, decline_reason, recall_reason"
+)
+
+# "Maternity Leave" -> "Maternity" (the app's leave type names); "Rejected" -> "Declined"
+_LEAVE_TYPE = (
+    "CASE WHEN TRIM(s.leave_type) LIKE '% Leave' "
+    "THEN TRIM(SUBSTR(TRIM(s.leave_type), 1, LENGTH(TRIM(s.leave_type)) - 6)) "
+    "ELSE TRIM(s.leave_type) END"
+)
+_STATUS = "CASE TRIM(s.status) WHEN 'Rejected' THEN 'Declined' ELSE COALESCE(TRIM(s.status), 'Pending') END"
+
+
+def _copy_leaves(conn, source_sql, keep_ids=False, skip_duplicates=False):
+    """
+    Copies leaves from a SELECT that yields the ``LEAVE_COLUMNS`` names into ``leave_entries``.
+    Rows with unknown employees, unparseable dates or unknown statuses are skipped (they stay
+    in the legacy table). Returns ``(copied, skipped)``.
+    """
+    select = f"""
+        SELECT {{id}}, s.leave_id, COALESCE(NULLIF(TRIM(s.employee_name), ''), e.First_Name),
+               {_LEAVE_TYPE}, date(s.start_date), date(s.end_date), s.description,
+               CASE WHEN s.attachment THEN 1 ELSE 0 END, {_STATUS},
+               NULLIF(s.decline_reason, ''), NULLIF(s.recall_reason, '')
+        FROM ({source_sql}) AS s
+        JOIN employee_table e ON e.uuid = s.leave_id
+        WHERE date(s.start_date) IS NOT NULL
+          AND date(s.end_date) >= date(s.start_date)
+          AND s.leave_type IS NOT NULL
+          AND {_STATUS} IN {LEAVE_STATUSES!r}
+          {{extra}}
+    """
+    if skip_duplicates:
+        duplicate_filter = f"""
+          AND NOT EXISTS (
+              SELECT 1 FROM leave_entries l
+              WHERE l.leave_id = s.leave_id AND l.start_date = date(s.start_date)
+                AND l.end_date = date(s.end_date) AND l.leave_type = {_LEAVE_TYPE}
+          )
+        """
+    else:
+        duplicate_filter = ""
+
+    total = conn.execute(f"SELECT COUNT(*) FROM ({source_sql})").fetchone()[0]
+    before = _count(conn, "leave_entries")
+    if keep_ids:
+        # Unique legacy ids are kept so existing links and session keys stay valid; rows with a
+        # missing or repeated id are inserted after them and get a fresh id
+        new_id = f"CASE WHEN s.id IN (SELECT id FROM ({source_sql}) GROUP BY id HAVING COUNT(*) = 1) THEN s.id END"
+        order = "ORDER BY 1 IS NULL, 1"
+    else:
+        new_id = "NULL"
+        order = ""
+    conn.execute(
+        f"INSERT INTO leave_entries ({LEAVE_COLUMNS}) " + select.format(id=new_id, extra=duplicate_filter) + order
+    )
+    copied = _count(conn, "leave_entries") - before
+    return copied, total - copied
+
+
+# Legacy tables whose rows belong to an employee, and the column holding the employee's uuid
+LEGACY_EMPLOYEE_KEYS = {
+    "legacy_leave_entries": "leave_id",
+    "legacy_leave_entry": "leave_id",
+    "legacy_leave": "employee_id",
+    "legacy_leaves": "employee_id",
+    "legacy_leave_entitlements_data": "employee_id",
+    "legacy_leave_entitlements": "employee_id",
+    "legacy_leave_entitlements_1": "employee_id",
+}
+
+
+def orphaned_rows(conn):
+    """
+    Legacy rows that migration 1 could not copy because their employee is not in
+    ``employee_table``, as ``{table: [employee ids]}``. The rows stay in the legacy table.
+    """
+    orphans = {}
+    for table, column in LEGACY_EMPLOYEE_KEYS.items():
+        if not _table_exists(conn, table):
+            continue
+        employee_ids = [row[0] for row in conn.execute(f"""
+            SELECT "{column}" FROM "{table}"
+            WHERE "{column}" IS NULL OR "{column}" NOT IN (SELECT uuid FROM employee_table)
+        """)]
+        if employee_ids:
+            orphans[table] = employee_ids
+    return orphans
+
+
+@migration(1, "Consolidate legacy employee, leave and entitlement tables into one normalized schema")
+def _normalize_leave_schema(conn):
+    notes = []
+    for name, legacy_name in LEGACY_TABLES.items():
+        if _table_exists(conn, name):
+            conn.execute(f'ALTER TABLE "{name}" RENAME TO "{legacy_name}"')
+    conn.executescript_in_transaction(SCHEMA_V1)
+
+    # --- Employees ---
+    if _table_exists(conn, "legacy_employee_table"):
+        conn.execute(f"""
+            INSERT OR IGNORE INTO employee_table ({EMPLOYEE_COLUMNS})
+            SELECT uuid, id, Username, First_Name, Middle_Name, Surname_Name, AUUID, Employee_ID,
+                   NULLIF(TRIM(Email), ''), Manager, date(Date_of_Join), OPCO_Region, Organization,
+                   Department, Sub_Department, Person_Type, Personal_Mobile, Partner_Name, gender,
+                   password, position, salary
+            FROM legacy_employee_table
+            WHERE uuid IS NOT NULL AND First_Name IS NOT NULL
+        """)
+    if _table_exists(conn, "legacy_employee_table_rows"):
+        conn.execute(f"""
+            INSERT OR IGNORE INTO employee_table ({EMPLOYEE_COLUMNS})
+            SELECT uuid, id, Username, First_Name, Middle_Name, Surname_Name, AUUID, Employee_ID,
+                   NULLIF(TRIM(Email), ''), Manager, date(Date_of_Join), OPCO_Region, Organization,
+                   Department, Sub_Department, Person_Type, Personal_Mobile, Partner_Name, gender,
+                   password, position, NULL
+            FROM legacy_employee_table_rows
+            WHERE uuid IS NOT NULL AND First_Name IS NOT NULL
+        """)
+    notes.append(f"employee_table: {_count(conn, 'employee_table')} employees")
+    if _table_exists(conn, "legacy_employees"):
+        # Its ids are not employee_table uuids and its partners are spelled differently, so
+        # merging it would add duplicate people and phantom partners
+        notes.append(f"legacy_employees: {_count(conn, 'legacy_employees')} rows kept as they were, not merged")
+
+    # --- Leaves: leave_entries is the system of record, the other tables only add missing requests ---
+    sources = [
+        ("legacy_leave_entries", f"SELECT {LEAVE_COLUMNS} FROM legacy_leave_entries", True, False),
+        ("legacy_leave_entry", f"SELECT {LEAVE_COLUMNS} FROM legacy_leave_entry", False, True),
+        ("legacy_leave", """
+            SELECT id, employee_id AS leave_id, employee_name, leave_type, start_date, end_date,
+                   description, attachment, status, decline_reason, recall_reason
+            FROM legacy_leave
+        """, False, True),
+        ("legacy_leaves", """
+            SELECT id, employee_id AS leave_id, NULL AS employee_name, leave_type, start_date, end_date,
+                   description, attachment, status, decline_reason, recall_reason
+            FROM legacy_leaves
+        """, False, True),
+    ]
+    for table, source_sql, keep_ids, skip_duplicates in sources:
+        if _table_exists(conn, table):
+            copied, skipped = _copy_leaves(conn, source_sql, keep_ids=keep_ids, skip_duplicates=skip_duplicates)
+            notes.append(f"{table}: {copied} leaves copied, {skipped} duplicate or invalid rows left behind")
+
+    # --- Entitlements ---
+    for table in ("legacy_leave_entitlements_data", "legacy_leave_entitlements", "legacy_leave_entitlements_1"):
+        if not _table_exists(conn, table):
+            continue
+        total = _count(conn, table)
+        before = _count(conn, "leave_entitlements_data")
+        conn.execute(f"""
+            INSERT OR IGNORE INTO leave_entitlements_data
+                (employee_id, annual_leave, sick_leave, compensation_leave, maternity_leave_days, paternity_leave_days)
+            SELECT employee_id, COALESCE(annual_leave, 0), COALESCE(sick_leave, 0), COALESCE(compensation_leave, 0),
+                   COALESCE(maternity_leave_days, 0), COALESCE(paternity_leave_days, 0)
+            FROM "{table}"
+            WHERE employee_id IN (SELECT uuid FROM employee_table)
+        """)
+        copied = _count(conn, "leave_entitlements_data") - before
+        notes.append(f"{table}: {copied} entitlements copied, {total - copied} rows left behind")
+
+    for table, employee_ids in orphaned_rows(conn).items():
+        shown = ", ".join(str(employee_id) for employee_id in employee_ids[:5])
+        more = f" and {len(employee_ids) - 5} more" if len(employee_ids) > 5 else ""
+        notes.append(f"{table}: {len(employee_ids)} rows reference unknown employees ({shown}{more})")
+
+    conn.execute("ANALYZE")
+    return notes
+
+
+# --- Migration 2: partner x year x status leave aggregates ---
+
+# A leave counts towards its employee's partner and the year it starts in
+_LEAVE_PARTNER = "COALESCE((SELECT Partner_Name FROM employee_table WHERE uuid = {row}.leave_id), '')"
+_LEAVE_YEAR = "CAST(strftime('%Y', {row}.start_date) AS INTEGER)"
+
+
+def _add_leave_stats(row):
+    return f"""
+        INSERT INTO leave_partner_year_stats (partner, year, status, days, requests)
+        SELECT {_LEAVE_PARTNER.format(row=row)}, {_LEAVE_YEAR.format(row=row)}, {row}.status, {row}.days, 1
+        WHERE true
+        ON CONFLICT (partner, year, status) DO UPDATE
+            SET days = days + excluded.days, requests = requests + 1;
+    """
+
+
+def _remove_leave_stats(row):
+    return f"""
+        UPDATE leave_partner_year_stats
+        SET days = days - {row}.days, requests = requests - 1
+        WHERE partner = {_LEAVE_PARTNER.format(row=row)}
+          AND year = {_LEAVE_YEAR.format(row=row)}
+          AND status = {row}.status;
+    """
+
+
+REBUILD_PARTNER_YEAR_STATS = f"""
+    DELETE FROM leave_partner_year_stats;
+    INSERT INTO leave_partner_year_stats (partner, year, status, days, requests)
+    SELECT {_LEAVE_PARTNER.format(row="l")}, {_LEAVE_YEAR.format(row="l")}, l.status, SUM(l.days), COUNT(*)
+    FROM leave_entries l
+    GROUP BY 1, 2, 3;
+"""
+
+SCHEMA_V2 = f"""
+CREATE TABLE leave_partner_year_stats (
+    partner TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    days INTEGER NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (partner, year, status)
+) WITHOUT ROWID;
+
+CREATE TRIGGER leave_stats_after_insert AFTER INSERT ON leave_entries
+BEGIN
+    {_add_leave_stats("NEW")}
+END;
+
+CREATE TRIGGER leave_stats_after_delete AFTER DELETE ON leave_entries
+BEGIN
+    {_remove_leave_stats("OLD")}
+END;
+
+CREATE TRIGGER leave_stats_after_update AFTER UPDATE OF leave_id, status, start_date, end_date ON leave_entries
+BEGIN
+    {_remove_leave_stats("OLD")}
+    {_add_leave_stats("NEW")}
+END;
+
+-- Moving an employee to another partner moves their leaves with them
+CREATE TRIGGER leave_stats_after_partner_change AFTER UPDATE OF Partner_Name ON employee_table
+WHEN OLD.Partner_Name IS NOT NEW.Partner_Name
+BEGIN
+    UPDATE leave_partner_year_stats
+    SET days = days - (
+            SELECT COALESCE(SUM(l.days), 0) FROM leave_entries l
+            WHERE l.leave_id = NEW.uuid AND {_LEAVE_YEAR.format(row="l")} = leave_partner_year_stats.year
+              AND l.status = leave_partner_year_stats.status
+        ),
+        requests = requests - (
+            SELECT COUNT(*) FROM leave_entries l
+            WHERE l.leave_id = NEW.uuid AND {_LEAVE_YEAR.format(row="l")} = leave_partner_year_stats.year
+              AND l.status = leave_partner_year_stats.status
+        )
+    WHERE partner = COALESCE(OLD.Partner_Name, '');
+    INSERT INTO leave_partner_year_stats (partner, year, status, days, requests)
+    SELECT COALESCE(NEW.Partner_Name, ''), {_LEAVE_YEAR.format(row="l")}, l.status, SUM(l.days), COUNT(*)
+    FROM leave_entries l
+    WHERE l.leave_id = NEW.uuid
+    GROUP BY 2, 3
+    ON CONFLICT (partner, year, status) DO UPDATE
+        SET days = days + excluded.days, requests = requests + excluded.requests;
+END;
+"""
+
+
+@migration(2, "Add leave_partner_year_stats, kept up to date by triggers on leave_entries")
+def _partner_year_stats(conn):
+    conn.executescript_in_transaction(SCHEMA_V2)
+    conn.executescript_in_transaction(REBUILD_PARTNER_YEAR_STATS)
+    return [f"leave_partner_year_stats: {_count(conn, 'leave_partner_year_stats')} partner/year/status rows"]
+
+
+# --- Migration 3: per-employee, per-leave-type balance ledger ---
+
+def _credit_balance(row):
+    """Adds an approved leave's days to its employee's ledger row."""
+    return f"""
+        INSERT INTO leave_balances (employee_id, leave_type, used_days, approved_requests)
+        SELECT {row}.leave_id, {row}.leave_type, {row}.days, 1
+        WHERE {row}.status = 'Approved'
+        ON CONFLICT (employee_id, leave_type) DO UPDATE
+            SET used_days = used_days + excluded.used_days, approved_requests = approved_requests + 1;
+    """
+
+
+def _debit_balance(row):
+    """Takes a no-longer-approved leave's days back off its employee's ledger row."""
+    return f"""
+        UPDATE leave_balances
+        SET used_days = used_days - {row}.days, approved_requests = approved_requests - 1
+        WHERE employee_id = {row}.leave_id AND leave_type = {row}.leave_type AND {row}.status = 'Approved';
+    """
+
+
+REBUILD_LEAVE_BALANCES = """
+    DELETE FROM leave_balances;
+    INSERT INTO leave_balances (employee_id, leave_type, used_days, approved_requests)
+    SELECT leave_id, leave_type, SUM(days), COUNT(*)
+    FROM leave_entries
+    WHERE status = 'Approved'
+    GROUP BY leave_id, leave_type;
+"""
+
+SCHEMA_V3 = f"""
+-- Approved leave taken per employee and leave type; remaining = entitlement - used_days
+CREATE TABLE leave_balances (
+    employee_id TEXT NOT NULL REFERENCES employee_table(uuid) ON DELETE CASCADE ON UPDATE CASCADE,
+    leave_type TEXT NOT NULL,
+    used_days INTEGER NOT NULL DEFAULT 0,
+    approved_requests INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (employee_id, leave_type)
+) WITHOUT ROWID;
+
+CREATE TRIGGER leave_balances_after_insert AFTER INSERT ON leave_entries
+WHEN NEW.status = 'Approved'
+BEGIN
+    {_credit_balance("NEW")}
+END;
+
+CREATE TRIGGER leave_balances_after_delete AFTER DELETE ON leave_entries
+WHEN OLD.status = 'Approved'
+BEGIN
+    {_debit_balance("OLD")}
+END;
+
+-- Approve, decline, recall and withdraw all go through here, in the same transaction as the status change
+CREATE TRIGGER leave_balances_after_update AFTER UPDATE OF leave_id, leave_type, status, start_date, end_date ON leave_entries
+WHEN OLD.status = 'Approved' OR NEW.status = 'Approved'
+BEGIN
+    {_debit_balance("OLD")}
+    {_credit_balance("NEW")}
+END;
+"""
+
+
+@migration(3, "Add the leave_balances ledger, kept up to date by triggers on leave_entries")
+def _leave_balances(conn):
+    conn.executescript_in_transaction(SCHEMA_V3)
+    conn.executescript_in_transaction(REBUILD_LEAVE_BALANCES)
+    return [f"leave_balances: {_count(conn, 'leave_balances')} employee/leave type rows"]
+
+
+# --- Migration 4: R*Tree interval index over approved leaves ---
+
+def day_number(expression):
+    """SQL for a date as a whole day number, so the 32-bit integer R*Tree compares days exactly."""
+    return f"CAST(julianday({expression}) AS INTEGER)"
+
+
+SCHEMA_V4 = f"""
+-- One box per approved leave: id = leave_entries.id, [start_day, end_day] inclusive
+CREATE VIRTUAL TABLE approved_leave_intervals USING rtree_i32(id, start_day, end_day);
+
+CREATE TRIGGER leave_intervals_after_insert AFTER INSERT ON leave_entries
+WHEN NEW.status = 'Approved'
+BEGIN
+    INSERT INTO approved_leave_intervals (id, start_day, end_day)
+    VALUES (NEW.id, {day_number("NEW.start_date")}, {day_number("NEW.end_date")});
+END;
+
+CREATE TRIGGER leave_intervals_after_delete AFTER DELETE ON leave_entries
+WHEN OLD.status = 'Approved'
+BEGIN
+    DELETE FROM approved_leave_intervals WHERE id = OLD.id;
+END;
+
+CREATE TRIGGER leave_intervals_after_update AFTER UPDATE OF id, status, start_date, end_date ON leave_entries
+WHEN OLD.status = 'Approved' OR NEW.status = 'Approved'
+BEGIN
+    DELETE FROM approved_leave_intervals WHERE id = OLD.id;
+    INSERT INTO approved_leave_intervals (id, start_day, end_day)
+    SELECT NEW.id, {day_number("NEW.start_date")}, {day_number("NEW.end_date")}
+    WHERE NEW.status = 'Approved';
+END;
+"""
+
+REBUILD_APPROVED_LEAVE_INTERVALS = f"""
+    DELETE FROM approved_leave_intervals;
+    INSERT INTO approved_leave_intervals (id, start_day, end_day)
+    SELECT id, {day_number("start_date")}, {day_number("end_date")}
+    FROM leave_entries
+    WHERE status = 'Approved';
+"""
+
+
+@migration(4, "Add the approved_leave_intervals R*Tree, kept up to date by triggers on leave_entries")
+def _approved_leave_intervals(conn):
+    conn.executescript_in_transaction(SCHEMA_V4)
+    conn.executescript_in_transaction(REBUILD_APPROVED_LEAVE_INTERVALS)
+    return [f"approved_leave_intervals: {_count(conn, 'approved_leave_intervals')} approved leaves indexed"]
+
+
+# --- Migration 5: change feed for cache invalidation ---
+
+# Tables whose writes bump a version in data_versions
+VERSIONED_TABLES = ("employee_table", "leave_entries", "leave_entitlements_data")
+
+
+def _version_triggers(table):
+    return "".join(
+        f"""
+CREATE TRIGGER {table}_version_after_{event.lower()} AFTER {event} ON {table}
+BEGIN
+    UPDATE data_versions SET version = version + 1 WHERE source = '{table}';
+END;
+"""
+        for event in ("INSERT", "UPDATE", "DELETE")
+    )
+
+
+SCHEMA_V5 = """
+-- One monotonically increasing counter per table; caches key on it instead of a TTL
+CREATE TABLE data_versions (
+    source TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+""" + "".join(_version_triggers(table) for table in VERSIONED_TABLES)
+
+
+@migration(5, "Add the data_versions change feed, bumped by triggers on leave and employee writes")
+def _data_versions(conn):
+    conn.executescript_in_transaction(SCHEMA_V5)
+    conn.executemany("INSERT INTO data_versions (source) VALUES (?)", [(table,) for table in VERSIONED_TABLES])
+    return [f"data_versions: tracking {', '.join(VERSIONED_TABLES)}"]
+
+
+# --- Migration 6: per-partner change feed for incremental dashboard loads ---
+
+# How many partner_changes rows to keep; a reader that falls further behind reloads everything
+PARTNER_CHANGES_RETAINED = 10_000
+
+_EMPLOYEE_PARTNER = "COALESCE((SELECT Partner_Name FROM employee_table WHERE uuid = {key}), '')"
+
+
+def _partner_change_triggers(table, partner_of):
+    """Triggers logging the partner of every inserted, deleted or updated row (old and new)."""
+    return f"""
+CREATE TRIGGER {table}_partner_changes_after_insert AFTER INSERT ON {table}
+BEGIN
+    INSERT INTO partner_changes (partner) VALUES ({partner_of("NEW")});
+END;
+
+CREATE TRIGGER {table}_partner_changes_after_delete AFTER DELETE ON {table}
+BEGIN
+    INSERT INTO partner_changes (partner) VALUES ({partner_of("OLD")});
+END;
+
+CREATE TRIGGER {table}_partner_changes_after_update AFTER UPDATE ON {table}
+BEGIN
+    INSERT INTO partner_changes (partner) SELECT {partner_of("OLD")} UNION SELECT {partner_of("NEW")};
+END;
+"""
+
+
+SCHEMA_V6 = f"""
+-- Which partners' employees, leaves or entitlements changed, in write order
+CREATE TABLE partner_changes (
+    seq INTEGER PRIMARY KEY,
+    partner TEXT NOT NULL
+);
+
+CREATE TRIGGER partner_changes_prune AFTER INSERT ON partner_changes
+BEGIN
+    DELETE FROM partner_changes WHERE seq <= NEW.seq - {PARTNER_CHANGES_RETAINED};
+END;
+""" + "".join([
+    _partner_change_triggers("employee_table", lambda row: f"COALESCE({row}.Partner_Name, '')"),
+    _partner_change_triggers("leave_entries", lambda row: _EMPLOYEE_PARTNER.format(key=f"{row}.leave_id")),
+    _partner_change_triggers("leave_entitlements_data",
+                             lambda row: _EMPLOYEE_PARTNER.format(key=f"{row}.employee_id")),
+])
+
+
+@migration(6, "Add the partner_changes feed so dashboards reload only the partners that changed")
+def _partner_changes(conn):
+    conn.executescript_in_transaction(SCHEMA_V6)
+    return [f"partner_changes: keeping the last {PARTNER_CHANGES_RETAINED:,} changes"]
+
+
+# --- Migration 7: month-end leave liability snapshots ---
+
+SCHEMA_V7 = """
+-- Leave liability per partner at each month end (see leave_liability.py). A month is written
+-- once it has closed, so later salary or entitlement changes do not rewrite its figures.
+CREATE TABLE leave_liability_snapshots (
+    month TEXT NOT NULL CHECK (month IS date(month)),
+    partner TEXT NOT NULL,
+    employees INTEGER NOT NULL,
+    balance_days REAL NOT NULL,
+    liability REAL NOT NULL,
+    PRIMARY KEY (month, partner)
+) WITHOUT ROWID;
+"""
+
+
+@migration(7, "Add leave_liability_snapshots for month-over-month leave liability")
+def _leave_liability_snapshots(conn):
+    conn.executescript_in_transaction(SCHEMA_V7)
+    return ["leave_liability_snapshots: empty until the first month end is recorded"]
+
+
+# --- Runner ---
+
+class _MigrationConnection(sqlite3.Connection):
+    def executescript_in_transaction(self, script):
+        """Runs several statements without the implicit COMMIT of ``executescript``."""
+        for statement in split_statements(script):
+            self.execute(statement)
+
+
+def split_statements(script):
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        if line.strip().startswith("--"):
+            continue
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                yield statement.strip()
+            statement = ""
+    if statement.strip():
+        yield statement.strip()
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def migrate_database(db_path=DEFAULT_DB_PATH, target=None, log=None):
+    """
+    Applies every pending migration up to ``target`` (default: latest).
+    Returns the list of ``(version, description, notes)`` that were applied.
+    """
+    target = latest_version() if target is None else target
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None, factory=_MigrationConnection)
+    applied = []
+    try:
+        if current_version(conn) >= target:
+            return applied
+        # Tables are rebuilt, so foreign keys are checked once per migration instead of per statement
+        conn.execute("PRAGMA foreign_keys=OFF")
+        for version, description, fn in MIGRATIONS:
+            if version > target:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                if current_version(conn) >= version:
+                    conn.execute("ROLLBACK")
+                    continue
+                notes = fn(conn) or []
+                violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+                if violations:
+                    raise sqlite3.IntegrityError(f"Migration {version} left foreign key violations: {violations[:5]}")
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append((version, description, notes))
+            if log:
+                log(f"Applied migration {version}: {description}")
+                for note in notes:
+                    log(f"  - {note}")
+        return applied
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply leave_management.db schema migrations.")
+    parser.add_argument("db_path", nargs="?", default=DEFAULT_DB_PATH)
+    parser.add_argument("--status", action="store_true", help="only show the current and latest version")
+    parser.add_argument("--orphans", action="store_true",
+                        help="list legacy rows left behind because their employee is unknown")
+    parser.add_argument("--target", type=int, default=None, help="migrate up to this version")
+    parser.add_argument("--rebuild-balances", action="store_true",
+                        help="recompute the leave_balances ledger from the approved leave history")
+    args = parser.parse_args()
+
+    if args.status:
+        conn = sqlite3.connect(args.db_path)
+        print(f"{args.db_path}: version {current_version(conn)} (latest {latest_version()})")
+        conn.close()
+        return
+    if args.orphans:
+        conn = sqlite3.connect(args.db_path)
+        orphans = orphaned_rows(conn) if current_version(conn) >= 1 else {}
+        conn.close()
+        for table, employee_ids in orphans.items():
+            print(f"{table}: {len(employee_ids)} rows")
+            for employee_id in employee_ids:
+                print(f"  {employee_id}")
+        if not orphans:
+            print("No orphaned legacy rows.")
+        return
+    applied = migrate_database(args.db_path, target=args.target, log=print)
+    if not applied:
+        print("Database is up to date.")
+    if args.rebuild_balances:
+        conn = sqlite3.connect(args.db_path, factory=_MigrationConnection)
+        with conn:
+            conn.executescript_in_transaction(REBUILD_LEAVE_BALANCES)
+        print(f"Rebuilt leave_balances: {_count(conn, 'leave_balances')} rows")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
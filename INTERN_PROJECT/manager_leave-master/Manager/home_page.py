@@ -3,33 +3,31 @@ from datetime import date, timedelta, datetime
 import sqlite3
 import pandas as pd
 import os
+import sys
 
-# Get the base directory where this script is located
-base_dir = os.path.dirname(os.path.abspath(__file__))
+# --- Shared data-access layer (INTERN_PROJECT/leave_db.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from leave_db import LeaveRepository, data_version
+import review
 
-# Go one level up to reach INTERN_PROJECT from human_resource
-project_dir = os.path.dirname(base_dir)
+repo = LeaveRepository()
 
-# Build the path to leave_management.db
-DB_NAME = os.path.join(project_dir, 'leave_management.db')
-
-DB_PATH = "/Users/danielwanganga/Documents/GitHub/PROJECT_FRONTLINE/INTERN_PROJECT/leave_management.db"
+# --- Analytics Functions ---
 
-def init_db():
-    """Initializes and returns a connection to the SQLite database."""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
-    except sqlite3.Error as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_dashboard_summary(today, version):
+    """
+    All dashboard counters and lists for one day, from a single query. ``version`` is the
+    leave_entries change-feed version, so the summary reloads only after a leave is written.
+    """
+    return repo.get_dashboard_summary(today)
 
-# --- Analytics Functions ---
+def get_dashboard_summary():
+    """Today's dashboard summary, reusing the cached copy until the leave data changes."""
+    return load_dashboard_summary(date.today().isoformat(), data_version("leave_entries"))
 
 def get_dashboard_metrics():
     """Fetches key metrics for the dashboard."""
-    conn = init_db()
     metrics = {
         'pending_count': 0,
         'approved_today': 0,
@@ -38,214 +36,66 @@ def get_dashboard_metrics():
         'recent_requests': []
     }
     
-    if conn:
-        try:
-            cursor = conn.cursor()
-            today = date.today()
-            
-            # Pending requests count
-            cursor.execute("SELECT COUNT(*) as count FROM leave_entries WHERE status = 'Pending'")
-            metrics['pending_count'] = cursor.fetchone()['count']
-            
-            # Approved requests today
-            cursor.execute("SELECT COUNT(*) as count FROM leave_entries WHERE status = 'Approved' AND date(start_date) = ?", (today,))
-            metrics['approved_today'] = cursor.fetchone()['count']
-            
-            # Team members currently on leave
-            cursor.execute("""
-                SELECT COUNT(*) as count FROM leave_entries 
-                WHERE status = 'Approved' AND ? BETWEEN start_date AND end_date
-            """, (today,))
-            metrics['team_on_leave_today'] = cursor.fetchone()['count']
-            
-            # Upcoming leaves (next 7 days)
-            next_week = today + timedelta(days=7)
-            cursor.execute("""
-                SELECT COUNT(*) as count FROM leave_entries 
-                WHERE status = 'Approved' AND start_date BETWEEN ? AND ?
-            """, (today, next_week))
-            metrics['upcoming_leaves'] = cursor.fetchone()['count']
-            
-            # Recent requests (last 5)
-            cursor.execute("""
-                SELECT employee_name, leave_type, start_date, end_date, status
-                FROM leave_entries 
-                ORDER BY id DESC 
-                LIMIT 5
-            """)
-            metrics['recent_requests'] = [dict(row) for row in cursor.fetchall()]
-            
-        except sqlite3.Error as e:
-            st.error(f"Error fetching metrics: {str(e)}")
-        finally:
-            conn.close()
+    try:
+        metrics.update(get_dashboard_summary())
+    except sqlite3.Error as e:
+        st.error(f"Error fetching metrics: {str(e)}")
     
     return metrics
 
 def get_team_members_on_leave_today():
     """Get list of team members currently on leave."""
-    conn = init_db()
-    on_leave_today = []
-    
-    if conn:
-        try:
-            cursor = conn.cursor()
-            today = date.today()
-            cursor.execute("""
-                SELECT employee_name, leave_type, start_date, end_date
-                FROM leave_entries 
-                WHERE status = 'Approved' AND ? BETWEEN start_date AND end_date
-                ORDER BY employee_name
-            """, (today,))
-            on_leave_today = [dict(row) for row in cursor.fetchall()]
-        except sqlite3.Error as e:
-            st.error(f"Error fetching team members on leave: {str(e)}")
-        finally:
-            conn.close()
-    
-    return on_leave_today
+    try:
+        return get_dashboard_summary()['on_leave_today']
+    except sqlite3.Error as e:
+        st.error(f"Error fetching team members on leave: {str(e)}")
+        return []
+
+# --- Employee and leave queries ---
 
-# --- Import existing functions from the original code ---
 def get_all_pending_leaves():
     """Fetches all pending leave requests from the 'leave_entries' table."""
-    conn = init_db()
-    pending_leaves = []
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, leave_id, employee_name, leave_type, start_date, end_date, description, status
-                FROM leave_entries
-                WHERE status = 'Pending'
-                ORDER BY start_date ASC
-            """)
-            pending_leaves = cursor.fetchall()
-            return [dict(row) for row in pending_leaves]
-        except sqlite3.Error as e:
-            st.error(f"Error fetching all pending leaves: {str(e)}")
-            return []
-        finally:
-            conn.close()
-    return []
+    try:
+        return repo.get_leaves_by_status("Pending")
+    except sqlite3.Error as e:
+        st.error(f"Error fetching all pending leaves: {str(e)}")
+        return []
 
 def get_approved_leaves():
     """Fetches all approved leave requests from the 'leave_entries' table."""
-    conn = init_db()
-    approved_leaves = []
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, leave_id, employee_name, leave_type, start_date, end_date, description, status
-                FROM leave_entries
-                WHERE status = 'Approved'
-                ORDER BY start_date ASC
-            """)
-            approved_leaves = cursor.fetchall()
-            return [dict(row) for row in approved_leaves]
-        except sqlite3.Error as e:
-            st.error(f"Error fetching approved leaves: {str(e)}")
-            return []
-        finally:
-            conn.close()
-    return []
+    try:
+        return repo.get_leaves_by_status("Approved")
+    except sqlite3.Error as e:
+        st.error(f"Error fetching approved leaves: {str(e)}")
+        return []
 
 def get_team_leaves(status_filter=None, leave_type_filter=None, employee_filter=None):
-    """Fetches leave requests based on filters for the team dashboard."""
-    conn = init_db()
-    filtered_leaves = []
-    if conn:
-        try:
-            cursor = conn.cursor()
-            query_sql = "SELECT id, leave_id, employee_name, leave_type, start_date, end_date, description, status, decline_reason, recall_reason FROM leave_entries WHERE 1=1"
-            params = []
-
-            if status_filter:
-                placeholders = ','.join('?' for _ in status_filter)
-                query_sql += f" AND status IN ({placeholders})"
-                params.extend(status_filter)
-            
-            if leave_type_filter:
-                placeholders = ','.join('?' for _ in leave_type_filter)
-                query_sql += f" AND leave_type IN ({placeholders})"
-                params.extend(leave_type_filter)
-
-            if employee_filter and employee_filter != "All Team Members":
-                query_sql += " AND employee_name = ?"
-                params.append(employee_filter)
-
-            query_sql += " ORDER BY start_date DESC"
-            
-            cursor.execute(query_sql, tuple(params))
-            filtered_leaves = cursor.fetchall()
-            return [dict(row) for row in filtered_leaves]
-        except sqlite3.Error as e:
-            st.error(f"Error fetching team leaves: {str(e)}")
-            return []
-        finally:
-            conn.close()
-    return []
+    """
+    Fetches leave requests based on filters for the team dashboard.
+    status_filter: list of strings (e.g., ['Pending', 'Approved'])
+    leave_type_filter: list of strings (e.g., ['Annual', 'Sick'])
+    employee_filter: string (e.g., 'John Doe')
+    """
+    try:
+        return repo.get_team_leaves(status_filter, leave_type_filter, employee_filter)
+    except sqlite3.Error as e:
+        st.error(f"Error fetching team leaves: {str(e)}")
+        return []
 
 def update_leave_status(leave_request_id, new_status, reason=""):
-    """Updates the status of a leave request in 'leave_entries' table."""
+    """Updates the status of a leave request, if its current status allows the change."""
     if not leave_request_id:
         return False, "Invalid leave ID"
-        
-    conn = init_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            
-            # First, check if the record exists
-            cursor.execute("SELECT id FROM leave_entries WHERE id = ?", (leave_request_id,))
-            existing_record = cursor.fetchone()
-            
-            if not existing_record:
-                return False, f"Leave request with ID {leave_request_id} not found."
-            
-            update_sql = "UPDATE leave_entries SET status = ?"
-            params = [new_status]
-
-            if new_status == "Declined":
-                update_sql += ", decline_reason = ?, recall_reason = NULL"
-                params.append(reason)
-            elif new_status == "Recalled":
-                update_sql += ", recall_reason = ?, decline_reason = NULL"
-                params.append(reason)
-            elif new_status == "Approved":
-                update_sql += ", decline_reason = NULL, recall_reason = NULL"
-            
-            update_sql += " WHERE id = ?"
-            params.append(leave_request_id)
-
-            cursor.execute(update_sql, tuple(params))
-            conn.commit()
-
-            if cursor.rowcount > 0:
-                return True, f"Leave status updated to {new_status}"
-            else:
-                return False, "Failed to update leave status (no rows affected)."
-        except sqlite3.Error as e:
-            return False, f"Error updating leave status: {str(e)}"
-        finally:
-            conn.close()
-    return False, "Database connection failed."
+    return review.update_leave_statuses([leave_request_id], new_status, reason)
 
 def get_all_employees_from_db():
-    """Fetches all employee names from employee_table_rows."""
-    conn = init_db()
-    employees = []
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT First_Name, Surname_Name, uuid FROM employee_table ORDER BY First_Name")
-            rows = cursor.fetchall()
-            employees = [f"{row['First_Name']} {row['Surname_Name']}" for row in rows if row['First_Name'] and row['Surname_Name']]
-        except sqlite3.Error as e:
-            st.error(f"Error fetching all employees: {str(e)}")
-        finally:
-            conn.close()
-    return employees
+    """Fetches all employee names from employee_table."""
+    try:
+        rows = repo.get_employees()
+    except sqlite3.Error as e:
+        st.error(f"Error fetching all employees: {str(e)}")
+        return []
+    return [f"{row['First_Name']} {row['Surname_Name']}" for row in rows if row['First_Name'] and row['Surname_Name']]
 
 # --- Leave Policies & UI elements ---
 LEAVE_TYPE_MAPPING = {
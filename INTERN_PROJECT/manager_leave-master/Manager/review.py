@@ -0,0 +1,298 @@
+"""
+Leave review screens shared by the manager pages: the paged Pending and Approved queues with
+their bulk Approve/Decline/Recall actions (leave_centre.py, help_desk.py, and the status
+updates on home_page.py) and the keyset-paged team leave browser.
+"""
+import os
+import sqlite3
+import sys
+from collections import Counter
+
+import pandas as pd
+import streamlit as st
+
+# --- Shared data-access layer (INTERN_PROJECT/leave_db.py) ---
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from leave_db import LeaveRepository
+import leave_days
+
+repo = LeaveRepository()
+
+# Review queues: columns shown for each leave (and their headings) and rows per page
+REVIEW_QUEUE_COLUMNS = {
+    "employee_name": "Employee",
+    "leave_type": "Leave Type",
+    "start_date": "Start Date",
+    "end_date": "End Date",
+    "days": "Days",
+    "description": "Reason",
+}
+REVIEW_PAGE_SIZE = 25
+
+# Team leave browser: columns fetched (and their table headings) and sortable columns
+TEAM_LEAVE_COLUMNS = {
+    "employee_name": "Employee",
+    "leave_type": "Leave Type",
+    "start_date": "Start Date",
+    "end_date": "End Date",
+    "days": "Days",
+    "status": "Status",
+    "description": "Description",
+    "decline_reason": "Decline Reason",
+    "recall_reason": "Recall Reason",
+}
+TEAM_LEAVE_SORT_OPTIONS = {
+    "Start Date": "start_date",
+    "End Date": "end_date",
+    "Employee": "employee_name",
+    "Leave Type": "leave_type",
+    "Status": "status",
+    "Days": "days",
+}
+LEAVE_STATUSES = ["Pending", "Approved", "Declined", "Withdrawn", "Recalled"]
+
+# --- Queries ---
+
+def get_employee_options():
+    """
+    Maps employee uuid to the "First Surname" label shown in the team leave filters. Names
+    shared by several employees also show the email, so each option is one person.
+    """
+    try:
+        rows = [row for row in repo.get_employees() if row['First_Name']]
+    except sqlite3.Error as e:
+        st.error(f"Error fetching all employees: {str(e)}")
+        return {}
+    labels = {row['uuid']: " ".join(filter(None, (row['First_Name'], row['Surname_Name']))) for row in rows}
+    shared = {label for label, count in Counter(labels.values()).items() if count > 1}
+    return {
+        row['uuid']: f"{labels[row['uuid']]} ({row['Email'] or row['uuid']})" if labels[row['uuid']] in shared
+        else labels[row['uuid']]
+        for row in rows
+    }
+
+def get_team_leaves_page(status_filter=None, leave_type_filter=None, employee_uuid=None,
+                         sort_by="start_date", descending=True, after=None, limit=50, columns=TEAM_LEAVE_COLUMNS):
+    """
+    Fetches one keyset page of team leaves, filtered, sorted and projected in SQL.
+    Returns (rows, next_cursor, total).
+    """
+    try:
+        rows, next_cursor = repo.get_team_leaves_page(
+            status_filter, leave_type_filter, employee_uuid,
+            sort_by=sort_by, descending=descending, columns=columns, after=after, limit=limit,
+        )
+        total = repo.count_team_leaves(status_filter, leave_type_filter, employee_uuid)
+        return rows, next_cursor, total
+    except sqlite3.Error as e:
+        st.error(f"Error fetching team leaves: {str(e)}")
+        return [], None, 0
+
+def update_leave_statuses(leave_request_ids, new_status, reason=""):
+    """
+    Moves every selected leave request to ``new_status`` in one transaction. Requests whose
+    current status does not allow the change (e.g. handled elsewhere meanwhile) are skipped.
+    Returns (success, message).
+    """
+    if not leave_request_ids:
+        return False, "No leave requests selected"
+    try:
+        results = repo.apply_status_transitions([(leave_id, new_status, reason) for leave_id in leave_request_ids])
+    except sqlite3.Error as e:
+        return False, f"Error updating leave status: {str(e)}"
+    updated = sum(result["ok"] for result in results)
+    skipped = [f"leave {result['id']} ({result['error']})" for result in results if not result["ok"]]
+    message = f"{updated} leave request(s) updated to {new_status}"
+    if skipped:
+        message += f"; skipped {', '.join(skipped)}"
+    return updated > 0, message
+
+def get_review_page(status, after=None, limit=REVIEW_PAGE_SIZE, columns=REVIEW_QUEUE_COLUMNS):
+    """
+    Fetches one keyset page of leaves in ``status``, oldest start date first.
+    Returns (rows, next_cursor, total).
+    """
+    try:
+        rows, next_cursor = repo.get_team_leaves_page(
+            [status], sort_by="start_date", descending=False,
+            columns=["id", *columns], after=after, limit=limit,
+        )
+        return rows, next_cursor, repo.count_team_leaves([status])
+    except sqlite3.Error as e:
+        st.error(f"Error fetching {status.lower()} leaves: {str(e)}")
+        return [], None, 0
+
+# --- Views ---
+
+def review_queue(key, status, extra_columns=None, columns=REVIEW_QUEUE_COLUMNS):
+    """
+    Shows one page of the ``status`` review queue as a table with a "Select" column and
+    Previous/Next buttons. ``columns`` maps the leave columns shown to their headings;
+    ``extra_columns`` maps a heading to a function of the page DataFrame.
+    Returns (page DataFrame, ids of the selected leaves).
+    """
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+    notice = st.session_state.pop(f"{key}_notice", None)
+    if notice:
+        st.success(notice)
+
+    rows, next_cursor, total = get_review_page(status, after=cursors[-1], columns=columns)
+    if not rows and len(cursors) > 1:
+        # Everything on this page was handled; step back to the previous one
+        cursors.pop()
+        st.rerun()
+    page = pd.DataFrame(rows, columns=["id", *columns])
+    if page.empty:
+        return page, []
+
+    table = page.rename(columns=columns).fillna("")
+    for heading, compute in (extra_columns or {}).items():
+        table[heading] = compute(page)
+    first_row = (len(cursors) - 1) * REVIEW_PAGE_SIZE + 1
+    st.caption(f"Showing {first_row}–{first_row + len(page) - 1} of {total}")
+    select_all = st.checkbox("Select all on this page", key=f"{key}_select_all")
+    table.insert(0, "Select", select_all)
+
+    # The editor key changes with the page and after every bulk action so stale ticks never carry over
+    edited = st.data_editor(
+        table,
+        key=f"{key}_editor_{len(cursors)}_{st.session_state.get(f'{key}_version', 0)}_{select_all}",
+        column_config={"id": None, "Select": st.column_config.CheckboxColumn("Select")},
+        disabled=[column for column in table.columns if column != "Select"],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        if st.button("⬅️ Previous", key=f"{key}_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
+    return page, edited.loc[edited["Select"], "id"].tolist()
+
+def finish_review(key, success, message):
+    """Reports a bulk action on the next run and clears the queue's selection."""
+    if not success:
+        st.error(message)
+        return
+    st.session_state[f"{key}_notice"] = message
+    st.session_state[f"{key}_version"] = st.session_state.get(f"{key}_version", 0) + 1
+    st.rerun()
+
+def pending_leaves_view(columns=REVIEW_QUEUE_COLUMNS):
+    st.header("Pending Leave Requests for Review")
+    page, selected_ids = review_queue("pending_queue", "Pending", columns=columns)
+
+    if page.empty:
+        st.success("✨ All caught up! There are no pending leave requests.")
+        return
+
+    decline_reason = st.text_input("Reason for declining (required to decline):", key="pending_queue_decline_reason")
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        approve = st.button(f"✅ Approve selected ({len(selected_ids)})", key="approve_selected", disabled=not selected_ids)
+    with col2:
+        decline = st.button(f"❌ Decline selected ({len(selected_ids)})", key="decline_selected", disabled=not selected_ids)
+
+    if approve:
+        finish_review("pending_queue", *update_leave_statuses(selected_ids, "Approved"))
+    if decline:
+        if decline_reason.strip():
+            finish_review("pending_queue", *update_leave_statuses(selected_ids, "Declined", reason=decline_reason))
+        else:
+            st.warning("A reason is required to decline a request.")
+
+def approved_leaves_for_recall_view(recall_reason=None, columns=REVIEW_QUEUE_COLUMNS):
+    """
+    The Approved queue with a bulk Recall. ``recall_reason`` fixes the reason recorded;
+    when None the manager types it (pre-filled with "Operational Need").
+    """
+    st.header("Approved Leaves (for Recall)")
+    days_left_column = {"Days Remaining": lambda page: leave_days.days_left(page["start_date"], page["end_date"])}
+    page, selected_ids = review_queue("recall_queue", "Approved", days_left_column, columns=columns)
+
+    if page.empty:
+        st.info("No approved leaves currently.")
+        return
+
+    # A leave can only be recalled while more than 3 of its days are still to come
+    remaining = dict(zip(page["id"], leave_days.days_left(page["start_date"], page["end_date"])))
+    recallable = [leave_id for leave_id in selected_ids if remaining[leave_id] > 3]
+    blocked = page.loc[page["id"].isin(set(selected_ids) - set(recallable)), "employee_name"].tolist()
+
+    if recall_reason is None:
+        recall_reason = st.text_input("Reason for recall:", value="Operational Need", key="recall_queue_reason")
+    if st.button(f"↩️ Recall selected ({len(recallable)})", key="recall_selected", disabled=not recallable):
+        finish_review("recall_queue", *update_leave_statuses(recallable, "Recalled", reason=recall_reason))
+    if blocked:
+        st.error(f"Cannot recall leave for {', '.join(blocked)}. Less than 3 days remaining or leave has ended.")
+
+def team_leaves_dashboard_view(leave_types, columns=TEAM_LEAVE_COLUMNS):
+    """The team leave browser: filters, sort order and keyset Previous/Next paging."""
+    st.header("Team Leave Dashboard")
+
+    employee_options = get_employee_options()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        selected_employee = st.selectbox(
+            "Filter by Employee", [None, *employee_options],
+            format_func=lambda uuid: employee_options.get(uuid, "All Team Members"),
+        )
+    with col2:
+        selected_status = st.multiselect("Filter by Status", LEAVE_STATUSES, default=["Pending", "Approved"])
+    with col3:
+        selected_leave_type = st.multiselect("Filter by Leave Type", list(leave_types))
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sort_label = st.selectbox("Sort by", list(TEAM_LEAVE_SORT_OPTIONS))
+    with col2:
+        descending = st.radio("Order", ["Descending", "Ascending"], horizontal=True) == "Descending"
+    with col3:
+        page_size = st.selectbox("Rows per page", [25, 50, 100], index=1)
+
+    # Keyset pagination: keep the cursor of every page visited so "Previous" can step back.
+    # Any change to the filters or sort order starts again from the first page.
+    filters = (selected_employee, tuple(selected_status), tuple(selected_leave_type), sort_label, descending, page_size)
+    if st.session_state.get("team_leaves_filters") != filters:
+        st.session_state["team_leaves_filters"] = filters
+        st.session_state["team_leaves_cursors"] = [None]
+    cursors = st.session_state["team_leaves_cursors"]
+
+    page_leaves, next_cursor, total = get_team_leaves_page(
+        status_filter=selected_status if selected_status else None,
+        leave_type_filter=selected_leave_type if selected_leave_type else None,
+        employee_uuid=selected_employee,
+        sort_by=TEAM_LEAVE_SORT_OPTIONS[sort_label],
+        descending=descending,
+        after=cursors[-1],
+        limit=page_size,
+        columns=columns,
+    )
+
+    if not page_leaves:
+        st.info("No team leaves found matching the selected filters.")
+        return
+
+    st.subheader("Filtered Team Leaves")
+    first_row = (len(cursors) - 1) * page_size + 1
+    st.caption(f"Showing {first_row}–{first_row + len(page_leaves) - 1} of {total}")
+
+    # Display results in a table for better readability
+    df = pd.DataFrame(page_leaves).rename(columns=columns).fillna("N/A")
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        if st.button("⬅️ Previous", key="team_leaves_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Next ➡️", key="team_leaves_next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
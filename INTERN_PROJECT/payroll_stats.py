@@ -0,0 +1,73 @@
+"""
+Per-partner and per-department payroll aggregates for the HR dashboards.
+
+The aggregates (salary total and mean, headcount and leave liability) are computed in one
+pass over the payroll snapshot (see hr_snapshots.py) and kept until the snapshot's source
+changes. Switching partners, or comparing several, then only looks up precomputed rows.
+"""
+import threading
+
+import hr_snapshots
+
+COLUMNS = ["Partner", "Department", "EmpID", "Salary", "Leave_Liability"]
+
+_lock = threading.Lock()
+_cached = None  # (payroll snapshot version, PayrollAggregates)
+
+
+def _summarise(grouped):
+    return grouped.agg(
+        salary_total=("Salary", "sum"),
+        salary_mean=("Salary", "mean"),
+        headcount=("EmpID", "count"),
+        leave_liability=("Leave_Liability", "sum"),
+    )
+
+
+class PayrollAggregates:
+    """Payroll totals, means, headcount and liability by partner and by partner/department."""
+
+    def __init__(self, frame):
+        self.by_partner = _summarise(frame.groupby("Partner", observed=True))
+        self.by_partner.index = self.by_partner.index.astype(str)
+        self.by_department = _summarise(frame.groupby(["Partner", "Department"], observed=True))
+        # Dicts keyed by partner, so a partner switch is a lookup
+        self._partners = self.by_partner.to_dict("index")
+        self._departments = {
+            str(partner): rows.droplevel("Partner").reset_index()
+            for partner, rows in self.by_department.groupby(level="Partner", observed=True)
+        }
+        # Same columns and dtypes as a real partner's rows, for partners with none
+        self._no_departments = self.by_department.iloc[:0].droplevel("Partner").reset_index()
+
+    @property
+    def partners(self):
+        return list(self._partners)
+
+    def partner(self, partner):
+        """The partner's totals as a dict; zeros for a partner with nobody on the payroll."""
+        return self._partners.get(partner, {column: 0 for column in self.by_partner.columns})
+
+    def departments(self, partner):
+        """One row per department of the partner (Department, salary_total, salary_mean, ...)."""
+        return self._departments.get(partner, self._no_departments)
+
+    def compare(self, partners):
+        """The partners' totals side by side, one row per partner."""
+        return self.by_partner.reindex(list(partners), fill_value=0)
+
+    def compare_departments(self, partners, metric="salary_mean"):
+        """``metric`` per department (rows) for each of the partners (columns)."""
+        frame = self.by_department[metric].unstack("Partner")
+        frame.columns = frame.columns.astype(str)
+        return frame.reindex(columns=list(partners)).dropna(how="all")
+
+
+def aggregates():
+    """The aggregates for the current payroll snapshot, recomputed only after its source changes."""
+    global _cached
+    version = hr_snapshots.refresh("payroll")
+    with _lock:
+        if _cached is None or _cached[0] != version:
+            _cached = (version, PayrollAggregates(hr_snapshots.load("payroll", columns=COLUMNS)))
+        return _cached[1]
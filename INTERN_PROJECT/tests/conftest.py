@@ -0,0 +1,32 @@
+import os
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+# The shared modules import each other as top-level modules, as they do under Streamlit
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+BASELINE_DB = os.path.join(PROJECT_DIR, "leave_management.db")
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """A copy of the checked-in database, still on its pre-migration schema."""
+    with sqlite3.connect(BASELINE_DB) as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != 0:
+            pytest.skip("leave_management.db has already been migrated")
+    path = tmp_path / "leave_management.db"
+    shutil.copyfile(BASELINE_DB, path)
+    return str(path)
+
+
+@pytest.fixture
+def migrated_db(baseline_db):
+    """The baseline copy upgraded to the latest schema."""
+    import leave_migrations
+
+    leave_migrations.migrate_database(baseline_db)
+    return baseline_db
@@ -0,0 +1,72 @@
+import fcntl
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import hr_snapshots
+
+PAYROLL_CSV = hr_snapshots.PAYROLL_CSV
+
+
+@pytest.fixture
+def payroll(tmp_path, monkeypatch):
+    """The first 20 payroll rows in a CSV of their own, snapshotted under tmp_path."""
+    path = tmp_path / "payroll.csv"
+    pd.read_csv(PAYROLL_CSV, index_col=0).head(20).to_csv(path)
+    monkeypatch.setattr(hr_snapshots, "PAYROLL_CSV", str(path))
+    monkeypatch.setattr(hr_snapshots, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(hr_snapshots, "_datasets", {})
+    return path
+
+
+def append_rows(path, count):
+    frame = pd.read_csv(path, index_col=0)
+    extra = pd.read_csv(PAYROLL_CSV, index_col=0).iloc[len(frame):len(frame) + count]
+    pd.concat([frame, extra]).to_csv(path)
+
+
+def test_snapshot_is_rewritten_when_its_source_changes(payroll):
+    first = hr_snapshots.refresh("payroll")
+    assert len(hr_snapshots.load("payroll", columns=["EmpID"])) == 20
+    # An unchanged source is not rewritten
+    manifest_path = os.path.join(hr_snapshots._snapshot_path("payroll"), hr_snapshots.MANIFEST)
+    written = os.stat(manifest_path).st_mtime_ns
+    assert hr_snapshots.refresh("payroll") == first
+    assert os.stat(manifest_path).st_mtime_ns == written
+
+    append_rows(payroll, 5)
+    assert hr_snapshots.refresh("payroll") != first
+    assert len(hr_snapshots.load("payroll", columns=["EmpID"])) == 25
+    # Only the live snapshot is left behind: no staging or retired directories
+    assert sorted(os.listdir(hr_snapshots.SNAPSHOT_DIR)) == ["payroll", "payroll.lock"]
+
+
+def test_load_filters_partitions_and_columns(payroll):
+    frame = hr_snapshots.load("payroll", columns=["EmpID", "Partner", "Department"], partners=["Fine Media"])
+    source = pd.read_csv(payroll, index_col=0)
+    assert list(frame.columns) == ["EmpID", "Partner", "Department"]
+    assert sorted(frame["EmpID"]) == sorted(source.loc[source["Partner"].str.strip() == "Fine Media", "EmpID"])
+    assert isinstance(frame["Department"].dtype, pd.CategoricalDtype)
+    assert hr_snapshots.partners("payroll") == sorted(source["Partner"].str.strip().unique())
+
+
+def test_refresh_waits_for_another_process_writing(payroll):
+    hr_snapshots.refresh("payroll")
+    append_rows(payroll, 5)
+    # flock locks belong to the open file, so a second descriptor stands in for another process
+    fd = os.open(f"{hr_snapshots._snapshot_path('payroll')}.lock", os.O_RDWR)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    refreshed = threading.Event()
+    thread = threading.Thread(target=lambda: (hr_snapshots.refresh("payroll"), refreshed.set()))
+    thread.start()
+    try:
+        assert not refreshed.wait(0.3)
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+    thread.join(10)
+    assert refreshed.is_set()
+    assert hr_snapshots._manifest("payroll")["rows"] == 25
+
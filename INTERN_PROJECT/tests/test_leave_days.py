@@ -0,0 +1,86 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import leave_days
+
+CALENDAR = leave_days.LeaveCalendar(years=[2025, 2026])
+
+
+def test_calendar_days_are_inclusive_and_bad_rows_count_zero():
+    days = leave_days.leave_days(
+        ["2026-03-02", "2026-03-02", "not a date", "2026-03-05", None],
+        ["2026-03-02", "2026-03-06", "2026-03-06", "2026-03-02", "2026-03-06"],
+    )
+    assert days.tolist() == [1, 5, 0, 0, 0]
+
+
+def test_working_days_skip_weekends_and_public_holidays():
+    # Mon 21 to Sun 27 December 2026: Christmas falls on the Friday, Boxing Day on the Saturday
+    assert leave_days.leave_days(["2026-12-21"], ["2026-12-27"], CALENDAR).tolist() == [4]
+    easter = leave_days.LeaveCalendar(holidays=["2026-04-03", "2026-04-06"], years=[2026])
+    assert leave_days.leave_days(["2026-03-30"], ["2026-04-10"], easter).tolist() == [8]
+    # A leave taken entirely over a weekend or holiday costs nothing
+    assert leave_days.leave_days([date(2026, 12, 25)], [date(2026, 12, 27)], CALENDAR).tolist() == [0]
+
+
+def test_overlap_days_clip_to_the_period():
+    starts = ["2025-12-29", "2026-03-02", "2025-06-01", "bad"]
+    ends = ["2026-01-09", "2026-03-06", "2025-06-05", "2026-01-05"]
+    year = (date(2026, 1, 1), date(2026, 12, 31))
+
+    assert leave_days.overlap_days(starts, ends, *year).tolist() == [9, 5, 0, 0]
+    # New Year's Day and the weekend are not working days
+    assert leave_days.overlap_days(starts, ends, *year, calendar=CALENDAR).tolist() == [6, 5, 0, 0]
+    assert leave_days.overlaps(starts, ends, *year).tolist() == [True, True, False, False]
+
+
+def test_days_left_counts_from_today():
+    starts = ["2026-03-02", "2026-03-02", "2026-02-02"]
+    ends = ["2026-03-06", "2026-03-13", "2026-02-06"]
+    assert leave_days.days_left(starts, ends, today=date(2026, 3, 1)).tolist() == [5, 12, 0]
+    assert leave_days.days_left(starts, ends, today=date(2026, 3, 4)).tolist() == [3, 10, 0]
+
+
+def test_used_and_remaining_days():
+    leaves = [
+        {"leave_id": "a", "leave_type": "Annual", "start_date": "2026-03-02", "end_date": "2026-03-06", "status": "Approved"},
+        {"leave_id": "a", "leave_type": "Annual", "start_date": "2026-04-01", "end_date": "2026-04-02", "status": "Approved"},
+        {"leave_id": "a", "leave_type": "Sick", "start_date": "2026-05-04", "end_date": "2026-05-04", "status": "Pending"},
+        {"leave_id": "b", "leave_type": "Annual", "start_date": "2026-03-02", "end_date": "2026-03-31", "status": "Approved"},
+    ]
+    used = leave_days.used_days(leaves, by=("leave_id",))
+    assert used.to_dict() == {"a": 7, "b": 30}
+
+    entitled = pd.Series({"a": 21, "b": 21, "c": 21})
+    assert leave_days.remaining_days(entitled, used).to_dict() == {"a": 14, "b": 0, "c": 21}
+    assert leave_days.remaining_days(10, 12) == 0
+
+
+def test_period_totals_split_leaves_across_months():
+    totals = leave_days.period_totals(["2026-01-30", "2026-02-10"], ["2026-02-02", "2026-02-11"])
+    assert totals.index[0] == pd.Timestamp("2026-01-01")
+    assert totals.to_numpy(dtype=np.int64).tolist() == [2, 4]
+
+
+@pytest.mark.parametrize("freq, starts, totals", [
+    ("D", ["2026-01-29", "2026-01-30", "2026-01-31", "2026-02-01", "2026-02-02"], [1, 1, 1, 1, 1]),
+    ("W", ["2026-01-26", "2026-02-02"], [4, 1]),  # weeks start on Monday
+    ("MS", ["2026-01-01", "2026-02-01"], [3, 2]),
+    ("ME", ["2026-01-01", "2026-02-01"], [3, 2]),
+    ("QS", ["2026-01-01"], [5]),
+    ("QE", ["2026-01-01"], [5]),
+    ("YE", ["2026-01-01"], [5]),
+])
+def test_period_totals_index_every_frequency_by_period_start(freq, starts, totals):
+    result = leave_days.period_totals(["2026-01-29"], ["2026-02-02"], freq=freq)
+    assert result.index.tolist() == [pd.Timestamp(start) for start in starts]
+    assert result.to_numpy(dtype=np.int64).tolist() == totals
+
+
+@pytest.mark.parametrize("freq", ["M", "h", "2MS", "BMS", ""])
+def test_period_totals_rejects_other_frequencies(freq):
+    with pytest.raises(ValueError):
+        leave_days.period_totals(["2026-01-01"], ["2026-01-02"], freq=freq)
@@ -0,0 +1,368 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+import leave_db
+
+
+@pytest.fixture
+def repo(migrated_db):
+    return leave_db.LeaveRepository(db_path=migrated_db)
+
+
+def leave_ids(repo, status):
+    return [row["id"] for row in repo._all(f"SELECT id FROM {repo.leaves} WHERE status = ? ORDER BY id", [status])]
+
+
+def status_of(repo, leave_id):
+    return repo._one(f"SELECT status, decline_reason, recall_reason FROM {repo.leaves} WHERE id = ?", [leave_id])
+
+
+def test_allowed_transitions_are_applied_with_their_reason(repo):
+    pending = leave_ids(repo, "Pending")
+    approved = leave_ids(repo, "Approved")
+    results = repo.apply_status_transitions([
+        (pending[0], "Approved", None),
+        (pending[1], "Declined", "Short staffed"),
+        (pending[2], "Withdrawn", "Plans changed"),
+        (approved[0], "Recalled", "Operational Need"),
+    ])
+
+    assert [result["ok"] for result in results] == [True] * 4
+    assert dict(status_of(repo, pending[1])) == {"status": "Declined", "decline_reason": "Short staffed", "recall_reason": None}
+    assert dict(status_of(repo, pending[2])) == {"status": "Withdrawn", "decline_reason": None, "recall_reason": "Plans changed"}
+    assert status_of(repo, approved[0])["recall_reason"] == "Operational Need"
+
+
+def test_invalid_rows_are_skipped_and_reported(repo):
+    pending = leave_ids(repo, "Pending")
+    approved = leave_ids(repo, "Approved")
+    results = repo.apply_status_transitions([
+        (approved[0], "Withdrawn", None),
+        (pending[0], "Approved", None),
+        (pending[0], "Declined", None),
+        (-1, "Approved", None),
+    ])
+
+    assert [(result["ok"], result["error"]) for result in results] == [
+        (False, "Approved to Withdrawn is not allowed"),
+        (True, None),
+        (False, "duplicate"),
+        (False, "not found"),
+    ]
+    assert status_of(repo, approved[0])["status"] == "Approved"
+    assert status_of(repo, pending[0])["status"] == "Approved"
+
+
+def test_a_failing_batch_changes_nothing(repo, monkeypatch):
+    pending = leave_ids(repo, "Pending")[:3]
+    # A status the table's CHECK constraint rejects aborts the whole transaction
+    monkeypatch.setattr(leave_db.LeaveRepository, "STATUS_TRANSITIONS", (("Pending", "Approved"), ("Pending", "Lost")))
+    with pytest.raises(sqlite3.IntegrityError):
+        repo.apply_status_transitions([(pending[0], "Approved", None), (pending[1], "Lost", None)])
+    assert leave_ids(repo, "Pending")[:3] == pending
+
+
+def all_pages(repo, limit, **kwargs):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = repo.get_team_leaves_page(columns=["id"], after=cursor, limit=limit, **kwargs)
+        pages.append([row["id"] for row in rows])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("sort_by", sorted(leave_db.LeaveRepository.SORTABLE_COLUMNS))
+@pytest.mark.parametrize("descending", [True, False])
+def test_keyset_pages_cover_every_leave_once_in_order(repo, sort_by, descending):
+    everything = repo._all(f"SELECT id, {sort_by} FROM {repo.leaves}")
+    expected = [row["id"] for row in sorted(everything, key=lambda row: (row[sort_by], row["id"]), reverse=descending)]
+
+    pages = all_pages(repo, 7, sort_by=sort_by, descending=descending)
+    assert [len(page) for page in pages[:-1]] == [7] * (len(pages) - 1)
+    assert [leave_id for page in pages for leave_id in page] == expected
+
+
+def test_keyset_page_boundaries(repo):
+    total = repo.count_team_leaves()
+    # A page that ends exactly on the last row has no next page, one row short of it does
+    assert all_pages(repo, total) == [all_pages(repo, total + 1)[0]]
+    assert [len(page) for page in all_pages(repo, total - 1)] == [total - 1, 1]
+
+    pending = [leave_id for page in all_pages(repo, 4, status_filter=["Pending"]) for leave_id in page]
+    assert sorted(pending) == leave_ids(repo, "Pending")
+    assert repo.count_team_leaves(["Pending"]) == len(pending)
+
+
+def test_team_leaves_page_rejects_unknown_columns(repo):
+    with pytest.raises(ValueError):
+        repo.get_team_leaves_page(sort_by="password")
+    with pytest.raises(ValueError):
+        repo.get_team_leaves_page(columns=["id", "password"])
+
+
+def a_pending_leave(repo):
+    return repo._one(f"SELECT id, leave_id, leave_type, days FROM {repo.leaves} WHERE status = 'Pending' ORDER BY id")
+
+
+def used_days(repo, leave):
+    return repo.get_leave_balance(leave["leave_id"], leave["leave_type"], "annual_leave")["used"]
+
+
+def test_ledger_follows_approve_edit_recall_and_delete(repo):
+    leave = a_pending_leave(repo)
+    before = used_days(repo, leave)
+
+    repo.apply_status_transitions([(leave["id"], "Approved", None)])
+    assert used_days(repo, leave) == before + leave["days"]
+    assert repo.audit_leave_balances() == []
+
+    # days is generated from the dates, so extending the leave adds two days to the ledger
+    leave_db.execute(f"UPDATE {repo.leaves} SET end_date = date(end_date, '+2 days') WHERE id = ?", [leave["id"]],
+                     db_path=repo.db_path)
+    assert used_days(repo, leave) == before + leave["days"] + 2
+    assert repo.audit_leave_balances() == []
+
+    repo.apply_status_transitions([(leave["id"], "Recalled", "Operational Need")])
+    assert used_days(repo, leave) == before
+    assert repo.audit_leave_balances() == []
+
+    repo.update_leave_status(leave["id"], "Approved")
+    leave_db.execute(f"DELETE FROM {repo.leaves} WHERE id = ?", [leave["id"]], db_path=repo.db_path)
+    assert used_days(repo, leave) == before
+    assert repo.audit_leave_balances() == []
+
+
+def test_rebuild_repairs_a_corrupted_ledger(repo):
+    leave = repo._one(f"SELECT leave_id, leave_type FROM {repo.leaves} WHERE status = 'Approved' ORDER BY id")
+    before = used_days(repo, leave)
+    leave_db.execute("UPDATE leave_balances SET used_days = used_days + 5 WHERE employee_id = ? AND leave_type = ?",
+                     [leave["leave_id"], leave["leave_type"]], db_path=repo.db_path)
+    leave_db.execute("INSERT INTO leave_balances VALUES (?, 'Imaginary', 3, 1)", [leave["leave_id"]],
+                     db_path=repo.db_path)
+
+    assert {(row["employee_id"], row["leave_type"]) for row in repo.audit_leave_balances()} == {
+        (leave["leave_id"], leave["leave_type"]), (leave["leave_id"], "Imaginary"),
+    }
+    repo.rebuild_leave_balances()
+    assert repo.audit_leave_balances() == []
+    assert used_days(repo, leave) == before
+
+
+@pytest.fixture
+def team(repo):
+    """Two employees moved onto a manager of their own, the teammate with an approved 2030 leave."""
+    employee, teammate, outsider = [row["uuid"] for row in repo._all(f"SELECT uuid FROM {repo.employees} ORDER BY uuid LIMIT 3")]
+    leave_db.execute(f"UPDATE {repo.employees} SET Manager = 'Clash Team' WHERE uuid IN (?, ?)", [employee, teammate],
+                     db_path=repo.db_path)
+    leave_id = repo.apply_for_leave(teammate, "Teammate", "Annual", "2030-03-10", "2030-03-14", "Holiday")
+    repo.update_leave_status(leave_id, "Approved")
+    return {"employee": employee, "teammate": teammate, "outsider": outsider, "leave": leave_id}
+
+
+def clash_ids(repo, employee, start="2030-03-01", end="2030-03-31"):
+    return [leave["id"] for leave in repo.get_team_clashes(employee, start, end)]
+
+
+def test_team_clashes_need_an_overlapping_approved_teammate_leave(repo, team):
+    assert clash_ids(repo, team["employee"]) == [team["leave"]]
+    assert clash_ids(repo, team["employee"], "2030-03-14", "2030-03-20") == [team["leave"]]
+    assert clash_ids(repo, team["employee"], "2030-03-15", "2030-03-20") == []
+    # Your own leave is not a clash
+    assert clash_ids(repo, team["teammate"]) == []
+
+    pending = repo.apply_for_leave(team["teammate"], "Teammate", "Annual", "2030-03-20", "2030-03-21", "Pending")
+    assert clash_ids(repo, team["employee"]) == [team["leave"]]
+    repo.update_leave_status(pending, "Approved")
+    assert clash_ids(repo, team["employee"]) == [team["leave"], pending]
+
+
+def test_team_clashes_follow_edits_status_changes_and_deletes(repo, team):
+    leave_db.execute(f"UPDATE {repo.leaves} SET start_date = '2030-04-01', end_date = '2030-04-02' WHERE id = ?",
+                     [team["leave"]], db_path=repo.db_path)
+    assert clash_ids(repo, team["employee"]) == []
+    assert clash_ids(repo, team["employee"], "2030-04-02", "2030-04-02") == [team["leave"]]
+
+    repo.apply_status_transitions([(team["leave"], "Recalled", "Operational Need")])
+    assert clash_ids(repo, team["employee"], "2030-04-01", "2030-04-30") == []
+
+    repo.update_leave_status(team["leave"], "Approved")
+    assert clash_ids(repo, team["employee"], "2030-04-01", "2030-04-30") == [team["leave"]]
+    leave_db.execute(f"DELETE FROM {repo.leaves} WHERE id = ?", [team["leave"]], db_path=repo.db_path)
+    assert clash_ids(repo, team["employee"], "2030-04-01", "2030-04-30") == []
+
+
+def test_team_clashes_follow_teammates_between_managers(repo, team):
+    leave_db.execute(f"UPDATE {repo.employees} SET Manager = 'Elsewhere' WHERE uuid = ?", [team["teammate"]],
+                     db_path=repo.db_path)
+    assert clash_ids(repo, team["employee"]) == []
+
+    leave_db.execute(f"UPDATE {repo.employees} SET Manager = 'Elsewhere' WHERE uuid = ?", [team["outsider"]],
+                     db_path=repo.db_path)
+    assert clash_ids(repo, team["outsider"]) == [team["leave"]]
+
+
+def grouped_partner_year_stats(repo):
+    rows = repo._all(f"""
+        SELECT COALESCE(e.Partner_Name, '') AS partner, CAST(strftime('%Y', l.start_date) AS INTEGER) AS year,
+               l.status, SUM(l.days) AS days, COUNT(*) AS requests
+        FROM {repo.leaves} l
+        LEFT JOIN {repo.employees} e ON e.uuid = l.leave_id
+        GROUP BY 1, 2, 3
+    """)
+    return {(row["partner"], row["year"], row["status"]): (row["days"], row["requests"]) for row in rows}
+
+
+def assert_partner_year_stats_match(repo):
+    expected = grouped_partner_year_stats(repo)
+    partners = {partner for partner, _, _ in expected} | set(repo.get_partners())
+    years = {year for _, year, _ in expected}
+    stats = repo.get_partner_year_stats(partners, years)
+    actual = {
+        (partner, year, status): (counts["days"], counts["requests"])
+        for (partner, year), by_status in stats.items()
+        for status, counts in by_status.items()
+        if counts["requests"]
+    }
+    assert actual == expected
+
+
+def test_partner_year_stats_follow_leaves_and_partner_changes(repo):
+    assert_partner_year_stats_match(repo)
+    employee = repo._one(f"SELECT uuid FROM {repo.employees} WHERE Partner_Name IS NOT NULL ORDER BY uuid")["uuid"]
+
+    new = [repo.apply_for_leave(employee, "Someone", "Annual", start, end, "Trip")
+           for start, end in (("2029-12-30", "2030-01-02"), ("2030-05-01", "2030-05-03"), ("2030-06-01", "2030-06-01"))]
+    assert_partner_year_stats_match(repo)
+
+    repo.apply_status_transitions([(new[0], "Approved", None), (new[1], "Declined", "Busy"), (new[2], "Approved", None)])
+    repo.apply_status_transitions([(new[2], "Recalled", "Operational Need")])
+    assert_partner_year_stats_match(repo)
+
+    leave_db.execute(f"UPDATE {repo.employees} SET Partner_Name = 'Brand New Partner' WHERE uuid = ?", [employee],
+                     db_path=repo.db_path)
+    assert_partner_year_stats_match(repo)
+    assert "Brand New Partner" in repo.get_partners()
+
+    leave_db.execute(f"UPDATE {repo.employees} SET Partner_Name = NULL WHERE uuid = ?", [employee],
+                     db_path=repo.db_path)
+    assert_partner_year_stats_match(repo)
+    assert repo.get_partner_year_stats([""], [2030])[("", 2030)]["Declined"] == {"days": 3, "requests": 1}
+
+
+@pytest.fixture
+def aggregates(repo):
+    """A PartnerAggregates over the HR dashboard query that records which partners each call recomputed."""
+    queried = []
+
+    def query(conn, partners):
+        queried.append(sorted(partners))
+        return repo.query_partner_summary(conn, partners)
+    cache = leave_db.PartnerAggregates(query, db_path=repo.db_path)
+    cache.queried = queried
+    return cache
+
+
+def test_partner_aggregates_reload_only_changed_partners(repo, aggregates):
+    partners = ["Fine Media", "Sheer Logic"]
+    first = aggregates.get(partners)
+    with repo.pool.connection() as conn:
+        assert first == repo.query_partner_summary(conn, partners)
+    assert aggregates.get(partners) == first
+    assert aggregates.queried == [partners]
+
+    leave = repo._one(f"""
+        SELECT l.id, l.days FROM {repo.leaves} l JOIN {repo.employees} e ON e.uuid = l.leave_id
+        WHERE e.Partner_Name = 'Sheer Logic' AND l.status = 'Approved' ORDER BY l.id
+    """)
+    leave_db.execute(f"DELETE FROM {repo.leaves} WHERE id = ?", [leave["id"]], db_path=repo.db_path)
+    after_delete = aggregates.get(partners)
+    assert aggregates.queried[-1] == ["Sheer Logic"]
+    assert after_delete["Sheer Logic"]["leave_days"] == first["Sheer Logic"]["leave_days"] - leave["days"]
+    assert after_delete["Fine Media"] is first["Fine Media"]
+
+
+def test_partner_aggregates_follow_a_partner_rename(repo, aggregates):
+    before = aggregates.get(["Fine Media", "Sheer Logic"])
+    leave_db.execute(f"UPDATE {repo.employees} SET Partner_Name = 'Fine Media Group' WHERE Partner_Name = 'Fine Media'",
+                     db_path=repo.db_path)
+
+    renamed = aggregates.get(["Fine Media", "Fine Media Group", "Sheer Logic"])
+    assert aggregates.queried[-1] == ["Fine Media", "Fine Media Group"]
+    assert "Fine Media" not in renamed
+    assert renamed["Fine Media Group"] == {**before["Fine Media"], "partner": "Fine Media Group"}
+    assert renamed["Sheer Logic"] is before["Sheer Logic"]
+
+
+@pytest.mark.parametrize("table, insert, update, delete", [
+    ("employee_table",
+     "INSERT INTO employee_table (uuid, First_Name) VALUES ('new-employee', 'New')",
+     "UPDATE employee_table SET First_Name = 'Renamed' WHERE uuid = 'new-employee'",
+     "DELETE FROM employee_table WHERE uuid = 'new-employee'"),
+    ("leave_entries",
+     "INSERT INTO leave_entries (id, leave_id, employee_name, leave_type, start_date, end_date) "
+     "SELECT 100000, uuid, First_Name, 'Annual', '2030-01-01', '2030-01-02' FROM employee_table ORDER BY uuid LIMIT 1",
+     "UPDATE leave_entries SET end_date = '2030-01-03' WHERE id = 100000",
+     "DELETE FROM leave_entries WHERE id = 100000"),
+    ("leave_entitlements_data",
+     "INSERT INTO leave_entitlements_data (employee_id, annual_leave) SELECT uuid, 21 FROM employee_table ORDER BY uuid LIMIT 1",
+     "UPDATE leave_entitlements_data SET annual_leave = 24",
+     "DELETE FROM leave_entitlements_data"),
+])
+def test_data_version_advances_on_every_write_to_its_table(repo, table, insert, update, delete):
+    watched = ("employee_table", "leave_entries", "leave_entitlements_data")
+
+    def versions():
+        return dict(zip(watched, leave_db.data_version(*watched, db_path=repo.db_path)))
+
+    seen = versions()
+    for statement in (insert, update, delete):
+        leave_db.execute(statement, db_path=repo.db_path)
+        now = versions()
+        assert now[table] > seen[table]
+        assert {name: version for name, version in now.items() if name != table} == \
+            {name: version for name, version in seen.items() if name != table}
+        seen = now
+
+    # Reads and writes that match no rows leave every version where it was
+    leave_db.fetch_all(f"SELECT * FROM {table}", db_path=repo.db_path)
+    leave_db.execute(update, db_path=repo.db_path)
+    leave_db.execute(delete, db_path=repo.db_path)
+    assert versions() == seen
+
+
+def legacy_dashboard(repo, today):
+    """The manager dashboard figures as home_page.py computed them before get_dashboard_summary: one query each."""
+    next_week = (date.fromisoformat(today) + timedelta(days=7)).isoformat()
+
+    def count(where, params):
+        return repo._one(f"SELECT COUNT(*) AS n FROM {repo.leaves} WHERE {where}", params)["n"]
+    on_leave = repo._all(f"""
+        SELECT employee_name, leave_type, start_date, end_date FROM {repo.leaves}
+        WHERE status = 'Approved' AND ? BETWEEN start_date AND end_date
+    """, [today])
+    return {
+        "pending_count": count("status = 'Pending'", []),
+        "approved_today": count("status = 'Approved' AND date(start_date) = ?", [today]),
+        "team_on_leave_today": count("status = 'Approved' AND ? BETWEEN start_date AND end_date", [today]),
+        "upcoming_leaves": count("status = 'Approved' AND start_date BETWEEN ? AND ?", [today, next_week]),
+        "on_leave_today": sorted(tuple(row.values()) for row in on_leave),
+        "recent_requests": [row["id"] for row in repo.get_recent_leaves(limit=5)],
+    }
+
+
+def test_dashboard_summary_matches_the_per_metric_queries(repo):
+    approved_starts = [row["start_date"] for row in repo._all(
+        f"SELECT DISTINCT start_date FROM {repo.leaves} WHERE status = 'Approved' ORDER BY start_date"
+    )]
+    days = [*approved_starts, (date.fromisoformat(approved_starts[0]) + timedelta(days=1)).isoformat(), "2001-01-01"]
+    for today in days:
+        summary = repo.get_dashboard_summary(today=today)
+        summary["on_leave_today"] = sorted(
+            (leave["employee_name"], leave["leave_type"], leave["start_date"], leave["end_date"])
+            for leave in summary["on_leave_today"]
+        )
+        summary["recent_requests"] = [leave["id"] for leave in summary["recent_requests"]]
+        assert summary == legacy_dashboard(repo, today), today
+    assert any(repo.get_dashboard_summary(today=today)["team_on_leave_today"] for today in approved_starts)
@@ -0,0 +1,101 @@
+import sqlite3
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import leave_db
+import leave_liability
+
+
+def workforce(*rows):
+    return pd.DataFrame(rows, columns=["uuid", "partner", "salary", "Date_of_Join", "annual_leave", "compensation_leave"])
+
+
+def leaves(*rows):
+    return pd.DataFrame(rows, columns=["leave_id", "leave_type", "start_date", "end_date"])
+
+
+def test_annual_leave_accrues_monthly_and_taken_days_are_deducted():
+    staff = workforce(
+        ("a", "Fine Media", 260_000, "2020-01-15", 24, 5),
+        ("b", "Sheer Logic", 520_000, "2026-04-15", 24, 0),
+        ("c", "Sheer Logic", 260_000, "2026-12-01", 24, 0),
+    )
+    taken = leaves(
+        ("a", "Annual", "2026-03-02", "2026-03-06"),
+        ("a", "Annual", "2025-12-30", "2026-01-02"),  # 2 days fall in this leave year
+        ("a", "Study", "2026-02-02", "2026-02-03"),
+    )
+    result = leave_liability.employee_liability(date(2026, 6, 30), staff, taken).set_index("employee_id")
+
+    assert "c" not in result.index  # joins after the valuation date
+    # 6 of 12 months of 24 days, less 7 taken; compensation is owed in full, less 2 taken
+    assert result.loc["a", "annual_leave"] == pytest.approx(5)
+    assert result.loc["a", "compensation_leave"] == pytest.approx(3)
+    assert result.loc["a", "liability"] == pytest.approx(8 * 1000)
+    # April to June, counting the month of joining
+    assert result.loc["b", "annual_leave"] == pytest.approx(6)
+    assert result.loc["b", "liability"] == pytest.approx(6 * 2000)
+
+
+@pytest.mark.parametrize("as_of, months", [
+    (date(2026, 4, 20), 0),  # the month of joining has not ended yet
+    (date(2026, 4, 30), 1),  # ... and earns in full once it has, though only half was worked
+    (date(2026, 5, 30), 1),
+    (date(2026, 5, 31), 2),
+    (date(2026, 12, 31), 9),
+    (date(2027, 1, 31), 1),  # a new leave year starts from January
+])
+def test_mid_month_joiner_accrues_from_the_month_of_joining(as_of, months):
+    staff = workforce(("b", "Sheer Logic", 260_000, "2026-04-15", 24, 0))
+    result = leave_liability.employee_liability(as_of, staff, leaves())
+    assert result["annual_leave"].tolist() == [pytest.approx(months * 2)]
+
+
+def test_balance_is_floored_at_zero():
+    staff = workforce(("a", "Fine Media", 260_000, "2020-01-15", 12, 0))
+    taken = leaves(("a", "Annual", "2026-01-05", "2026-01-30"))
+    result = leave_liability.employee_liability(date(2026, 2, 28), staff, taken)
+    assert result["balance_days"].tolist() == [0]
+
+
+@pytest.fixture
+def liability_db(migrated_db, monkeypatch):
+    with sqlite3.connect(migrated_db) as conn:
+        conn.execute(
+            "INSERT INTO leave_entitlements_data (employee_id, annual_leave, compensation_leave) "
+            "SELECT uuid, 24, 0 FROM employee_table WHERE salary > 0"
+        )
+    monkeypatch.setattr(leave_liability, "get_pool", lambda: leave_db.get_pool(migrated_db))
+    return migrated_db
+
+
+def stored_months(path):
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT month FROM leave_liability_snapshots")]
+
+
+def test_monthly_liability_without_a_snapshot_has_no_delta_and_writes_nothing(liability_db):
+    result = leave_liability.monthly_liability(date(2026, 6, 15))
+
+    assert result["liability"].sum() > 0
+    assert result["previous_liability"].isna().all()
+    assert result["change_pct"].isna().all()
+    assert stored_months(liability_db) == []
+
+
+def test_monthly_liability_compares_against_the_recorded_month(liability_db):
+    recorded = leave_liability.record_month(date(2026, 5, 10))
+    assert stored_months(liability_db) == ["2026-05-31"]
+
+    result = leave_liability.monthly_liability(date(2026, 6, 15))
+    previous = result["previous_liability"].dropna()
+    assert previous.to_dict() == pytest.approx(recorded["liability"].to_dict())
+    expected = (result["liability"] - result["previous_liability"]) / result["previous_liability"] * 100
+    assert result["change_pct"].dropna().to_dict() == pytest.approx(expected.dropna().to_dict())
+    # A second recording keeps the figure reported at the time
+    leave_liability.record_month(date(2026, 5, 20))
+    assert leave_liability.monthly_liability(date(2026, 6, 15))["previous_liability"].equals(
+        result["previous_liability"]
+    )
@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+import leave_db
+import leave_migrations
+
+
+def counts(path):
+    with sqlite3.connect(path) as conn:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+
+def test_upgrade_keeps_row_counts_per_table(baseline_db):
+    before = counts(baseline_db)
+    applied = leave_migrations.migrate_database(baseline_db)
+    after = counts(baseline_db)
+
+    assert [version for version, _, _ in applied] == [version for version, _, _ in leave_migrations.MIGRATIONS]
+    # Only employee_table and leave_entries are copied; the legacy employees table is not merged in
+    assert after["employee_table"] == before["employee_table"]
+    assert after["leave_entries"] == before["leave_entries"]
+    # Every legacy table is kept, untouched, under its new name
+    for name, legacy_name in leave_migrations.LEGACY_TABLES.items():
+        if name in before:
+            assert after[legacy_name] == before[name]
+
+
+def test_upgrade_adds_no_partners(baseline_db):
+    with sqlite3.connect(baseline_db) as conn:
+        partners = {row[0] for row in conn.execute("SELECT DISTINCT Partner_Name FROM employee_table")}
+    leave_migrations.migrate_database(baseline_db)
+    with sqlite3.connect(baseline_db) as conn:
+        assert {row[0] for row in conn.execute("SELECT DISTINCT Partner_Name FROM employee_table")} == partners
+
+
+def test_upgrade_reports_orphaned_rows(baseline_db):
+    with sqlite3.connect(baseline_db) as conn:
+        orphan_ids = {row[0] for row in conn.execute(
+            "SELECT employee_id FROM leave_entitlements_data WHERE employee_id NOT IN (SELECT uuid FROM employee_table)"
+        )}
+    assert orphan_ids
+
+    applied = leave_migrations.migrate_database(baseline_db)
+    notes = dict((version, notes) for version, _, notes in applied)[1]
+    assert any("legacy_leave_entitlements_data" in note and "unknown employees" in note for note in notes)
+    with sqlite3.connect(baseline_db) as conn:
+        assert set(leave_migrations.orphaned_rows(conn)["legacy_leave_entitlements_data"]) == orphan_ids
+
+
+def test_upgrade_is_idempotent(migrated_db):
+    before = counts(migrated_db)
+    assert leave_migrations.migrate_database(migrated_db) == []
+    assert counts(migrated_db) == before
+
+
+def test_get_pool_does_not_migrate(baseline_db, monkeypatch):
+    monkeypatch.setattr(leave_db, "MIGRATE_ON_START", False)
+    with pytest.raises(RuntimeError, match="leave_migrations.py"):
+        leave_db.get_pool(baseline_db)
+    with sqlite3.connect(baseline_db) as conn:
+        assert leave_migrations.current_version(conn) == 0
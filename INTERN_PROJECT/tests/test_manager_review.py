@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANAGER_DIR = os.path.join(PROJECT_DIR, "manager_leave-master", "Manager")
+
+
+@pytest.fixture
+def open_page(monkeypatch):
+    """Runs a page against the given database, with the shared modules imported afresh."""
+    monkeypatch.delenv("LEAVE_DB_MIGRATE", raising=False)
+    monkeypatch.syspath_prepend(MANAGER_DIR)
+
+    def run(db_path, path):
+        monkeypatch.setenv("LEAVE_DB_PATH", db_path)
+        for module in ("leave_db", "leave_migrations", "review"):
+            monkeypatch.delitem(sys.modules, module, raising=False)
+        return AppTest.from_file(path, default_timeout=30).run()
+    return run
+
+
+@pytest.fixture
+def app(migrated_db, open_page):
+    """Runs a manager page against the migrated copy."""
+    return lambda page: open_page(migrated_db, os.path.join(MANAGER_DIR, page))
+
+
+def count(path, status):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM leave_entries WHERE status = ?", (status,)).fetchone()[0]
+
+
+@pytest.mark.parametrize("page", ["leave_centre.py", "help_desk.py"])
+def test_pages_render_the_shared_review_queues(app, page):
+    at = app(page)
+    assert not at.exception
+    assert "Pending Leave Requests for Review" in [header.value for header in at.header]
+    assert at.checkbox(key="pending_queue_select_all") is not None
+
+
+def test_bulk_approve_from_the_pending_queue(app, migrated_db):
+    pending = count(migrated_db, "Pending")
+    at = app("leave_centre.py")
+    at.checkbox(key="pending_queue_select_all").check().run()
+    at.button(key="approve_selected").click().run()
+
+    assert not at.exception
+    approved_now = min(pending, 25)
+    assert count(migrated_db, "Pending") == pending - approved_now
+    assert f"{approved_now} leave request(s) updated to Approved" in [message.value for message in at.success]
+
+
+def test_help_desk_recalls_with_its_fixed_reason(app, migrated_db):
+    at = app("help_desk.py")
+    assert not [text_input for text_input in at.text_input if text_input.key == "recall_queue_reason"]
+    at = app("leave_centre.py")
+    assert at.text_input(key="recall_queue_reason").value == "Operational Need"
+
+
+@pytest.mark.parametrize("page", ["leave_centre.py", "help_desk.py"])
+def test_employee_filter_tells_same_name_employees_apart(app, migrated_db, page):
+    with sqlite3.connect(migrated_db) as conn:
+        # An employee with leaves who shares a full name with someone else
+        uuid, first, surname = conn.execute("""
+            SELECT e.uuid, e.First_Name, e.Surname_Name FROM employee_table e
+            WHERE EXISTS (SELECT 1 FROM leave_entries l WHERE l.leave_id = e.uuid AND l.status IN ('Pending', 'Approved'))
+              AND (SELECT COUNT(*) FROM employee_table o
+                   WHERE o.First_Name = e.First_Name AND o.Surname_Name = e.Surname_Name) > 1
+            LIMIT 1
+        """).fetchone()
+        leaves = conn.execute(
+            "SELECT COUNT(*) FROM leave_entries WHERE leave_id = ? AND status IN ('Pending', 'Approved')", (uuid,)
+        ).fetchone()[0]
+        employees = conn.execute("SELECT COUNT(*) FROM employee_table").fetchone()[0]
+
+    at = app(page)
+    assert "Team Leave Dashboard" in [header.value for header in at.header]
+    employee_filter = next(selectbox for selectbox in at.selectbox if selectbox.label == "Filter by Employee")
+    assert len(employee_filter.options) == employees + 1
+    assert len(set(employee_filter.options)) == len(employee_filter.options)
+
+    at = employee_filter.set_value(uuid).run()
+    assert not at.exception
+    assert f"{first} {surname} (" in next(s for s in at.selectbox if s.label == "Filter by Employee").format_func(uuid)
+    # The team browser's caption comes after the two review queues'
+    assert at.caption[-1].value.endswith(f"of {leaves}")
+
+
+def test_home_page_renders_with_the_shared_status_updates(app):
+    at = app("home_page.py")
+    assert not at.exception
+
+
+@pytest.mark.parametrize("path", [
+    os.path.join(MANAGER_DIR, "help_desk.py"),
+    os.path.join(PROJECT_DIR, "human_resource", "leave_page.py"),
+])
+def test_unmigrated_database_shows_the_migration_hint(open_page, baseline_db, path):
+    at = open_page(baseline_db, path)
+    assert not at.exception
+    assert any("python leave_migrations.py" in error.value for error in at.error)
+    with sqlite3.connect(baseline_db) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+import hr_snapshots
+import payroll_stats
+
+# (Partner, Department, Salary, Leave_Liability) for six payroll rows
+ROWS = [
+    ("Fine Media", "Sales", 100_000, 1_000.0),
+    ("Fine Media", "Sales", 120_000, 3_000.0),
+    ("Fine Media", "Finance", 90_000, 500.0),
+    ("Sheer Logic", "Sales", 80_000, 2_000.0),
+    ("Sheer Logic", "Customer Care", 60_000, 1_500.0),
+    ("Sheer Logic", "Customer Care", 70_000, 2_500.0),
+]
+
+
+@pytest.fixture
+def stats(tmp_path, monkeypatch):
+    """Aggregates over a six-row payroll CSV with known figures, snapshotted under tmp_path."""
+    frame = pd.read_csv(hr_snapshots.PAYROLL_CSV, index_col=0).head(len(ROWS))
+    frame[["Partner", "Department", "Salary", "Leave_Liability"]] = pd.DataFrame(ROWS, index=frame.index)
+    path = tmp_path / "payroll.csv"
+    frame.to_csv(path)
+    monkeypatch.setattr(hr_snapshots, "PAYROLL_CSV", str(path))
+    monkeypatch.setattr(hr_snapshots, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(hr_snapshots, "_datasets", {})
+    monkeypatch.setattr(payroll_stats, "_cached", None)
+    return payroll_stats.aggregates()
+
+
+def test_partner_totals(stats):
+    assert sorted(stats.partners) == ["Fine Media", "Sheer Logic"]
+    assert stats.partner("Fine Media") == {
+        "salary_total": 310_000, "salary_mean": pytest.approx(310_000 / 3), "headcount": 3, "leave_liability": 4_500.0,
+    }
+    assert stats.partner("Nobody Ltd") == {"salary_total": 0, "salary_mean": 0, "headcount": 0, "leave_liability": 0}
+
+
+def test_departments(stats):
+    departments = stats.departments("Sheer Logic").set_index("Department")
+    assert sorted(departments.index) == ["Customer Care", "Sales"]
+    assert departments.loc["Customer Care", "salary_mean"] == 65_000
+    assert departments.loc["Sales", "headcount"] == 1
+
+    # A partner with nobody on the payroll gets no rows, typed like everyone else's
+    empty = stats.departments("Nobody Ltd")
+    assert empty.empty
+    assert empty.dtypes.to_dict() == stats.departments("Fine Media").dtypes.to_dict()
+
+
+def test_compare(stats):
+    compared = stats.compare(["Sheer Logic", "Nobody Ltd", "Fine Media"])
+    assert list(compared.index) == ["Sheer Logic", "Nobody Ltd", "Fine Media"]
+    assert compared.loc["Sheer Logic", "salary_total"] == 210_000
+    assert compared.loc["Nobody Ltd"].tolist() == [0, 0, 0, 0]
+    assert compared.loc["Fine Media", "headcount"] == 3
+
+
+def test_compare_departments(stats):
+    compared = stats.compare_departments(["Fine Media", "Sheer Logic"], metric="salary_total")
+    assert list(compared.columns) == ["Fine Media", "Sheer Logic"]
+    assert compared.loc["Sales"].tolist() == [220_000, 80_000]
+    assert pd.isna(compared.loc["Finance", "Sheer Logic"])
+    assert pd.isna(compared.loc["Customer Care", "Fine Media"])
+    # Departments none of the partners have are left out
+    assert list(stats.compare_departments(["Fine Media"]).index.astype(str)) == ["Finance", "Sales"]
+
+
+def test_aggregates_are_kept_until_the_payroll_changes(stats):
+    assert payroll_stats.aggregates() is stats
+    frame = pd.read_csv(hr_snapshots.PAYROLL_CSV, index_col=0)
+    frame.loc[frame.index[0], "Salary"] += 1
+    frame.to_csv(hr_snapshots.PAYROLL_CSV)
+    assert payroll_stats.aggregates().partner("Fine Media")["salary_total"] == 310_001